@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "MIS.settings")
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.DB_POOL_WARMUP:
+    from main.db_pool import warm_up
+
+    warm_up()
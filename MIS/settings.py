@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: учитывает запросы к бд и кешу всех остальных слоёв
+    "main.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,6 +81,34 @@ WSGI_APPLICATION = "MIS.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Пул соединений psycopg 3 на процесс (DB_POOL=0 - постоянные соединения
+# на поток с временем жизни DB_CONN_MAX_AGE секунд)
+DB_POOL = os.getenv("DB_POOL", "1") == "1"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # ожидание свободного соединения, с
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 600))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 3600))
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 60))
+# Ограничение времени одного запроса к БД, мс (0 - без ограничения)
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 30000))
+# Открывать пул при загрузке wsgi/asgi-приложения в каждом процессе
+DB_POOL_WARMUP = os.getenv("DB_POOL_WARMUP", "1") == "1"
+
+
+def database_options():
+    options = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"}
+    if DB_POOL:
+        options["pool"] = {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+            "max_idle": DB_POOL_MAX_IDLE,
+            "max_lifetime": DB_POOL_MAX_LIFETIME,
+        }
+    return options
+
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -86,24 +116,59 @@ DATABASES = {
         'USER': os.getenv("DB_USER"),
         'HOST': os.getenv("DB_HOST"),
         'PORT': os.getenv("DB_PORT"),
+        # С пулом соединение возвращается в пул в конце запроса
+        "CONN_MAX_AGE": 0 if DB_POOL else DB_CONN_MAX_AGE,
+        # Проверка соединения перед выдачей из пула или повторным использованием
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": database_options(),
     }
 }
 
-CACHES = {
-    "default": { # кеш
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_POST')}/{os.getenv('REDIS_CACHE')}",
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+REDIS_URL = f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_POST')}"
+
+# Локальный LRU процесса перед Redis (main.cache_backends.NearCache);
+# NEAR_CACHE=0 - обращаться к django_redis напрямую
+NEAR_CACHE = os.getenv("NEAR_CACHE", "1") == "1"
+NEAR_CACHE_TIMEOUT = float(os.getenv("NEAR_CACHE_TIMEOUT", 5))
+NEAR_CACHE_MAX_ENTRIES = int(os.getenv("NEAR_CACHE_MAX_ENTRIES", 10000))
+
+
+def redis_cache(db):
+    redis_options = {
+        # DefaultClient django_redis со счётчиками для main.metrics
+        "CLIENT_CLASS": "main.redis_client.InstrumentedRedisClient",
+    }
+    if not NEAR_CACHE:
+        return {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": f"{REDIS_URL}/{db}",
+            "OPTIONS": redis_options,
         }
-    },
-    "tokens": { # токен
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_POST')}/{os.getenv('REDIS_TOKEN')}",
+    return {
+        "BACKEND": "main.cache_backends.NearCache",
+        "LOCATION": f"{REDIS_URL}/{db}",
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        }
+            "REMOTE_BACKEND": "django_redis.cache.RedisCache",
+            "REMOTE_OPTIONS": redis_options,
+            "LOCAL_TIMEOUT": NEAR_CACHE_TIMEOUT,
+            "MAX_ENTRIES": NEAR_CACHE_MAX_ENTRIES,
+        },
     }
+
+
+CACHES = {
+    "default": redis_cache(os.getenv('REDIS_CACHE')), # кеш
+    "tokens": redis_cache(os.getenv('REDIS_TOKEN')), # токен
+}
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "main.authentication.JwtAuthentication",
+    ],
+    # Без токена API недоступно: данные пациентов и врачей - персональные
+    "DEFAULT_PERMISSION_CLASSES": [
+        "rest_framework.permissions.IsAuthenticated",
+    ],
 }
 
 # Password validation
@@ -124,6 +189,55 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Профиль хеширования паролей: "default" - стандартные хешеры Django,
+# "seeding" - быстрый PBKDF2 для массового наполнения test/staging баз.
+PASSWORD_HASHING_PROFILE = os.getenv("PASSWORD_HASHING_PROFILE", "default")
+if PASSWORD_HASHING_PROFILE == "seeding":
+    PASSWORD_HASHERS = [
+        "main.hashers.SeedingPBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    ]
+
+# Число процессов для пакетного хеширования паролей
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1))
+
+# Архивация приёмов (main.services.archive): приёмы, закончившиеся раньше
+# CONSULT_ARCHIVE_AFTER_DAYS дней назад, переносятся в ConsultArchive;
+# мягко удалённые - через CONSULT_ARCHIVE_DELETED_AFTER_DAYS дней после удаления.
+# По умолчанию выключена (0): списки, история и export_data читают только
+# Consult, и перенесённые приёмы из них пропадают. Пока архивация включена,
+# приём раньше горизонта не записать ни через API, ни загрузкой
+CONSULT_ARCHIVE_AFTER_DAYS = int(os.getenv("CONSULT_ARCHIVE_AFTER_DAYS", 0))
+CONSULT_ARCHIVE_DELETED_AFTER_DAYS = int(os.getenv("CONSULT_ARCHIVE_DELETED_AFTER_DAYS", 0))
+
+# Регион для номеров без кода страны в поиске (main.services.search)
+SEARCH_PHONE_REGION = os.getenv("SEARCH_PHONE_REGION", "RU")
+
+# Метрики запросов (main.middleware.RequestMetricsMiddleware): заголовок
+# Server-Timing и текст Prometheus на /api/metrics/ для METRICS_ALLOWED_IPS
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+
+# Бюджеты SQL-запросов на HTTP-запрос по имени маршрута. Превышение
+# считается в mis_query_budget_exceeded_total, при QUERY_BUDGET_ENFORCE
+# (тесты, main.testing.QueryBudgetTestMixin) - ошибка QueryBudgetExceeded.
+# Реестр клиник и поиск проверяют свой бюджет и сами (main.query_budget)
+QUERY_BUDGETS = {
+    "doctor-availability": 2,
+    # Клиники, врачи, образование, счётчики по врачам
+    "clinic-roster": 4,
+    "consult-list": 1,
+    "patient-list": 1,
+    "consult-stats": 1,
+    # Проверка pg_trgm (один раз на процесс), пациенты, врачи
+    "person-search": 3,
+    "async-doctor": 2,
+    "async-patient": 1,
+    "async-doctor-availability": 2,
+    "async-consult-book": 14,
+}
+QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "0") == "1"
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -1,13 +1,127 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Patient, Doctor, Clinic, Consult, Education
+from django.contrib.admin.views.main import ChangeList
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Patient, Doctor, Clinic, Consult, ConsultArchive, Education, EducationEntry
+from .pagination import KeysetAdminPaginator
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """
+    datetimes() для date_hierarchy без DISTINCT по всей таблице.
+
+    В PostgreSQL границы берутся через min/max, а каждый год/месяц/день
+    проверяется EXISTS по диапазону - это поиски по индексу на поле даты.
+    Всё выполняется одним запросом. Для других СУБД - стандартная реализация.
+    """
+    KINDS = {"year": "1 year", "month": "1 month", "day": "1 day"}
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None):
+        connection = connections[self.db]
+        if connection.vendor != "postgresql" or kind not in self.KINDS or not settings.USE_TZ:
+            return super().datetimes(field_name, kind, order, tzinfo)
+
+        tz = tzinfo or timezone.get_current_timezone()
+        column = connection.ops.quote_name(self.model._meta.get_field(field_name).column)
+        inner, params = self.order_by().values(field_name).query.sql_with_params()
+        tz_name, step = str(tz), self.KINDS[kind]
+        sql = f"""
+            WITH bounds AS (
+                SELECT date_trunc(%s, min(t.{column}) AT TIME ZONE %s) AS low,
+                       max(t.{column}) AT TIME ZONE %s AS high
+                FROM ({inner}) t
+            )
+            SELECT g FROM bounds, generate_series(bounds.low, bounds.high, %s::interval) AS g
+            WHERE EXISTS (
+                SELECT 1 FROM ({inner}) t
+                WHERE t.{column} >= g AT TIME ZONE %s
+                  AND t.{column} < (g + %s::interval) AT TIME ZONE %s
+            )
+            ORDER BY g {"DESC" if order == "DESC" else "ASC"}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                [kind, tz_name, tz_name, *params, step, *params, tz_name, step, tz_name],
+            )
+            return [timezone.make_aware(row[0], tz) for row in cursor.fetchall()]
+
+
+class ProjectedChangeList(ChangeList):
+    """
+    Список в админке, читающий только колонки list_only модели админки
+    (в том числе поля связанных моделей из list_select_related).
+    """
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_only:
+            queryset = queryset.only(*self.model_admin.list_only)
+        if self.date_hierarchy:
+            queryset = IndexedDatesQuerySet(self.model, query=queryset.query, using=queryset.db)
+        return queryset
+
+
+class ProjectedModelAdmin(admin.ModelAdmin):
+    list_only = ()
+    paginator = KeysetAdminPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
+
+
+def person_fields(relation):
+    return [relation, *(f"{relation}__{field}" for field in ("family", "name", "second_name"))]
 
 
 @admin.register(Education)
-class EducationAdmin(admin.ModelAdmin):
+class EducationAdmin(ProjectedModelAdmin):
     list_display = [
         "doctor",
-        "history_education",
+        "universities",
+        "ordinator",
+        "advanced_training",
     ]
+    list_select_related = ("doctor", )
+    list_only = ("id", *person_fields("doctor"))
+    autocomplete_fields = ("doctor", )
+
+    def get_queryset(self, request):
+        # Число записей по разделам - из EducationEntry, без чтения JSON
+        sections = {
+            section: Coalesce(
+                Subquery(
+                    EducationEntry.objects.filter(education=OuterRef("pk"), section=section)
+                    .order_by()
+                    .values("education")
+                    .annotate(total=Count("id"))
+                    .values("total"),
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+            for section in ("universities", "ordinator", "advanced_training")
+        }
+        return super().get_queryset(request).annotate(**{
+            f"{section}_count": value for section, value in sections.items()
+        })
+
+    @admin.display(description="Университеты", ordering="universities_count")
+    def universities(self, education):
+        return education.universities_count
+
+    @admin.display(description="Ординатура", ordering="ordinator_count")
+    def ordinator(self, education):
+        return education.ordinator_count
+
+    @admin.display(description="Повышение квалификации", ordering="advanced_training_count")
+    def advanced_training(self, education):
+        return education.advanced_training_count
 
 
 @admin.register(Patient)
@@ -20,7 +134,10 @@ class PatientAdmin(admin.ModelAdmin):
         "phone",
         "email",
     ]
-    ordering = ("family", "name", "second_name", )
+    ordering = ("family", "name", "second_name", "pk", )
+    search_fields = ("^family", "=email", )
+    paginator = KeysetAdminPaginator
+    show_full_result_count = False
 
 
 @admin.register(Doctor)
@@ -33,7 +150,10 @@ class DoctorAdmin(admin.ModelAdmin):
         "phone",
         "email",
     ]
-    ordering = ("family", "name", "second_name", )
+    ordering = ("family", "name", "second_name", "pk", )
+    search_fields = ("^family", "=email", )
+    paginator = KeysetAdminPaginator
+    show_full_result_count = False
 
 
 @admin.register(Clinic)
@@ -41,11 +161,78 @@ class ClinicAdmin(admin.ModelAdmin):
     list_display = [
         "name",
         "juridical_address",
+        "doctor_list",
+        "upcoming_consults",
     ]
     ordering = ("name", "juridical_address", )
-        
+    search_fields = ("^name", )
+
+    def get_queryset(self, request):
+        # Врачи - одним Prefetch на страницу, консультации - подзапросом
+        upcoming = (
+            Consult.objects.filter(clinic=OuterRef("pk"), start_date__gte=timezone.now())
+            .order_by()
+            .values("clinic")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        doctors = Doctor.objects.only("id", "family", "name", "second_name")
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                upcoming_consults=Coalesce(Subquery(upcoming, output_field=IntegerField()), 0)
+            )
+            .prefetch_related(Prefetch("doctors", queryset=doctors))
+        )
+
+    @admin.display(description="Врачи")
+    def doctor_list(self, clinic):
+        return ", ".join(str(doctor) for doctor in clinic.doctors.all())
+
+    @admin.display(description="Предстоящие консультации", ordering="upcoming_consults")
+    def upcoming_consults(self, clinic):
+        return clinic.upcoming_consults
+
 
 @admin.register(Consult)
-class ConsultAdmin(admin.ModelAdmin):
-    pass
+class ConsultAdmin(ProjectedModelAdmin):
+    list_display = [
+        "start_date",
+        "end_date",
+        "clinic",
+        "doctor",
+        "patient",
+        "is_deleted",
+    ]
+    list_filter = ("is_deleted", )
+    list_select_related = ("clinic", "doctor", "patient", )
+    list_only = (
+        "id",
+        "start_date",
+        "end_date",
+        "is_deleted",
+        "clinic",
+        "clinic__name",
+        *person_fields("doctor"),
+        *person_fields("patient"),
+    )
+    autocomplete_fields = ("clinic", "doctor", "patient", )
+    # Фильтры по дате - диапазоны по индексу consult_start_id_idx
+    date_hierarchy = "start_date"
+    ordering = ("-start_date", "-pk", )
+
+
+@admin.register(ConsultArchive)
+class ConsultArchiveAdmin(ConsultAdmin):
+    """История приёмов только для чтения; пополняется заданием archive_consults."""
+    # Фильтры по дате - диапазоны по индексу consult_arch_start_id_idx
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,47 @@
+import jwt
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from main.services.iwt import JwtAuth
+
+
+class TokenUser:
+    """Пользователь из payload access-токена, без запроса в бд."""
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, payload: dict):
+        self.id = self.pk = payload["sub"]
+        self.payload = payload
+
+    def __str__(self):
+        return f"TokenUser {self.id}"
+
+
+class JwtAuthentication(BaseAuthentication):
+    """
+    Аутентификация по заголовку "Authorization: Bearer <access_token>".
+
+    Подпись проверяется локально закешированным ключом, отзыв - по
+    локальному фильтру denylist; Redis нужен только при срабатывании фильтра.
+    """
+    keyword = "Bearer"
+    use_local_denylist = True
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed("Некорректный заголовок Authorization.")
+
+        try:
+            payload = JwtAuth().verify_access_token(
+                header[1].decode(), local=self.use_local_denylist
+            )
+        except (jwt.InvalidTokenError, UnicodeDecodeError):
+            raise AuthenticationFailed("Недействительный или отозванный токен.")
+        return TokenUser(payload), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,291 @@
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """
+    Ограниченный по числу записей LRU с TTL в памяти процесса.
+
+    Значения хранятся сериализованными: вызывающий код получает свою копию
+    и не может изменить общий объект. generation увеличивается при каждой
+    инвалидации - по нему отбрасываются значения, прочитанные из Redis
+    параллельно с инвалидацией.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout: float, generation: int | None = None) -> None:
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + timeout, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, keys) -> None:
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+
+class NearCache(BaseCache):
+    """
+    Двухуровневый кеш: LRU в памяти процесса перед удалённым кешем
+    (по умолчанию django_redis).
+
+    Чтение сначала идёт в локальный LRU, при промахе - в Redis. Запись идёт
+    в Redis, затем в локальный LRU, после чего имена изменённых ключей
+    публикуются в канал Redis pub/sub; фоновый поток каждого процесса
+    удаляет их из своего LRU. Пока подписка не установлена (старт, обрыв
+    соединения), локальный уровень не используется. Время жизни локальной
+    записи не больше LOCAL_TIMEOUT секунд - это верхняя граница устаревания,
+    если сообщение об инвалидации потеряно.
+
+    OPTIONS:
+        REMOTE_BACKEND - класс удалённого кеша;
+        REMOTE_OPTIONS - его OPTIONS;
+        LOCAL_TIMEOUT - TTL локальной записи, сек;
+        MAX_ENTRIES - размер локального LRU;
+        CHANNEL - канал pub/sub (по умолчанию свой для каждого LOCATION).
+
+    Для бэкендов без pub/sub (locmem в тестах) локальные записи живут
+    LOCAL_TIMEOUT и инвалидируются только внутри процесса.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.local_timeout = float(options.get("LOCAL_TIMEOUT", 5))
+        self.channel = options.get("CHANNEL", f"near-cache:{location}")
+        self.reconnect_delay = float(options.get("RECONNECT_DELAY", 1))
+
+        # Ключи строит NearCache, удалённый кеш использует их как есть
+        remote_params = {
+            key: value
+            for key, value in params.items()
+            if key not in ("OPTIONS", "KEY_PREFIX", "VERSION", "KEY_FUNCTION")
+        }
+        remote_params["OPTIONS"] = options.get("REMOTE_OPTIONS", {})
+        remote_params["KEY_FUNCTION"] = lambda key, key_prefix, version: key
+        backend = import_string(options.get("REMOTE_BACKEND", "django_redis.cache.RedisCache"))
+        self.remote = backend(location, remote_params)
+
+        self._local = LocalLRU(self._max_entries)
+        self._origin = uuid.uuid4().hex
+        self._subscribed = threading.Event()
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Клиент django_redis: get_redis_connection работает с этим бэкендом."""
+        return self.remote.client
+
+    def _pubsub_client(self):
+        client = getattr(self.remote, "client", None)
+        return client.get_client(write=True) if client is not None else None
+
+# Блок локального уровня
+    def _local_enabled(self) -> bool:
+        self._ensure_listener()
+        return self._subscribed.is_set()
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _store_local(self, key, value, timeout=DEFAULT_TIMEOUT, generation=None):
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout > 0:
+            self._local.set(key, value, local_timeout, generation)
+        else:
+            self._local.delete([key])
+
+# Блок инвалидации
+    def _ensure_listener(self) -> None:
+        """Запускает поток подписки в текущем процессе (в том числе после fork)."""
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            # После fork у дочернего процесса свой отправитель и пустой LRU
+            self._origin = uuid.uuid4().hex
+            self._subscribed.clear()
+            self._local.clear()
+            client = self._pubsub_client()
+            if client is None:
+                self._subscribed.set()
+                return
+            threading.Thread(
+                target=self._listen, args=(client,), name=f"near-cache:{self.channel}", daemon=True
+            ).start()
+
+    def _listen(self, client) -> None:
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Сообщения, пропущенные до подписки, не восстановить
+                self._local.clear()
+                self._subscribed.set()
+                for message in pubsub.listen():
+                    self._on_message(message["data"])
+            except Exception:
+                self._subscribed.clear()
+                self._local.clear()
+                time.sleep(self.reconnect_delay)
+
+    def _on_message(self, data) -> None:
+        origin, keys = json.loads(data)
+        if origin == self._origin:
+            return
+        if keys is None:
+            self._local.clear()
+        else:
+            self._local.delete(keys)
+
+    def _broadcast(self, keys) -> None:
+        """Сообщает остальным процессам об изменённых ключах (None - весь кеш)."""
+        client = self._pubsub_client()
+        if client is not None:
+            client.publish(self.channel, json.dumps([self._origin, keys]))
+
+    def _invalidate(self, keys) -> None:
+        self._local.delete(keys)
+        self._broadcast(keys)
+
+# Блок API кеша Django
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if not self._local_enabled():
+            return self.remote.get(key, default)
+        value = self._local.get(key)
+        if value is not _MISSING:
+            return value
+        generation = self._local.generation
+        value = self.remote.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._store_local(key, value, generation=generation)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        local = self._local_enabled()
+        generation = self._local.generation
+        result = {}
+        missing = []
+        for key, original in keys_map.items():
+            value = self._local.get(key) if local else _MISSING
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                result[original] = value
+        if missing:
+            for key, value in self.remote.get_many(missing).items():
+                result[keys_map[key]] = value
+                if local:
+                    self._store_local(key, value, generation=generation)
+        return result
+
+    def has_key(self, key, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        if self._local_enabled() and self._local.get(made_key) is not _MISSING:
+            return True
+        return self.remote.has_key(made_key)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.remote.set(key, value, timeout=timeout)
+        self._invalidate([key])
+        if self._local_enabled():
+            self._store_local(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if not self.remote.add(key, value, timeout=timeout):
+            return False
+        self._invalidate([key])
+        if self._local_enabled():
+            self._store_local(key, value, timeout)
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        made = {self.make_and_validate_key(key, version=version): value for key, value in data.items()}
+        failed = self.remote.set_many(made, timeout=timeout) or []
+        self._invalidate(list(made))
+        if self._local_enabled():
+            for key, value in made.items():
+                if key not in failed:
+                    self._store_local(key, value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.remote.touch(key, timeout=timeout)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            return self.remote.incr(key, delta)
+        finally:
+            self._invalidate([key])
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        deleted = self.remote.delete(key)
+        self._invalidate([key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        made = [self.make_and_validate_key(key, version=version) for key in keys]
+        if made:
+            self.remote.delete_many(made)
+            self._invalidate(made)
+
+    def clear(self):
+        self.remote.clear()
+        self._local.clear()
+        self._broadcast(None)
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
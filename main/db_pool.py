@@ -0,0 +1,71 @@
+import asyncio
+import weakref
+
+from django.conf import settings
+from django.db import connections
+
+# Семафоры db_slot по циклам событий
+_slots = weakref.WeakKeyDictionary()
+
+
+def warm_up(aliases=None, timeout: float = 30.0):
+    """
+    Прогрев соединений PostgreSQL в текущем процессе.
+
+    С пулом (OPTIONS["pool"]) пул открывается и ждёт min_size соединений,
+    затем проверяет их - первые запросы воркера не платят за подключение.
+    Без пула открывается постоянное соединение текущего потока.
+
+    Вызывается из MIS/wsgi.py и MIS/asgi.py при загрузке приложения. Если
+    приложение загружается до fork (gunicorn --preload), вызывать в хуке
+    воркера (post_fork): пул и его потоки не переживают fork. Недоступная
+    БД прерывает запуск воркера, а не первый запрос.
+    """
+    for alias in aliases or connections:
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            continue
+        pool = connection.pool
+        if pool is None:
+            connection.ensure_connection()
+            continue
+        pool.open(wait=True, timeout=timeout)
+        pool.check()
+
+
+def pool_stats(aliases=None) -> dict:
+    """Счётчики пулов psycopg (pool_size, pool_available, requests_waiting, ...)."""
+    stats = {}
+    for alias in aliases or connections:
+        connection = connections[alias]
+        if connection.vendor == "postgresql" and connection.pool is not None:
+            stats[alias] = connection.pool.get_stats()
+    return stats
+
+
+def db_slot(alias: str = "default") -> asyncio.Semaphore:
+    """
+    Семафор текущего цикла событий на max_size пула alias.
+
+    Под ASGI у каждого запроса свой поток и своё соединение. Асинхронные
+    представления держат слот, пока работают с бд: при сотнях одновременных
+    запросов лишние ждут в цикле событий, а не в потоках, заблокированных
+    на пуле, и не получают PoolTimeout.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        pool = getattr(connections[alias], "pool", None)
+        size = pool.max_size if pool is not None else settings.DB_POOL_MAX_SIZE
+        slots = _slots[loop] = asyncio.Semaphore(size)
+    return slots
+
+
+def release_connections():
+    """
+    Возвращает соединения текущего потока в пул, без пула - закрывает их.
+    Соединения внутри atomic (например, в TestCase) не трогаются.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
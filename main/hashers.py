@@ -0,0 +1,12 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class SeedingPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Быстрый PBKDF2 для массового наполнения тестовых и staging баз.
+
+    Алгоритм тот же (pbkdf2_sha256), число итераций хранится в хеше,
+    поэтому пароли проверяются обычным PBKDF2PasswordHasher и обновляются
+    до полной стоимости при первом входе. В production не использовать.
+    """
+    iterations = 1000
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.services.archive import ConsultArchiveService
+
+
+class Command(BaseCommand):
+    help = (
+        "Перенос закончившихся до горизонта архивации и давно удалённых "
+        "приёмов из Consult в ConsultArchive пачками (запускать по расписанию; "
+        "сроки - CONSULT_ARCHIVE_AFTER_DAYS и CONSULT_ARCHIVE_DELETED_AFTER_DAYS, "
+        "по умолчанию 0 - архивация выключена). "
+        "--dry-run только считает приёмы к переносу. После первого переноса "
+        "большой истории таблицу main_consult стоит один раз сжать "
+        "(VACUUM FULL или pg_repack): обычный VACUUM лишь переиспользует место."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--limit", type=int)
+        parser.add_argument("--clinic", type=int)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        service = ConsultArchiveService(
+            batch_size=options["batch_size"], clinic_id=options["clinic"]
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"eligible: {service.count()}")
+            return
+        started = time.perf_counter()
+        moved = service.archive(options["limit"])
+        self.stdout.write(f"archived {moved} consults in {time.perf_counter() - started:.1f}s")
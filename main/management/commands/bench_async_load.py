@@ -0,0 +1,89 @@
+import asyncio
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест HTTP: --concurrency одновременных запросов к каждому "
+        "адресу, пропускная способность, задержки и ошибки. Серверы "
+        "запускаются отдельно, например синхронные представления под WSGI "
+        "(gunicorn MIS.wsgi) и асинхронные под ASGI (uvicorn MIS.asgi:application): "
+        "bench_async_load wsgi=http://127.0.0.1:8001/api/doctors/1/ "
+        "asgi=http://127.0.0.1:8002/api/async/doctors/1/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("targets", nargs="+", help="метка=URL")
+        parser.add_argument("--concurrency", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=10_000)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["targets"]:
+            label, separator, url = target.partition("=")
+            if not separator or urlsplit(url).scheme != "http":
+                raise CommandError(f"Ожидается метка=http://...: {target}")
+            targets.append((label, url))
+
+        for label, url in targets:
+            latencies, errors, elapsed = asyncio.run(
+                self.load(url, options["requests"], options["concurrency"], options["timeout"])
+            )
+            line = f"{label}: {len(latencies) / elapsed:.0f} req/s"
+            if len(latencies) > 1:
+                cuts = statistics.quantiles(latencies, n=100)
+                line += f", p50 {cuts[49] * 1000:.0f}ms, p99 {cuts[98] * 1000:.0f}ms"
+            if errors:
+                line += f", errors {dict(errors)}"
+            self.stdout.write(line)
+
+    async def load(self, url, total, concurrency, timeout):
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n\r\n"
+        ).encode()
+        # Общий итератор: каждый клиент берёт следующий запрос, пока они не кончатся
+        remaining = iter(range(total))
+        latencies, errors = [], Counter()
+
+        async def client():
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(
+                        self.fetch(parts.hostname, parts.port or 80, request), timeout
+                    )
+                except (OSError, asyncio.TimeoutError, ValueError) as exc:
+                    errors[type(exc).__name__] += 1
+                    continue
+                if status != 200:
+                    errors[status] += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - started
+
+    @staticmethod
+    async def fetch(host, port, request) -> int:
+        """Один запрос на отдельном соединении; возвращает код ответа."""
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(request)
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("сервер закрыл соединение без ответа")
+            # Тело дочитывается до закрытия соединения (Connection: close)
+            while await reader.read(65536):
+                pass
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
@@ -0,0 +1,122 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from main.models import Clinic, Consult, Doctor, Patient
+from main.services.consult import ConsultBookingService
+
+
+def random_phone():
+    return f"+7916{random.randrange(10 ** 7):07d}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест бронирования: параллельные попытки записи к "
+        "нескольким врачам, проверка отсутствия двойных записей и bookings/s."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=2000)
+        parser.add_argument("--doctors", type=int, default=4)
+        parser.add_argument("--slots", type=int, default=200)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        clinic, doctors, patient = self.create_fixtures(run_id, options["doctors"])
+        service = ConsultBookingService()
+        base = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        slot_count = options["slots"]
+
+        def attempt(_):
+            try:
+                doctor = random.choice(doctors)
+                # Слоты по 5 минут со смещением 0-4 минуты дают частые пересечения
+                start = base + timedelta(
+                    minutes=5 * random.randrange(slot_count) + random.randrange(5)
+                )
+                return service.book(
+                    doctor_id=doctor.pk,
+                    clinic_id=clinic.pk,
+                    patient_id=patient.pk,
+                    start_date=start,
+                    end_date=start + timedelta(minutes=5),
+                ).is_booked
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                results = list(pool.map(attempt, range(options["attempts"])))
+            elapsed = time.perf_counter() - started
+
+            booked = sum(results)
+            double_bookings = self.count_double_bookings(doctors)
+            self.stdout.write(
+                f"attempts={len(results)} booked={booked} "
+                f"rejected={len(results) - booked} elapsed={elapsed:.2f}s "
+                f"attempts/s={len(results) / elapsed:.1f} "
+                f"bookings/s={booked / elapsed:.1f}"
+            )
+            if double_bookings:
+                self.stderr.write(f"double bookings: {double_bookings}")
+            else:
+                self.stdout.write(self.style.SUCCESS("double bookings: 0"))
+        finally:
+            Doctor.objects.filter(pk__in=[d.pk for d in doctors]).delete()
+            patient.delete()
+            clinic.delete()
+
+    @staticmethod
+    def create_fixtures(run_id, doctor_count):
+        clinic = Clinic.objects.create(
+            name=f"bench-{run_id}", juridical_address="-", physical_address="-"
+        )
+        patient = Patient.objects.create(
+            name="Bench",
+            family="Patient",
+            second_name="-",
+            email=f"bench-patient-{run_id}@example.com",
+            phone=random_phone(),
+            password="-",
+            tag_social="@bench",
+        )
+        doctors = [
+            Doctor.objects.create(
+                name="Bench",
+                family=f"Doctor{i}",
+                second_name="-",
+                email=f"bench-doctor-{run_id}-{i}@example.com",
+                phone=random_phone(),
+                password="-",
+                date_birth=date(1980, 1, 1),
+                date_start_work=date(2005, 1, 1),
+                salary=1,
+                specialty="bench",
+                experience=1,
+            )
+            for i in range(doctor_count)
+        ]
+        return clinic, doctors, patient
+
+    @staticmethod
+    def count_double_bookings(doctors):
+        count = 0
+        for doctor in doctors:
+            intervals = Consult.objects.filter(
+                doctor=doctor, is_deleted=False
+            ).order_by("start_date").values_list("start_date", "end_date")
+            previous_end = None
+            for start, end in intervals:
+                if previous_end is not None and start < previous_end:
+                    count += 1
+                previous_end = max(previous_end, end) if previous_end else end
+        return count
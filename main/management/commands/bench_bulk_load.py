@@ -0,0 +1,82 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from main.management.commands.bench_booking import Command as BookingBench
+from main.services.bulk_load import BulkLoadService
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Скорость массовой загрузки пациентов и консультаций (строк в секунду): "
+        "COPY в PostgreSQL и пачки bulk_create. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--doctors", type=int, default=50)
+        parser.add_argument("--conflict-rate", type=float, default=0.01)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        methods = ["bulk_create"]
+        if BulkLoadService(method="auto").use_copy():
+            methods.insert(0, "copy")
+        else:
+            self.stdout.write(f"{connection.vendor}: COPY недоступен, только bulk_create")
+
+        for method in methods:
+            try:
+                with transaction.atomic():
+                    self.run(method, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, method, options):
+        run_id = uuid.uuid4().hex[:8]
+        clinic, doctors, patient = BookingBench.create_fixtures(run_id, options["doctors"])
+        service = BulkLoadService(batch_size=options["batch_size"], method=method)
+        rows, rate = options["rows"], options["conflict_rate"]
+
+        def patients():
+            for index in range(rows):
+                # Часть строк повторяет email предыдущих - конфликт уникальности
+                duplicate = index and random.random() < rate
+                yield {
+                    "name": "Bench",
+                    "family": f"Patient{index}",
+                    "email": f"bench-load-{run_id}-{random.randrange(index) if duplicate else index}@example.com",
+                    "tag_social": "@bench",
+                }
+
+        base = timezone.now().replace(second=0, microsecond=0) - timedelta(days=365)
+
+        def consults():
+            for index in range(rows):
+                slot = index // len(doctors)
+                # Часть строк сдвинута на 2 минуты - пересечение с соседним приёмом
+                shift = 2 if random.random() < rate else 0
+                start = base + timedelta(minutes=5 * slot + shift)
+                yield {
+                    "doctor_id": doctors[index % len(doctors)].pk,
+                    "clinic_id": clinic.pk,
+                    "patient_id": patient.pk,
+                    "start_date": start,
+                    "end_date": start + timedelta(minutes=4),
+                }
+
+        for label, load in (("patients", service.load_patients), ("consults", service.load_consults)):
+            report = load(patients() if label == "patients" else consults())
+            self.stdout.write(
+                f"{method} {label}: loaded={report.loaded} rejected={len(report.rejected)} "
+                f"elapsed={report.elapsed:.1f}s rows/s={report.rows_per_second:.0f}"
+            )
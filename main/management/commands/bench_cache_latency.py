@@ -0,0 +1,54 @@
+import random
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from main.cache_backends import NearCache
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Задержка чтения из кеша (p50/p99): NearCache с локальным LRU против "
+        "прямых обращений к его удалённому бэкенду (django_redis)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alias", default="default")
+        parser.add_argument("--keys", type=int, default=1000)
+        parser.add_argument("--lookups", type=int, default=20000)
+        parser.add_argument("--value-size", type=int, default=512)
+
+    def handle(self, *args, **options):
+        near = caches[options["alias"]]
+        if not isinstance(near, NearCache):
+            raise CommandError(f"Кеш {options['alias']!r} не использует NearCache")
+
+        keys = [f"bench:near:{index}" for index in range(options["keys"])]
+        value = {"payload": "x" * options["value_size"]}
+        near.set_many({key: value for key in keys}, timeout=600)
+        # Удалённый бэкенд хранит ключи в уже построенном NearCache виде
+        remote_keys = {key: near.make_key(key) for key in keys}
+        lookups = [random.choice(keys) for _ in range(options["lookups"])]
+
+        try:
+            for label, get in (
+                ("django_redis", lambda key: near.remote.get(remote_keys[key])),
+                ("near cache", near.get),
+            ):
+                samples = []
+                for key in lookups:
+                    started = time.perf_counter_ns()
+                    assert get(key) is not None
+                    samples.append(time.perf_counter_ns() - started)
+                self.stdout.write(
+                    f"{label}: p50={percentile(samples, 0.5) / 1000:.1f}us "
+                    f"p99={percentile(samples, 0.99) / 1000:.1f}us"
+                )
+        finally:
+            near.delete_many(keys)
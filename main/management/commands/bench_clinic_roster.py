@@ -0,0 +1,159 @@
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from main.management.commands.bench_booking import random_phone
+from main.models import Clinic, Consult, Doctor, Education, EducationEntry, Patient
+from main.views import ClinicRosterView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Реестр клиник: число запросов и время ответа для страниц разного "
+        "размера против наивного обхода Clinic.doctors. Число запросов "
+        "представления не должно зависеть от числа клиник. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--doctors-per-clinic", type=int, default=10)
+        parser.add_argument("--consults-per-doctor", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                after = Clinic.all_objects.order_by("-pk").values_list("pk", flat=True).first()
+                self.seed(100, options["doctors_per_clinic"], options["consults_per_doctor"])
+                counts = {size: self.measure(after, size) for size in (10, 100)}
+                raise Rollback
+        except Rollback:
+            pass
+        if len(set(counts.values())) != 1:
+            raise CommandError(f"число запросов зависит от числа клиник: {counts}")
+        self.stdout.write(self.style.SUCCESS(f"constant query count: {counts[10]}"))
+
+    def measure(self, after, size):
+        factory = APIRequestFactory()
+        params = {"limit": size} if after is None else {"limit": size, "after": after}
+        with CaptureQueriesContext(connection) as view_queries:
+            started = time.perf_counter()
+            response = ClinicRosterView.as_view()(factory.get("/", params))
+            elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.data
+        assert len(response.data["results"]) == size
+
+        with CaptureQueriesContext(connection) as naive_queries:
+            started = time.perf_counter()
+            self.naive(after, size)
+            naive_elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{size} clinics: roster {len(view_queries)} queries {elapsed * 1000:.1f}ms, "
+            f"naive {len(naive_queries)} queries {naive_elapsed * 1000:.1f}ms"
+        )
+        return len(view_queries)
+
+    @staticmethod
+    def naive(after, size):
+        now = timezone.now()
+        clinics = Clinic.objects.order_by("pk")
+        if after is not None:
+            clinics = clinics.filter(pk__gt=after)
+        result = []
+        for clinic in clinics[:size]:
+            doctors = []
+            for doctor in clinic.doctors.filter(is_deleted=False):
+                doctors.append({
+                    "id": doctor.pk,
+                    "education": [e.history_education for e in doctor.education_set.all()],
+                    "upcoming_consults": Consult.objects.filter(
+                        clinic=clinic, doctor=doctor, start_date__gte=now
+                    ).count(),
+                })
+            result.append({
+                "id": clinic.pk,
+                "upcoming_consults": Consult.objects.filter(
+                    clinic=clinic, start_date__gte=now
+                ).count(),
+                "doctors": doctors,
+            })
+        return result
+
+    @staticmethod
+    def seed(clinic_count, doctors_per_clinic, consults_per_doctor):
+        run_id = uuid.uuid4().hex[:8]
+        clinics = Clinic.objects.bulk_create([
+            Clinic(name=f"bench-roster-{run_id}-{i}", juridical_address="-", physical_address="-")
+            for i in range(clinic_count)
+        ])
+        doctors = Doctor.objects.bulk_create([
+            Doctor(
+                name="Bench",
+                family=f"Doctor{i}",
+                second_name="-",
+                email=f"bench-roster-{run_id}-{i}@example.com",
+                phone=f"+7917{i:07d}",
+                password="-",
+                date_birth=date(1980, 1, 1),
+                date_start_work=date(2005, 1, 1),
+                salary=1,
+                specialty="bench",
+                experience=1,
+            )
+            for i in range(clinic_count * doctors_per_clinic)
+        ])
+        educations = Education.objects.bulk_create([
+            Education(
+                doctor=doctor,
+                history_education={
+                    "universities": [{
+                        "name": "Медицинский университет",
+                        "specialty": "Лечебное дело",
+                        "start_date": "1998-09-01",
+                        "end_date": "2004-06-30",
+                    }],
+                    "ordinator": [],
+                },
+            )
+            for doctor in doctors
+        ])
+        EducationEntry.objects.bulk_create(
+            [entry for education in educations for entry in EducationEntry.build(education)]
+        )
+        patient = Patient.objects.create(
+            name="Bench",
+            family="Patient",
+            second_name="-",
+            email=f"bench-roster-patient-{run_id}@example.com",
+            phone=random_phone(),
+            password="-",
+            tag_social="@bench",
+        )
+
+        through = Clinic.doctors.through
+        base = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        links, consults = [], []
+        for index, clinic in enumerate(clinics):
+            staff = doctors[index * doctors_per_clinic:(index + 1) * doctors_per_clinic]
+            for doctor in staff:
+                links.append(through(clinic_id=clinic.pk, doctor_id=doctor.pk))
+                for slot in range(consults_per_doctor):
+                    start = base + timedelta(minutes=10 * slot)
+                    consults.append(Consult(
+                        doctor=doctor,
+                        patient=patient,
+                        clinic=clinic,
+                        start_date=start,
+                        end_date=start + Consult.DEFAULT_DURATION,
+                    ))
+        through.objects.bulk_create(links)
+        Consult.objects.bulk_create(consults)
@@ -0,0 +1,124 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from main.management.commands.bench_booking import Command as BookingBench
+from main.models import Consult, ConsultArchive, Doctor
+from main.services.archive import ConsultArchiveService
+
+
+class Command(BaseCommand):
+    help = (
+        "Архивация приёмов: размер Consult и время горячих запросов (проверка "
+        "пересечений, предстоящие приёмы клиники, число приёмов) до и после "
+        "переноса истории в ConsultArchive. Данные удаляются в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--doctors", type=int, default=50)
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Без общей транзакции: удалённые строки освобождает только VACUUM
+        # после коммита, иначе "после" измерялось бы по раздутой таблице
+        clinic, doctors, patient = self.seed(options)
+        try:
+            self.vacuum()
+            self.measure("before", clinic, doctors, options["repeat"])
+
+            started = time.perf_counter()
+            service = ConsultArchiveService(batch_size=options["batch_size"], clinic_id=clinic.pk)
+            moved = service.archive()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"archived {moved} consults in {elapsed:.1f}s ({moved / elapsed:.0f} rows/s)"
+            )
+            # Первый перенос большой истории оставляет пустые страницы, которые
+            # обычный VACUUM не возвращает: таблицу сжимают один раз (FULL)
+            self.vacuum(full=True)
+            self.measure("after", clinic, doctors, options["repeat"])
+        finally:
+            # Без сигналов и каскада Django: строк сотни тысяч
+            Consult.all_objects.filter(clinic=clinic)._raw_delete(Consult.all_objects.db)
+            ConsultArchive.objects.filter(clinic=clinic)._raw_delete(ConsultArchive.objects.db)
+            Doctor.objects.filter(pk__in=[doctor.pk for doctor in doctors]).delete()
+            patient.delete()
+            clinic.delete()
+
+    @staticmethod
+    def vacuum(full=False):
+        if connection.vendor != "postgresql":
+            return
+        with connection.cursor() as cursor:
+            for model in (Consult, ConsultArchive):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"VACUUM {'FULL ' if full else ''}ANALYZE {table}")
+
+    def measure(self, label, clinic, doctors, repeat):
+        now = timezone.now()
+        queries = {
+            "overlap": lambda doctor: Consult.objects.overlapping(
+                doctor=doctor, start_date=now, end_date=now + timedelta(minutes=30)
+            ).exists(),
+            "upcoming": lambda doctor: Consult.objects.filter(
+                clinic=clinic, start_date__gte=now
+            ).count(),
+            "count": lambda doctor: Consult.objects.count(),
+        }
+        timings = []
+        for name, query in queries.items():
+            started = time.perf_counter()
+            for index in range(repeat):
+                query(doctors[index % len(doctors)])
+            timings.append(f"{name} {(time.perf_counter() - started) / repeat * 1000:.2f}ms")
+
+        live = Consult.all_objects.filter(clinic=clinic).count()
+        archived = ConsultArchive.objects.filter(clinic=clinic).count()
+        line = f"{label}: live {live}, archive {archived}"
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_total_relation_size(%s), pg_total_relation_size(%s)",
+                    [Consult._meta.db_table, ConsultArchive._meta.db_table],
+                )
+                live_size, archive_size = cursor.fetchone()
+            line += f", tables {live_size / 2 ** 20:.0f}MB / {archive_size / 2 ** 20:.0f}MB"
+        self.stdout.write(f"{line}; {', '.join(timings)}")
+
+    def seed(self, options):
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        count = options["rows"]
+        clinic, doctors, patient = BookingBench.create_fixtures(run_id, options["doctors"])
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        # Приёмы равномерно за years лет до текущего момента и месяц вперёд
+        span = timedelta(days=365 * options["years"] + 30)
+        first = now - timedelta(days=365 * options["years"])
+        per_doctor = -(-count // len(doctors))
+        step = span / per_doctor
+        for offset in range(0, count, options["batch_size"]):
+            size = min(options["batch_size"], count - offset)
+            consults = []
+            for i in range(offset, offset + size):
+                doctor_index, slot = i % len(doctors), i // len(doctors)
+                start = first + step * slot
+                consults.append(
+                    Consult(
+                        doctor=doctors[doctor_index],
+                        patient=patient,
+                        clinic=clinic,
+                        start_date=start,
+                        end_date=start + min(step, timedelta(minutes=20)),
+                        is_deleted=slot % 10 == 0,
+                    )
+                )
+            Consult.all_objects.bulk_create(consults)
+        self.stdout.write(f"seeded {count} consults in {time.perf_counter() - started:.1f}s")
+        return clinic, doctors, patient
@@ -0,0 +1,113 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from main.management.commands.bench_booking import Command as BookingBench
+from main.models import Consult
+from main.services.stats import ConsultStatsService
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Статистика приёмов: агрегат по всей таблице Consult против чтения "
+        "сводки ConsultDailyStats по дням, врачам и клиникам, а также цена "
+        "инкрементального пересчёта. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--doctors", type=int, default=50)
+        parser.add_argument("--per-day", type=int, default=40)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                doctors = self.seed(options)
+                service = ConsultStatsService()
+
+                started = time.perf_counter()
+                created = service.rebuild()
+                self.stdout.write(
+                    f"rebuild: {created} rows in {time.perf_counter() - started:.1f}s"
+                )
+
+                for group_by in ConsultStatsService.GROUPS:
+                    raw = self.timed(options["repeat"], lambda: self.raw_summary(group_by))
+                    stats = self.timed(options["repeat"], lambda: service.summary(group_by))
+                    self.stdout.write(
+                        f"by {group_by}: raw aggregate {raw * 1000:.1f}ms, "
+                        f"summary {stats * 1000:.1f}ms"
+                    )
+
+                # Одна запись - пересчёт одного ключа (клиника, врач, день)
+                consult = Consult.all_objects.filter(doctor=doctors[0]).first()
+                refresh = self.timed(
+                    options["repeat"],
+                    lambda: service.refresh_consults(
+                        [(consult.clinic_id, consult.doctor_id, consult.start_date)]
+                    ),
+                )
+                self.stdout.write(f"refresh one key: {refresh * 1000:.1f}ms")
+                raise Rollback
+        except Rollback:
+            pass
+
+    @staticmethod
+    def timed(repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @staticmethod
+    def raw_summary(group_by):
+        alive = Q(is_deleted=False)
+        column = ConsultStatsService.GROUPS[group_by]
+        return list(
+            Consult.all_objects.annotate(day=TruncDate("start_date"))
+            .values(column)
+            .annotate(consults=Count("pk", filter=alive), cancelled=Count("pk", filter=~alive))
+            .order_by(column)
+        )
+
+    def seed(self, options):
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        count, per_day = options["rows"], options["per_day"]
+        clinic, doctors, patient = BookingBench.create_fixtures(run_id, options["doctors"])
+        base = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        for offset in range(0, count, options["batch_size"]):
+            size = min(options["batch_size"], count - offset)
+            consults = []
+            for i in range(offset, offset + size):
+                doctor_index, slot = i % len(doctors), i // len(doctors)
+                # per_day приёмов по 10 минут у врача в день, каждый десятый отменён
+                start = base + timedelta(days=slot // per_day, minutes=10 * (slot % per_day))
+                consults.append(
+                    Consult(
+                        doctor=doctors[doctor_index],
+                        patient=patient,
+                        clinic=clinic,
+                        start_date=start,
+                        end_date=start + timedelta(minutes=8),
+                        is_deleted=slot % 10 == 0,
+                    )
+                )
+            Consult.all_objects.bulk_create(consults)
+        self.stdout.write(f"seeded {count} consults in {time.perf_counter() - started:.1f}s")
+        return doctors
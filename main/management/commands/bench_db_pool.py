@@ -0,0 +1,81 @@
+import copy
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main.db_pool import warm_up
+from main.models import Clinic
+
+
+class Command(BaseCommand):
+    help = (
+        "Соединения PostgreSQL под параллельной нагрузкой: подключение на "
+        "каждый запрос, постоянные соединения (CONN_MAX_AGE) и пул psycopg. "
+        "Каждый запрос повторяет цикл Django: проверка соединения, один "
+        "SELECT, закрытие или возврат соединения."
+    )
+
+    MODES = ("connect", "persistent", "pool")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--pool-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        base = connections["default"].settings_dict
+        if base["ENGINE"] != "django.db.backends.postgresql":
+            raise CommandError("Нужна база PostgreSQL.")
+        pool_size = options["pool_size"] or options["threads"]
+        for mode in self.MODES:
+            alias = f"bench_{mode}"
+            connections.settings[alias] = self.settings_for(base, mode, pool_size)
+            try:
+                if mode == "pool":
+                    warm_up([alias])
+                self.run(alias, mode, options["requests"], options["threads"])
+            finally:
+                if connections[alias].pool is not None:
+                    connections[alias].close_pool()
+                del connections.settings[alias]
+
+    @staticmethod
+    def settings_for(base, mode, pool_size):
+        settings = copy.deepcopy(base)
+        options = settings["OPTIONS"]
+        options.pop("pool", None)
+        settings["CONN_MAX_AGE"] = 0
+        if mode == "persistent":
+            settings["CONN_MAX_AGE"] = 600
+        elif mode == "pool":
+            options["pool"] = {"min_size": pool_size, "max_size": pool_size}
+        return settings
+
+    def run(self, alias, mode, total, threads):
+        def worker(count):
+            connection = connections[alias]
+            latencies = []
+            for _ in range(count):
+                started = time.perf_counter()
+                # request_started и request_finished вызывают close_old_connections
+                connection.close_if_unusable_or_obsolete()
+                Clinic.objects.using(alias).filter(pk=1).exists()
+                connection.close_if_unusable_or_obsolete()
+                latencies.append(time.perf_counter() - started)
+            connection.close()
+            return latencies
+
+        share = [total // threads + (i < total % threads) for i in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            latencies = [value for part in executor.map(worker, share) for value in part]
+        elapsed = time.perf_counter() - started
+
+        cuts = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{mode}: {total / elapsed:.0f} req/s, "
+            f"p50 {cuts[49] * 1000:.2f}ms, p99 {cuts[98] * 1000:.2f}ms"
+        )
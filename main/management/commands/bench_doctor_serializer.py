@@ -0,0 +1,74 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from main.models import Doctor
+from main.serializers.base import DoctorCreateUpdateSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def doctor_payload(run_id, i):
+    return {
+        'name': 'Bench',
+        'family': f'Doctor{i}',
+        'second_name': '-',
+        'email': f'bench-serializer-{run_id}-{i}@example.com',
+        'phone': f'+7916{i:07d}',
+        'password': 'bench-password',
+        'date_birth': '1980-01-01',
+        'date_start_work': '2005-01-01',
+        'salary': 1,
+        'specialty': 'bench',
+        'experience': 1,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Число запросов и время DoctorCreateUpdateSerializer для создания, "
+        "обновления и пакетного создания. Все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bulk', type=int, default=100)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        try:
+            with transaction.atomic():
+                self.measure('create', lambda: self.save(
+                    DoctorCreateUpdateSerializer(data=doctor_payload(run_id, 0))
+                ))
+                doctor = Doctor.objects.get(email=doctor_payload(run_id, 0)['email'])
+                self.measure('update', lambda: self.save(
+                    DoctorCreateUpdateSerializer(
+                        doctor, data={'salary': 2, 'email': doctor.email}, partial=True
+                    )
+                ))
+                self.measure(f'bulk create x{options["bulk"]}', lambda: self.save(
+                    DoctorCreateUpdateSerializer(
+                        data=[doctor_payload(run_id, i) for i in range(1, options['bulk'] + 1)],
+                        many=True,
+                    )
+                ))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, label, action):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            action()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label}: queries={len(queries)} time={elapsed * 1000:.1f}ms')
+
+    @staticmethod
+    def save(serializer):
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
@@ -0,0 +1,119 @@
+import random
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.models import Doctor, Education, EducationEntry
+from main.repositories.doctor import DoctorRepository
+
+UNIVERSITIES = [f"Медицинский университет №{i}" for i in range(200)]
+SPECIALTIES = [f"Специальность {i}" for i in range(60)]
+
+
+class Rollback(Exception):
+    pass
+
+
+def random_entry(names):
+    start = random.randint(1980, 2020)
+    return {
+        "name": random.choice(names),
+        "specialty": random.choice(SPECIALTIES),
+        "start_date": f"{start}-09-01",
+        "end_date": f"{start + random.randint(1, 6)}-06-30",
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Поиск врачей по образованию: фильтрация JSON history_education в Python "
+        "против индексированного запроса по EducationEntry. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--doctors", type=int, default=100_000)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options["doctors"], options["batch_size"])
+                self.compare()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, batch_size):
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            doctors = Doctor.objects.bulk_create([
+                Doctor(
+                    name="Bench",
+                    family=f"Doctor{i}",
+                    second_name="-",
+                    email=f"bench-edu-{run_id}-{i}@example.com",
+                    phone=f"+7918{i:07d}",
+                    password="-",
+                    date_birth=date(1970, 1, 1),
+                    date_start_work=date(1995, 1, 1),
+                    salary=1,
+                    specialty="bench",
+                    experience=1,
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            ])
+            educations = Education.objects.bulk_create([
+                Education(
+                    doctor=doctor,
+                    history_education={
+                        "universities": [random_entry(UNIVERSITIES)],
+                        "ordinator": [random_entry(UNIVERSITIES)],
+                        "advanced_training": [
+                            random_entry([f"Курс {i}" for i in range(100)])
+                            for _ in range(random.randint(0, 3))
+                        ],
+                    },
+                )
+                for doctor in doctors
+            ])
+            EducationEntry.objects.bulk_create(
+                [entry for education in educations for entry in EducationEntry.build(education)]
+            )
+        self.stdout.write(f"seeded {count} doctors in {time.perf_counter() - started:.1f}s")
+
+    def compare(self):
+        university, since_year = UNIVERSITIES[7], 2005
+
+        def json_scan():
+            since = date(since_year, 1, 1)
+            return {
+                doctor_id
+                for doctor_id, data in Education.objects.values_list(
+                    "doctor_id", "history_education"
+                ).iterator(chunk_size=2000)
+                if any(
+                    item["name"] == university
+                    and date.fromisoformat(item["start_date"]) >= since
+                    for item in data.get("universities", [])
+                )
+            }
+
+        def indexed():
+            return set(
+                DoctorRepository().trained_at(university, since_year).values_list("pk", flat=True)
+            )
+
+        results = {}
+        for label, action in (("json scan", json_scan), ("indexed query", indexed)):
+            started = time.perf_counter()
+            results[label] = action()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label}: {len(results[label])} doctors in {elapsed * 1000:.1f}ms"
+            )
+        if results["json scan"] != results["indexed query"]:
+            self.stderr.write("results differ")
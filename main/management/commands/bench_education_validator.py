@@ -0,0 +1,80 @@
+import timeit
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from main.validation_model import education_validator
+
+
+def legacy_validate(data, parse_dates=False):
+    """Прежняя проверка Education.clean (циклы validate_required_fields) для сравнения."""
+    if not isinstance(data, dict):
+        raise ValidationError("Поле 'history_education' должно быть объектом (словарём).")
+    for key in ("universities", "ordinator", "advanced_training"):
+        if key not in data:
+            raise ValidationError(f"Отсутствует обязательное поле: '{key}'.")
+        value = data[key]
+        if not isinstance(value, list):
+            raise ValidationError(f"Поле '{key}' должно быть списком.")
+        for i, item in enumerate(value):
+            if not isinstance(item, dict):
+                raise ValidationError(f"Элемент в списке '{key}[{i}]' должен быть объектом.")
+            for field in ("name", "specialty", "start_date", "end_date"):
+                if field not in item or not isinstance(item[field], str) or not item[field].strip():
+                    raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле '{field}'.")
+            if parse_dates:
+                date.fromisoformat(item["start_date"])
+                date.fromisoformat(item["end_date"])
+
+
+def make_document(entries):
+    item = {
+        "name": "Первый МГМУ им. Сеченова",
+        "specialty": "Лечебное дело",
+        "start_date": "2005-09-01",
+        "end_date": "2011-06-30",
+    }
+    return {
+        "universities": [dict(item) for _ in range(entries)],
+        "ordinator": [dict(item) for _ in range(entries)],
+        "advanced_training": [dict(item) for _ in range(entries)],
+    }
+
+
+class Command(BaseCommand):
+    help = "Сравнение скорости education_validator с прежними циклами проверки."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=10000)
+        parser.add_argument("--entries", type=int, default=3)
+
+    def handle(self, *args, **options):
+        documents = [make_document(options["entries"]) for _ in range(options["documents"])]
+
+        def legacy():
+            for document in documents:
+                legacy_validate(document)
+
+        def legacy_with_dates():
+            for document in documents:
+                legacy_validate(document, parse_dates=True)
+
+        def compiled():
+            for document in documents:
+                education_validator.validate(document)
+
+        def compiled_batch():
+            education_validator.errors_many(documents)
+
+        for label, action in (
+            ("legacy loops (no date parsing)", legacy),
+            ("legacy loops + date parsing", legacy_with_dates),
+            ("compiled validator", compiled),
+            ("compiled validator, batch", compiled_batch),
+        ):
+            elapsed = min(timeit.repeat(action, number=1, repeat=3))
+            self.stdout.write(
+                f"{label}: {len(documents) / elapsed:,.0f} docs/s "
+                f"({elapsed * 1e6 / len(documents):.1f} us/doc)"
+            )
@@ -0,0 +1,100 @@
+import resource
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from main.management.commands.bench_booking import Command as BookingBench
+from main.models import Consult
+from main.services.export import ExportService
+
+
+class Rollback(Exception):
+    pass
+
+
+class CountingSink:
+    """Приёмник выгрузки: считает байты, ничего не храня."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, line):
+        self.size += len(line)
+
+
+class Command(BaseCommand):
+    help = (
+        "Пиковая память выгрузки консультаций: список объектов ORM против "
+        "потоковой выгрузки ExportService. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consults", type=int, default=5_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--format", choices=ExportService.FORMATS, default="csv")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                clinic = self.seed(options["consults"], options["batch_size"])
+                # Потоковая выгрузка первой: ru_maxrss только растёт
+                self.measure("streaming", lambda sink: self.streaming(sink, clinic, options["format"]))
+                self.measure("orm list", lambda sink: self.orm_list(sink, clinic, options["format"]))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, label, export):
+        sink = CountingSink()
+        tracemalloc.start()
+        started = time.perf_counter()
+        export(sink)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f"{label}: {sink.size / 2 ** 20:.1f}MB written in {elapsed:.1f}s, "
+            f"peak python memory {peak / 2 ** 20:.1f}MB, process max rss {max_rss:.0f}MB"
+        )
+
+    @staticmethod
+    def streaming(sink, clinic, file_format):
+        service = ExportService()
+        columns, rows = service.consults(clinic=clinic.pk)
+        for line in service.lines(columns, rows, file_format):
+            sink.write(line)
+
+    @staticmethod
+    def orm_list(sink, clinic, file_format):
+        consults = list(Consult.objects.filter(clinic=clinic).order_by("start_date", "pk"))
+        rows = [
+            tuple(getattr(consult, column) for column in ExportService.CONSULT_COLUMNS)
+            for consult in consults
+        ]
+        for line in ExportService().lines(ExportService.CONSULT_COLUMNS, rows, file_format):
+            sink.write(line)
+
+    def seed(self, count, batch_size):
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        clinic, doctors, patient = BookingBench.create_fixtures(run_id, 50)
+        base = timezone.now().replace(second=0, microsecond=0)
+        for offset in range(0, count, batch_size):
+            Consult.objects.bulk_create([
+                Consult(
+                    doctor=doctors[index % len(doctors)],
+                    patient=patient,
+                    clinic=clinic,
+                    start_date=base + timedelta(minutes=5 * (index // len(doctors))),
+                    end_date=base + timedelta(minutes=5 * (index // len(doctors)) + 4),
+                )
+                for index in range(offset, min(offset + batch_size, count))
+            ])
+        self.stdout.write(f"seeded {count} consults in {time.perf_counter() - started:.1f}s")
+        return clinic
@@ -0,0 +1,63 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from main.authentication import JwtAuthentication
+from main.services.denylist import denylist
+from main.services.iwt import JwtAuth
+
+
+class RemoteJwtAuthentication(JwtAuthentication):
+    use_local_denylist = False
+
+
+class LocalView(APIView):
+    authentication_classes = [JwtAuthentication]
+
+    def get(self, request):
+        return Response({"user": request.user.id})
+
+
+class RemoteView(LocalView):
+    authentication_classes = [RemoteJwtAuthentication]
+
+
+class Command(BaseCommand):
+    help = (
+        "Аутентифицированные запросы в секунду: локальная проверка JWT с "
+        "фильтром denylist против запроса в Redis на каждый запрос."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--revoked", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        auth = JwtAuth()
+        expires_at = int(time.time()) + 3600
+        for _ in range(options["revoked"]):
+            denylist.revoke(uuid.uuid4().hex, expires_at)
+        denylist.sync(force=True)
+
+        token = auth._encode_jwt(
+            payload={"sub": "bench", "type": "access"},
+            expires_delta=timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+        factory = APIRequestFactory()
+        for label, view in (("redis per request", RemoteView), ("local path", LocalView)):
+            handler = view.as_view()
+            started = time.perf_counter()
+            for _ in range(options["requests"]):
+                response = handler(factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+                assert response.status_code == 200, response.data
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label}: {options['requests'] / elapsed:.0f} req/s")
+
+        auth.revoke_access_token(token)
+        response = LocalView.as_view()(factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+        self.stdout.write(f"revoked token -> HTTP {response.status_code}")
@@ -0,0 +1,108 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from main.management.commands.bench_booking import Command as BookingBench
+from main.models import Consult, Patient
+from main.pagination import KeysetPagination
+from main.views import ConsultListView, PatientListView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Пагинация Consult и Patient: время первой и глубокой страницы через "
+        "OFFSET против курсора по ключу. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--page", type=int, default=10_000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options["rows"], options["batch_size"])
+                for view, queryset, ordering in (
+                    (ConsultListView, Consult.objects.all(), ("start_date", "pk")),
+                    (PatientListView, Patient.objects.all(), ("family", "name", "second_name", "pk")),
+                ):
+                    self.compare(view, queryset, ordering, options["page_size"], options["page"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def compare(self, view, queryset, ordering, page_size, page):
+        label = queryset.model._meta.model_name
+        factory = APIRequestFactory()
+        handler = view.as_view()
+        ordered = queryset.order_by(*ordering)
+
+        for number in (1, page):
+            offset = (number - 1) * page_size
+            started = time.perf_counter()
+            rows = list(ordered[offset: offset + page_size])
+            offset_elapsed = time.perf_counter() - started
+
+            params = {"page_size": page_size}
+            if offset:
+                # Курсор страницы - ключ последней строки предыдущей страницы
+                last = ordered[offset - 1]
+                fields = [KeysetPagination._field(queryset.model, name) for name in ordering]
+                params["cursor"] = KeysetPagination.encode_cursor(
+                    [field.value_to_string(last) for field in fields]
+                )
+            started = time.perf_counter()
+            response = handler(factory.get("/", params))
+            keyset_elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.data
+            assert [row["id"] for row in response.data["results"]] == [row.pk for row in rows]
+
+            self.stdout.write(
+                f"{label} page {number}: offset {offset_elapsed * 1000:.1f}ms, "
+                f"keyset {keyset_elapsed * 1000:.1f}ms"
+            )
+
+    def seed(self, count, batch_size):
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        clinic, doctors, patient = BookingBench.create_fixtures(run_id, 20)
+        base = timezone.now().replace(second=0, microsecond=0)
+        families = [f"Фамилия{i}" for i in range(500)]
+        names = [f"Имя{i}" for i in range(50)]
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            Patient.objects.bulk_create([
+                Patient(
+                    name=random.choice(names),
+                    family=random.choice(families),
+                    second_name="-",
+                    email=f"bench-page-{run_id}-{offset + i}@example.com",
+                    password="-",
+                    tag_social="@bench",
+                )
+                for i in range(size)
+            ])
+            Consult.objects.bulk_create([
+                Consult(
+                    doctor=doctors[(offset + i) % len(doctors)],
+                    patient=patient,
+                    clinic=clinic,
+                    # У каждого врача свой шаг: start_date повторяются у разных врачей
+                    start_date=base + timedelta(minutes=5 * ((offset + i) // len(doctors))),
+                    end_date=base + timedelta(minutes=5 * ((offset + i) // len(doctors)) + 4),
+                )
+                for i in range(size)
+            ])
+        self.stdout.write(f"seeded {count} consults and patients in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from main.services.passwords import PasswordHashingService
+
+
+class Command(BaseCommand):
+    help = (
+        "Пропускная способность хеширования паролей: по одному, пачкой в пуле "
+        "процессов, асинхронно и с профилем seeding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=64)
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        passwords = [f"bench-password-{i}" for i in range(count)]
+        service = PasswordHashingService()
+
+        # Прогрев пула процессов, чтобы не учитывать его запуск
+        service.hash_many(passwords[:service.min_pool_batch])
+
+        self.measure("single", count, lambda: [service.hash_one(p) for p in passwords])
+        self.measure("bulk (process pool)", count, lambda: service.hash_many(passwords))
+        self.measure("async", count, lambda: asyncio.run(service.ahash_many(passwords)))
+        with override_settings(
+            PASSWORD_HASHERS=["main.hashers.SeedingPBKDF2PasswordHasher"]
+        ):
+            self.measure("single (seeding)", count, lambda: [service.hash_one(p) for p in passwords])
+            self.measure("bulk (seeding)", count, lambda: service.hash_many(passwords))
+
+    def measure(self, label, count, action):
+        started = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label}: {count / elapsed:.1f} hashes/s ({elapsed:.2f}s)")
@@ -0,0 +1,113 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from main.models import Patient
+from main.services.search import PersonSearchService, has_trigram
+
+FAMILIES = [
+    f"{stem}{suffix}"
+    for stem in ("Иван", "Петр", "Сидор", "Смирн", "Кузнец", "Попов", "Васил", "Соколов",
+                 "Михайл", "Новик", "Федор", "Морозов", "Волков", "Алекс", "Лебед", "Семен",
+                 "Егор", "Павл", "Козл", "Степан", "Николаев", "Орл", "Андре", "Макар", "Никит")
+    for suffix in ("ов", "ова", "енко", "ин", "ина", "ский", "ская", "ович")
+]
+NAMES = ["Иван", "Пётр", "Анна", "Мария", "Сергей", "Ольга", "Дмитрий", "Елена", "Алексей",
+         "Татьяна", "Андрей", "Наталья", "Михаил", "Ирина", "Николай", "Светлана"]
+PATRONYMICS = ["Иванович", "Петровна", "Сергеевич", "Алексеевна", "Дмитриевич", "Андреевна",
+               "Михайлович", "Николаевна", "Олегович", "Викторовна"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Поиск пациентов: задержка PersonSearchService (полнотекстовый и "
+        "триграммный поиск в PostgreSQL) против icontains по всем полям на "
+        "--patients пациентах. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patients", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options["patients"], options["batch_size"])
+                if connection.vendor == "postgresql":
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"ANALYZE {Patient._meta.db_table}")
+                    self.stdout.write(f"pg_trgm: {has_trigram(connection.alias)}")
+                self.compare(options["repeat"], options["patients"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def compare(self, repeat, count):
+        service = PersonSearchService(limit=20)
+        queries = {
+            "family prefix": lambda: random.choice(FAMILIES)[:5],
+            "family + name": lambda: f"{random.choice(FAMILIES)} {random.choice(NAMES)}",
+            "typo": lambda: random.choice(FAMILIES)[:-1] + "ы",
+            "full phone": lambda: f"8 (977) {random.randrange(count):07d}",
+            "phone part": lambda: f"{random.randrange(10 ** 6):06d}",
+            "tag": lambda: f"@user{random.randrange(10 ** 5)}",
+        }
+        for label, make in queries.items():
+            terms = [make() for _ in range(repeat)]
+            baseline = self.timed(terms, self.icontains)
+            searched = self.timed(terms, lambda term: service.search(term, kinds=("patient",)))
+            self.stdout.write(
+                f"{label}: icontains p50 {baseline[0]:.1f}ms p95 {baseline[1]:.1f}ms, "
+                f"search p50 {searched[0]:.1f}ms p95 {searched[1]:.1f}ms"
+            )
+
+    @staticmethod
+    def icontains(term):
+        term = term.lstrip("@")
+        return list(
+            Patient.objects.filter(
+                Q(family__icontains=term)
+                | Q(name__icontains=term)
+                | Q(second_name__icontains=term)
+                | Q(phone__contains=term)
+                | Q(tag_social__icontains=term)
+            ).values("id", "family", "name", "second_name", "phone")[:20]
+        )
+
+    @staticmethod
+    def timed(terms, func):
+        timings = []
+        for term in terms:
+            started = time.perf_counter()
+            func(term)
+            timings.append((time.perf_counter() - started) * 1000)
+        cuts = statistics.quantiles(timings, n=20)
+        return statistics.median(timings), cuts[18]
+
+    def seed(self, count, batch_size):
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            Patient.objects.bulk_create([
+                Patient(
+                    family=random.choice(FAMILIES),
+                    name=random.choice(NAMES),
+                    second_name=random.choice(PATRONYMICS),
+                    email=f"bench-search-{run_id}-{i}@example.com",
+                    phone=f"+7977{i:07d}",
+                    password="-",
+                    tag_social=f"@user{i}",
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            ])
+        self.stdout.write(f"seeded {count} patients in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,41 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from main.services.export import ExportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоковая выгрузка консультаций или пациентов в CSV/JSONL "
+        "с фильтрами по клинике, врачу и датам начала консультаций."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["consults", "patients"])
+        parser.add_argument("--output", default="-", help="Путь к файлу или '-' для stdout")
+        parser.add_argument("--format", choices=ExportService.FORMATS, default=None)
+        parser.add_argument("--clinic", type=int)
+        parser.add_argument("--doctor", type=int)
+        parser.add_argument("--date-from", type=date.fromisoformat)
+        parser.add_argument("--date-to", type=date.fromisoformat)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        file_format = options["format"] or ("jsonl" if path.endswith(".jsonl") else "csv")
+        service = ExportService(chunk_size=options["chunk_size"])
+        columns, rows = getattr(service, options["kind"])(
+            clinic=options["clinic"],
+            doctor=options["doctor"],
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+        )
+        stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        try:
+            for line in service.lines(columns, rows, file_format):
+                stream.write(line)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
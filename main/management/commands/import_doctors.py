@@ -0,0 +1,80 @@
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from main.serializers.base import DoctorCreateUpdateSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Пакетный импорт врачей с образованием из CSV или JSONL. "
+        "Ошибочные строки выводятся и пропускаются, остальные сохраняются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу или '-' для stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        try:
+            rows = self.read_csv(stream) if file_format == "csv" else self.read_jsonl(stream)
+            created, failed = self.import_rows(rows, options["batch_size"])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(f"created={created} failed={failed}"))
+
+    def import_rows(self, rows, batch_size):
+        serializer = DoctorCreateUpdateSerializer(many=True)
+        created = failed = 0
+        offset = 0
+        while batch := list(islice(rows, batch_size)):
+            valid, errors = serializer.validate_rows(batch)
+            for index, row_errors in sorted(errors.items()):
+                self.report(offset + index + 1, row_errors)
+            failed += len(errors)
+            if valid:
+                try:
+                    serializer.bulk_create(data for _, data in valid)
+                    created += len(valid)
+                except DatabaseError as exc:
+                    for index, _ in valid:
+                        self.report(offset + index + 1, str(exc))
+                    failed += len(valid)
+            offset += len(batch)
+        return created, failed
+
+    def report(self, row, errors):
+        self.stderr.write(
+            json.dumps({"row": row, "errors": errors}, ensure_ascii=False, default=str)
+        )
+
+    @staticmethod
+    def read_csv(stream):
+        """Строки CSV; колонка education содержит JSON, пустые значения отбрасываются."""
+        for row in csv.DictReader(stream):
+            data = {key: value for key, value in row.items() if value not in ("", None)}
+            if "education" in data:
+                try:
+                    data["education"] = json.loads(data["education"])
+                except json.JSONDecodeError:
+                    pass  # ошибку формата вернёт сериализатор
+            yield data
+
+    @staticmethod
+    def read_jsonl(stream):
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line  # сериализатор отклонит строку как некорректную запись
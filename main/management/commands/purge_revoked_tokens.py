@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.services.denylist import denylist
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаление из denylist в Redis записей об отозванных токенах, срок "
+        "действия которых уже истёк (запускать по расписанию)."
+    )
+
+    def handle(self, *args, **options):
+        removed = denylist.purge_expired()
+        self.stdout.write(f"purged {removed} revoked tokens")
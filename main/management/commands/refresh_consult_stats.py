@@ -0,0 +1,34 @@
+import time
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.services.stats import ConsultStatsService
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновление сводки ConsultDailyStats: по умолчанию пересчитываются "
+        "ключи приёмов, изменённых с прошлого запуска (запускать по расписанию); "
+        "--full пересчитывает сводку целиком или за диапазон дней."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true")
+        parser.add_argument("--since", type=datetime.fromisoformat)
+        parser.add_argument("--date-from", type=date.fromisoformat)
+        parser.add_argument("--date-to", type=date.fromisoformat)
+
+    def handle(self, *args, **options):
+        service = ConsultStatsService()
+        started = time.perf_counter()
+        if options["full"]:
+            count = service.rebuild(options["date_from"], options["date_to"])
+            self.stdout.write(f"rebuilt {count} rows in {time.perf_counter() - started:.1f}s")
+        else:
+            since = options["since"]
+            if since is not None and timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            count = service.refresh_changed(since)
+            self.stdout.write(f"refreshed {count} keys in {time.perf_counter() - started:.1f}s")
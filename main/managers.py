@@ -0,0 +1,66 @@
+from django.db import models
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Отправляется после массового мягкого удаления: sender - модель, pks - список pk.
+# queryset.update() не вызывает post_save, поэтому кеши подписываются на этот сигнал.
+post_soft_delete = Signal()
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def alive(self):
+        """Только неудалённые записи."""
+        return self.filter(is_deleted=False)
+
+    def deleted(self):
+        """Только мягко удалённые записи."""
+        return self.filter(is_deleted=True)
+
+    def soft_delete(self):
+        """Мягкое удаление всей выборки одним UPDATE. Возвращает число строк."""
+        values = self._soft_delete_values()
+        if not post_soft_delete.has_listeners(self.model):
+            return self.alive().update(**values)
+        pks = list(self.alive().values_list("pk", flat=True))
+        if not pks:
+            return 0
+        count = self.model._base_manager.filter(pk__in=pks).update(**values)
+        post_soft_delete.send(sender=self.model, pks=pks)
+        return count
+
+    def _soft_delete_values(self):
+        # update() не заполняет auto_now: без этого задания по update_date
+        # (ConsultStatsService.refresh_changed) не увидят удаление
+        values = {"is_deleted": True}
+        now = timezone.now()
+        for field in self.model._meta.concrete_fields:
+            if getattr(field, "auto_now", False):
+                is_datetime = isinstance(field, models.DateTimeField)
+                values[field.attname] = now if is_datetime else timezone.localdate(now)
+        return values
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Менеджер objects: по умолчанию возвращает только живые записи.
+
+    Удалённые записи доступны через deleted() и all_with_deleted().
+    Проверки уникальности и админка работают через all_objects
+    (Meta.default_manager_name), так как ограничения в бд учитывают
+    и удалённые строки.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+    def alive(self):
+        return self.get_queryset()
+
+    def all_with_deleted(self):
+        return self._queryset_class(self.model, using=self._db)
+
+    def deleted(self):
+        return self.all_with_deleted().deleted()
+
+
+AllObjectsManager = models.Manager.from_queryset(SoftDeleteQuerySet)
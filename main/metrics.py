@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
+
+# Границы корзин гистограммы длительности запросов, сек
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestMetrics:
+    """Счётчики одного HTTP-запроса: бд, кеш Redis, хеширование паролей."""
+    queries: int = 0
+    query_time: float = 0.0
+    cache_calls: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_time: float = 0.0
+    hashes: int = 0
+    hash_time: float = 0.0
+
+
+# Счётчики текущего запроса. ContextVar, а не threading.local: sync_to_async
+# копирует контекст в поток, и запросы асинхронных представлений к бд
+# попадают в счётчики своего HTTP-запроса
+_current: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+_in_cache_call: ContextVar[bool] = ContextVar("in_cache_call", default=False)
+
+
+def current() -> RequestMetrics | None:
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """Собирает в новый RequestMetrics всё, что выполняется внутри блока."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+# Блок записи событий
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper, установленный на каждое соединение (см.
+    install_query_recorder). Вне collect() ничего не считает.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_time += time.perf_counter() - started
+
+
+def install_query_recorder(connection) -> None:
+    """
+    Ставит record_query на соединение (см. main.signals). Обёртка ставится
+    первой в списке: query_budget и другие execute_wrapper снимают
+    последнюю обёртку, а эта остаётся на соединении до конца его жизни.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def cache_call():
+    """
+    Время одного обращения к Redis; попадания и промахи - record_cache_lookup.
+    Вложенные вызовы (add через set, set_many в конвейере) не считаются
+    отдельно; значение блока - True для внешнего вызова.
+    """
+    metrics = _current.get()
+    if metrics is None or _in_cache_call.get():
+        yield False
+        return
+    token = _in_cache_call.set(True)
+    started = time.perf_counter()
+    try:
+        yield True
+    finally:
+        _in_cache_call.reset(token)
+        metrics.cache_calls += 1
+        metrics.cache_time += time.perf_counter() - started
+
+
+def record_cache_lookup(hits: int, misses: int) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+@contextmanager
+def password_hashing(count: int = 1):
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.hashes += count
+            metrics.hash_time += time.perf_counter() - started
+
+
+# Блок Server-Timing
+def server_timing(metrics: RequestMetrics, duration: float) -> str:
+    """Значение заголовка Server-Timing; длительности в миллисекундах."""
+    parts = [
+        f'db;dur={metrics.query_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'cache;dur={metrics.cache_time * 1000:.1f};'
+        f'desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+    ]
+    if metrics.hashes:
+        parts.append(f'hash;dur={metrics.hash_time * 1000:.1f};desc="{metrics.hashes} passwords"')
+    parts.append(f"total;dur={duration * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# Блок агрегатов процесса
+@dataclass
+class ViewTotals:
+    requests: int = 0
+    duration: float = 0.0
+    buckets: list = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+    budget_exceeded: int = 0
+    metrics: RequestMetrics = field(default_factory=RequestMetrics)
+
+
+class MetricsRegistry:
+    """
+    Суммы RequestMetrics по представлениям с момента запуска процесса.
+
+    Счётчики свои у каждого процесса воркера: Prometheus опрашивает
+    процессы по отдельности или суммирует их на стороне сбора.
+    """
+
+    def __init__(self):
+        self._views = defaultdict(ViewTotals)
+        self._lock = threading.Lock()
+
+    def observe(self, view: str, metrics: RequestMetrics, duration: float, over_budget: bool) -> None:
+        with self._lock:
+            totals = self._views[view]
+            totals.requests += 1
+            totals.duration += duration
+            totals.budget_exceeded += over_budget
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    totals.buckets[index] += 1
+            for item in fields(RequestMetrics):
+                setattr(
+                    totals.metrics,
+                    item.name,
+                    getattr(totals.metrics, item.name) + getattr(metrics, item.name),
+                )
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                view: ViewTotals(
+                    requests=totals.requests,
+                    duration=totals.duration,
+                    buckets=list(totals.buckets),
+                    budget_exceeded=totals.budget_exceeded,
+                    metrics=RequestMetrics(**vars(totals.metrics)),
+                )
+                for view, totals in self._views.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+# Имя метрики Prometheus, тип, описание и значение из ViewTotals
+VIEW_METRICS = (
+    ("mis_http_requests_total", "counter", "HTTP-запросы", lambda t: t.requests),
+    ("mis_db_queries_total", "counter", "SQL-запросы", lambda t: t.metrics.queries),
+    ("mis_db_query_seconds_total", "counter", "Время SQL-запросов", lambda t: t.metrics.query_time),
+    ("mis_cache_calls_total", "counter", "Обращения к Redis", lambda t: t.metrics.cache_calls),
+    ("mis_cache_hits_total", "counter", "Попадания в кеш Redis", lambda t: t.metrics.cache_hits),
+    ("mis_cache_misses_total", "counter", "Промахи кеша Redis", lambda t: t.metrics.cache_misses),
+    ("mis_cache_seconds_total", "counter", "Время обращений к Redis", lambda t: t.metrics.cache_time),
+    ("mis_password_hashes_total", "counter", "Хеширования паролей", lambda t: t.metrics.hashes),
+    ("mis_password_hash_seconds_total", "counter", "Время хеширования паролей", lambda t: t.metrics.hash_time),
+    ("mis_query_budget_exceeded_total", "counter", "Запросы сверх QUERY_BUDGETS", lambda t: t.budget_exceeded),
+)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """
+    Текстовый формат Prometheus: суммы по представлениям, гистограмма
+    длительности, счётчики кеша репозиториев и состояние пулов соединений.
+    """
+    from main.db_pool import pool_stats
+    from main.repositories.cached import cache_stats
+
+    views = registry.snapshot()
+    lines = []
+    for name, kind, help_text, value in VIEW_METRICS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for view, totals in sorted(views.items()):
+            lines.append(f'{name}{{view="{_escape_label(view)}"}} {value(totals)}')
+
+    name = "mis_http_request_duration_seconds"
+    lines += [f"# HELP {name} Длительность HTTP-запросов", f"# TYPE {name} histogram"]
+    for view, totals in sorted(views.items()):
+        label = f'view="{_escape_label(view)}"'
+        for bound, count in zip(DURATION_BUCKETS, totals.buckets):
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {totals.requests}')
+        lines.append(f"{name}_sum{{{label}}} {totals.duration}")
+        lines.append(f"{name}_count{{{label}}} {totals.requests}")
+
+    name = "mis_repository_cache_events_total"
+    lines += [f"# HELP {name} Попадания и промахи кеша репозиториев", f"# TYPE {name} counter"]
+    for key, count in sorted(dict(cache_stats).items()):
+        label, _, event = key.rpartition(":")
+        lines.append(f'{name}{{model="{_escape_label(label)}",event="{_escape_label(event)}"}} {count}')
+
+    pools = pool_stats()
+    for stat in sorted({stat for stats in pools.values() for stat in stats}):
+        name = f"mis_db_pool_{stat}"
+        lines.append(f"# TYPE {name} gauge")
+        for alias, stats in sorted(pools.items()):
+            if stat in stats:
+                lines.append(f'{name}{{alias="{_escape_label(alias)}"}} {stats[stat]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,64 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from main import metrics
+from main.query_budget import QueryBudgetExceeded
+
+
+class RequestMetricsMiddleware:
+    """
+    Число и время SQL-запросов, обращения к Redis (попадания, промахи,
+    время) и время хеширования паролей для каждого запроса.
+
+    Результат - заголовок Server-Timing (SERVER_TIMING) и суммы по
+    представлениям для /api/metrics/. Бюджет запросов представления берётся
+    из QUERY_BUDGETS по имени маршрута; превышение считается в метриках,
+    а при QUERY_BUDGET_ENFORCE (тесты, см. main.testing) - ошибка
+    QueryBudgetExceeded. У потоковых ответов учитывается только работа
+    до начала отдачи тела.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with metrics.collect() as collected:
+            response = self.get_response(request)
+        return self.finish(request, response, collected, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with metrics.collect() as collected:
+            response = await self.get_response(request)
+        return self.finish(request, response, collected, time.perf_counter() - started)
+
+    @staticmethod
+    def view_name(request) -> str:
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name or match.route
+
+    def finish(self, request, response, collected, duration):
+        view = self.view_name(request)
+        budget = settings.QUERY_BUDGETS.get(view)
+        over_budget = budget is not None and collected.queries > budget
+        metrics.registry.observe(view, collected, duration, over_budget)
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = metrics.server_timing(collected, duration)
+        if over_budget and settings.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(
+                f"Превышен бюджет запросов представления {view}: "
+                f"{collected.queries} из {budget}."
+            )
+        return response
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+# Исключающее ограничение работает только в PostgreSQL (GiST + btree_gist),
+# на других СУБД остаётся проверка пересечений в Consult.clean.
+CREATE_EXCLUSION_SQL = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+UPDATE main_consult
+    SET end_date = start_date + interval '4 minutes'
+    WHERE end_date IS NULL;
+ALTER TABLE main_consult
+    ADD CONSTRAINT consult_doctor_no_overlap
+    EXCLUDE USING gist (
+        doctor_id WITH =,
+        tstzrange(start_date, end_date, '[)') WITH &&
+    )
+    WHERE (NOT is_deleted);
+"""
+
+DROP_EXCLUSION_SQL = """
+ALTER TABLE main_consult DROP CONSTRAINT IF EXISTS consult_doctor_no_overlap;
+"""
+
+
+def create_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_EXCLUSION_SQL)
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_EXCLUSION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_alter_education_history_education"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="consult",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["doctor", "start_date", "end_date"],
+                name="consult_doctor_interval_idx",
+            ),
+        ),
+        migrations.RunPython(
+            create_exclusion_constraint, drop_exclusion_constraint
+        ),
+    ]
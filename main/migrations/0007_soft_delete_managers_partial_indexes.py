@@ -0,0 +1,100 @@
+import django.db.models.manager
+from django.db import migrations, models
+
+
+def alive_index(fields, name):
+    return models.Index(
+        condition=models.Q(("is_deleted", False)), fields=fields, name=name
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_consult_overlap_engine"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="admin",
+            options={"default_manager_name": "all_objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="clinic",
+            options={"default_manager_name": "all_objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="consult",
+            options={"default_manager_name": "all_objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="doctor",
+            options={"default_manager_name": "all_objects"},
+        ),
+        migrations.AlterModelOptions(
+            name="patient",
+            options={"default_manager_name": "all_objects"},
+        ),
+        migrations.AlterModelManagers(
+            name="admin",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name="clinic",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name="consult",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name="doctor",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name="patient",
+            managers=[
+                ("all_objects", django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="admin",
+            index=alive_index(["email"], "main_admin_email_alive"),
+        ),
+        migrations.AddIndex(
+            model_name="admin",
+            index=alive_index(["phone"], "main_admin_phone_alive"),
+        ),
+        migrations.AddIndex(
+            model_name="doctor",
+            index=alive_index(["email"], "main_doctor_email_alive"),
+        ),
+        migrations.AddIndex(
+            model_name="doctor",
+            index=alive_index(["phone"], "main_doctor_phone_alive"),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=alive_index(["email"], "main_patient_email_alive"),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=alive_index(["phone"], "main_patient_phone_alive"),
+        ),
+        migrations.AddIndex(
+            model_name="clinic",
+            index=alive_index(["name"], "clinic_name_alive_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="consult",
+            index=alive_index(["start_date"], "consult_start_alive_idx"),
+        ),
+    ]
@@ -0,0 +1,116 @@
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SECTIONS = ("universities", "ordinator", "advanced_training")
+
+
+def backfill_entries(apps, schema_editor):
+    Education = apps.get_model("main", "Education")
+    EducationEntry = apps.get_model("main", "EducationEntry")
+    max_lengths = {
+        field: EducationEntry._meta.get_field(field).max_length for field in ("name", "specialty")
+    }
+    batch = []
+    for education in Education.objects.order_by("pk").iterator(chunk_size=1000):
+        data = education.history_education
+        if not isinstance(data, dict):
+            continue
+        for section in SECTIONS:
+            for item in data.get(section) or []:
+                try:
+                    # Слишком длинные значения не влезут в колонку: DataError
+                    # в PostgreSQL прервал бы всю миграцию
+                    if any(len(item[field].strip()) > limit for field, limit in max_lengths.items()):
+                        continue
+                    batch.append(
+                        EducationEntry(
+                            education_id=education.pk,
+                            doctor_id=education.doctor_id,
+                            section=section,
+                            name=item["name"].strip(),
+                            specialty=item["specialty"].strip(),
+                            start_date=datetime.date.fromisoformat(item["start_date"]),
+                            end_date=datetime.date.fromisoformat(item["end_date"]),
+                        )
+                    )
+                except (KeyError, TypeError, AttributeError, ValueError):
+                    # Старые записи, не прошедшие бы текущую схему, не индексируются
+                    continue
+        if len(batch) >= 1000:
+            EducationEntry.objects.bulk_create(batch)
+            batch = []
+    EducationEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0007_soft_delete_managers_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EducationEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "section",
+                    models.CharField(max_length=32, verbose_name="Раздел образования"),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=500, verbose_name="Учебное заведение или курс"
+                    ),
+                ),
+                (
+                    "specialty",
+                    models.CharField(max_length=500, verbose_name="Специальность"),
+                ),
+                ("start_date", models.DateField(verbose_name="Дата начала обучения")),
+                ("end_date", models.DateField(verbose_name="Дата окончания обучения")),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="main.doctor",
+                        verbose_name="ForeignKey на врача",
+                    ),
+                ),
+                (
+                    "education",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entries",
+                        to="main.education",
+                        verbose_name="ForeignKey на образование",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["section", "name", "start_date"],
+                        include=["doctor"],
+                name="education_entry_name_idx",
+                    ),
+                    models.Index(
+                        fields=["section", "specialty", "start_date"],
+                        include=["doctor"],
+                name="education_entry_specialty_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
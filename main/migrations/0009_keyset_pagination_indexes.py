@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+FIO = ["family", "name", "second_name", "id"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0008_educationentry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="admin",
+            index=models.Index(fields=FIO, name="main_admin_fio"),
+        ),
+        migrations.AddIndex(
+            model_name="doctor",
+            index=models.Index(fields=FIO, name="main_doctor_fio"),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(fields=FIO, name="main_patient_fio"),
+        ),
+        # Индекс по start_date заменяется составным (start_date, id)
+        migrations.RemoveIndex(
+            model_name="consult",
+            name="consult_start_alive_idx",
+        ),
+        migrations.AddIndex(
+            model_name="consult",
+            index=models.Index(fields=["start_date", "id"], name="consult_start_id_idx"),
+        ),
+    ]
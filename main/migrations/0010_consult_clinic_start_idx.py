@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0009_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="consult",
+            index=models.Index(
+                fields=["clinic", "start_date", "id"], name="consult_clinic_start_idx"
+            ),
+        ),
+    ]
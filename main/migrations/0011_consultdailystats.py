@@ -0,0 +1,105 @@
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DurationField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+DEFAULT_DURATION = datetime.timedelta(minutes=4)
+
+
+def backfill_stats(apps, schema_editor):
+    Consult = apps.get_model("main", "Consult")
+    ConsultDailyStats = apps.get_model("main", "ConsultDailyStats")
+    alive = Q(is_deleted=False)
+    end_date = Coalesce("end_date", F("start_date") + DEFAULT_DURATION)
+    rows = (
+        Consult._default_manager.annotate(day=TruncDate("start_date"))
+        .values("clinic_id", "doctor_id", "day")
+        .annotate(
+            consults=Count("pk", filter=alive),
+            cancelled=Count("pk", filter=~alive),
+            busy=Sum(end_date - F("start_date"), filter=alive, output_field=DurationField()),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=5000):
+        row["busy"] = row["busy"] or datetime.timedelta()
+        batch.append(ConsultDailyStats(**row))
+        if len(batch) >= 5000:
+            ConsultDailyStats.objects.bulk_create(batch)
+            batch = []
+    ConsultDailyStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0010_consult_clinic_start_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="consult",
+            index=models.Index(fields=["update_date"], name="consult_update_date_idx"),
+        ),
+        migrations.CreateModel(
+            name="ConsultDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День")),
+                (
+                    "consults",
+                    models.IntegerField(default=0, verbose_name="Число живых приёмов"),
+                ),
+                (
+                    "cancelled",
+                    models.IntegerField(default=0, verbose_name="Число отменённых приёмов"),
+                ),
+                (
+                    "busy",
+                    models.DurationField(
+                        default=datetime.timedelta,
+                        verbose_name="Суммарная длительность живых приёмов",
+                    ),
+                ),
+                (
+                    "clinic",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="main.clinic",
+                        verbose_name="ForeignKey на клинику",
+                    ),
+                ),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="main.doctor",
+                        verbose_name="ForeignKey на врача",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["doctor", "day"], name="consult_stats_doctor_day_idx"),
+                    models.Index(fields=["day"], name="consult_stats_day_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=["clinic", "doctor", "day"], name="consult_stats_key"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
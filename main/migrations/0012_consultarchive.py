@@ -0,0 +1,72 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0011_consultdailystats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConsultArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="id исходного приёма"
+                    ),
+                ),
+                ("create_date", models.DateTimeField(verbose_name="Дата создания консультации")),
+                ("update_date", models.DateTimeField(verbose_name="Дата обновления консультации")),
+                ("start_date", models.DateTimeField(verbose_name="Дата начала консультации")),
+                (
+                    "end_date",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Дата конца консультации"
+                    ),
+                ),
+                (
+                    "is_deleted",
+                    models.BooleanField(
+                        default=False, verbose_name="флаг удалённости консультации"
+                    ),
+                ),
+                ("archived_date", models.DateTimeField(verbose_name="Дата переноса в архив")),
+                (
+                    "clinic",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="main.clinic",
+                        verbose_name="ForeignKey на клинику",
+                    ),
+                ),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="main.doctor",
+                        verbose_name="ForeignKey на врача",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="main.patient",
+                        verbose_name="ForeignKey на пациента",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["doctor", "start_date"], name="consult_arch_doctor_start_idx"
+                    ),
+                    models.Index(fields=["start_date", "id"], name="consult_arch_start_id_idx"),
+                ],
+            },
+        ),
+    ]
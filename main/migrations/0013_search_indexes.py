@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Выражения совпадают с main.services.search: иначе планировщик не возьмёт индекс.
+# Полнотекстовый индекс по ФИО работает без расширений. Триграммные индексы
+# (pg_trgm) создаются, только если расширение доступно на сервере; без них
+# поиск по части слова, телефону и тегу идёт перебором (ILIKE).
+FIO = """("family" || ' ' || "name" || ' ' || "second_name")"""
+
+TSVECTOR_INDEXES = {
+    "main_patient_fio_tsv": "main_patient",
+    "main_doctor_fio_tsv": "main_doctor",
+}
+
+TRIGRAM_INDEXES = {
+    "main_patient_fio_trgm": ("main_patient", FIO),
+    "main_patient_phone_trgm": ("main_patient", '"phone"'),
+    "main_patient_tag_trgm": ("main_patient", '"tag_social"'),
+    "main_doctor_fio_trgm": ("main_doctor", FIO),
+    "main_doctor_phone_trgm": ("main_doctor", '"phone"'),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table in TSVECTOR_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f"USING gin (to_tsvector('simple'::regconfig, {FIO})) "
+            'WHERE NOT "is_deleted"'
+        )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, (table, expression) in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f"USING gin (({expression}) gin_trgm_ops) "
+            'WHERE NOT "is_deleted"'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in [*TSVECTOR_INDEXES, *TRIGRAM_INDEXES]:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0012_consultarchive"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
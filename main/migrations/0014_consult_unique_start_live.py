@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0013_search_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="consult",
+            name="unique_doctor_start_date",
+        ),
+        migrations.AddConstraint(
+            model_name="consult",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_deleted", False)),
+                fields=("doctor", "start_date"),
+                name="unique_doctor_start_date",
+            ),
+        ),
+    ]
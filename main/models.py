@@ -1,16 +1,19 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.db.models import CASCADE
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
+from main.managers import AllObjectsManager, SoftDeleteManager, SoftDeleteQuerySet
 from main.validation_model import (
-validate_required_fields,
-validate_optional_field,
+EDUCATION_TEXT_MAX_LENGTH,
+education_validator,
 validate_social_tag,
 )
 
 import json
 from django.core.serializers.json import DjangoJSONEncoder
-from datetime import timedelta
+from datetime import date, timedelta
 
 
 
@@ -45,8 +48,30 @@ class BaseModel(models.Model):
         default=False, verbose_name="Флаг удаленности аккаунта пользователя"
     )
 
+    objects = SoftDeleteManager()
+    all_objects = AllObjectsManager()
+
     class Meta:
         abstract = True
+        default_manager_name = "all_objects"
+        indexes = [
+            models.Index(
+                fields=["email"],
+                condition=models.Q(is_deleted=False),
+                name="%(app_label)s_%(class)s_email_alive",
+            ),
+            models.Index(
+                fields=["phone"],
+                condition=models.Q(is_deleted=False),
+                name="%(app_label)s_%(class)s_phone_alive",
+            ),
+            # Сортировка списков и пагинация по ключу (фамилия, имя, отчество, id);
+            # без условия, так как админка показывает и удалённые записи
+            models.Index(
+                fields=["family", "name", "second_name", "id"],
+                name="%(app_label)s_%(class)s_fio",
+            ),
+        ]
 
 
 class Doctor(BaseModel):
@@ -74,8 +99,8 @@ class Doctor(BaseModel):
                 "Дата начала работы не может быть позже даты окончания работы."
             )
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, validate_unique=True, **kwargs):
+        self.full_clean(validate_unique=validate_unique)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -94,29 +119,90 @@ class Education(models.Model):
 
     def clean(self):
         super().clean()
-        data = self.history_education
-
-        # Проверка типа
-        if not isinstance(data, dict):
-            raise ValidationError(
-                "Поле 'history_education' должно быть объектом (словарём)."
-            )
-
-        required_fields = ["universities", "ordinator"]
-        optional_fields = ["advanced_training"]
-        for key in required_fields:
-            validate_required_fields(key=key, data=data)
-        for key in optional_fields:
-            validate_optional_field(key=key, data=data)
+        education_validator.validate(self.history_education)
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_entries()
+
+    def sync_entries(self):
+        """Пересобирает денормализованные записи EducationEntry из JSON."""
+        self.entries.all().delete()
+        EducationEntry.objects.bulk_create(EducationEntry.build(self))
 
     def __str__(self):
         return f"Образование: {self.doctor}"
 
 
+class EducationEntry(models.Model):
+    """
+    Запись об обучении из Education.history_education в виде строки таблицы.
+
+    Нужна для индексированного поиска врачей по вузу, ординатуре и курсам
+    повышения квалификации. Заполняется только через Education.sync_entries.
+    """
+
+    SECTIONS = ("universities", "ordinator", "advanced_training")
+
+    education = models.ForeignKey(
+        Education,
+        on_delete=CASCADE,
+        related_name="entries",
+        verbose_name="ForeignKey на образование",
+    )
+    doctor = models.ForeignKey(
+        Doctor, on_delete=CASCADE, verbose_name="ForeignKey на врача"
+    )
+    section = models.CharField(max_length=32, verbose_name="Раздел образования")
+    name = models.CharField(
+        max_length=EDUCATION_TEXT_MAX_LENGTH, verbose_name="Учебное заведение или курс"
+    )
+    specialty = models.CharField(
+        max_length=EDUCATION_TEXT_MAX_LENGTH, verbose_name="Специальность"
+    )
+    start_date = models.DateField(verbose_name="Дата начала обучения")
+    end_date = models.DateField(verbose_name="Дата окончания обучения")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["section", "name", "start_date"],
+                include=["doctor"],
+                name="education_entry_name_idx",
+            ),
+            models.Index(
+                fields=["section", "specialty", "start_date"],
+                include=["doctor"],
+                name="education_entry_specialty_idx",
+            ),
+        ]
+
+    @classmethod
+    def build(cls, education) -> list:
+        """Записи для одного объекта Education (без сохранения)."""
+        entries = []
+        data = education.history_education or {}
+        for section in cls.SECTIONS:
+            for item in data.get(section) or []:
+                entries.append(
+                    cls(
+                        education_id=education.pk,
+                        doctor_id=education.doctor_id,
+                        section=section,
+                        name=item["name"].strip(),
+                        specialty=item["specialty"].strip(),
+                        start_date=date.fromisoformat(item["start_date"]),
+                        end_date=date.fromisoformat(item["end_date"]),
+                    )
+                )
+        return entries
+
+    def __str__(self):
+        return f"{self.section}: {self.name} ({self.start_date} - {self.end_date})"
+
+
 class Patient(BaseModel):
     tag_social = models.CharField(
         max_length=100,
@@ -141,6 +227,19 @@ class Clinic(models.Model):
         default=False, verbose_name="Флаг удаленности клиники"
     )
 
+    objects = SoftDeleteManager()
+    all_objects = AllObjectsManager()
+
+    class Meta:
+        default_manager_name = "all_objects"
+        indexes = [
+            models.Index(
+                fields=["name"],
+                condition=models.Q(is_deleted=False),
+                name="clinic_name_alive_idx",
+            )
+        ]
+
     def __str__(self):
         return f"{self.name}"
 
@@ -154,7 +253,21 @@ class Admin(BaseModel):
         return f"{self.family} {self.name} {self.second_name}"
 
 
+class ConsultQuerySet(SoftDeleteQuerySet):
+    def overlapping(self, doctor, start_date, end_date):
+        """Живые приёмы врача, пересекающиеся с интервалом [start_date, end_date)."""
+        return self.filter(
+            doctor=doctor,
+            is_deleted=False,
+            start_date__lt=end_date,
+            end_date__gt=start_date,
+        )
+
+
 class Consult(models.Model):
+    DEFAULT_DURATION = timedelta(minutes=4)
+    OVERLAP_CONSTRAINT = "consult_doctor_no_overlap"
+
     create_date = models.DateTimeField(
         auto_now_add=True, verbose_name="Дата создания консультации"
     )
@@ -181,34 +294,175 @@ class Consult(models.Model):
         Clinic, on_delete=CASCADE, verbose_name="ForeignKey на клинику"
     )
 
+    objects = SoftDeleteManager.from_queryset(ConsultQuerySet)()
+    all_objects = ConsultQuerySet.as_manager()
+
     class Meta:
+        default_manager_name = "all_objects"
         constraints = [
+            # Как consult_doctor_no_overlap: удалённый приём не занимает время
             models.UniqueConstraint(
-                fields=["doctor", "start_date"], name="unique_doctor_start_date"
+                fields=["doctor", "start_date"],
+                condition=models.Q(is_deleted=False),
+                name="unique_doctor_start_date",
             )
         ]
+        indexes = [
+            # Покрывает запрос пересечений: doctor = ? AND start < ? AND end > ?
+            models.Index(
+                fields=["doctor", "start_date", "end_date"],
+                condition=models.Q(is_deleted=False),
+                name="consult_doctor_interval_idx",
+            ),
+            # Сортировка списков и пагинация по ключу (start_date, id);
+            # без условия, так как админка показывает и удалённые записи
+            models.Index(fields=["start_date", "id"], name="consult_start_id_idx"),
+            # Выгрузка истории клиники в порядке дат без сортировки
+            models.Index(
+                fields=["clinic", "start_date", "id"], name="consult_clinic_start_idx"
+            ),
+            # Задание refresh_consult_stats: приёмы, изменённые с прошлого запуска
+            models.Index(fields=["update_date"], name="consult_update_date_idx"),
+        ]
+
+    # Проверка пересечений в clean(); сервис бронирования отключает её,
+    # так как сам проверяет пересечения под блокировкой врача.
+    _check_overlap = True
+
+    @classmethod
+    def archive_horizon(cls, now=None):
+        """
+        Граница архивного периода: приёмы, закончившиеся раньше неё,
+        переносятся в ConsultArchive. None - архивация отключена.
+        """
+        if not settings.CONSULT_ARCHIVE_AFTER_DAYS:
+            return None
+        return (now or timezone.now()) - timedelta(days=settings.CONSULT_ARCHIVE_AFTER_DAYS)
 
     def clean(self):
         super().clean()
         if self.start_date and not self.end_date:
-            self.end_date = self.start_date + timedelta(minutes=4)
+            self.end_date = self.start_date + self.DEFAULT_DURATION
         if self.start_date and self.end_date and self.end_date < self.start_date:
             raise ValidationError(
                 {"end_date": "Дата окончания не может быть раньше даты начала."}
             )
-        if self.doctor and self.start_date and self.end_date:
-            overlapping = Consult.objects.filter(
-                doctor=self.doctor,
-                start_date__lt=self.end_date,
-                end_date__gt=self.start_date,
+        # Приёмы архивного периода уже не в Consult: новый приём там
+        # не прошёл бы проверку пересечений и unique_doctor_start_date
+        horizon = self.archive_horizon()
+        if horizon and self.start_date and self.start_date < horizon and self._moved():
+            raise ValidationError(
+                {"start_date": "Нельзя записать приём в архивный период."}
+            )
+        if self._check_overlap and self.doctor_id and self.start_date and self.end_date:
+            overlapping = Consult.objects.overlapping(
+                doctor=self.doctor_id,
+                start_date=self.start_date,
+                end_date=self.end_date,
             ).exclude(pk=self.pk)
 
             if overlapping.exists():
                 raise ValidationError("У врача уже есть приём в это время.")
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def _moved(self) -> bool:
+        """Новый приём или перенос к другому врачу или на другое время."""
+        if self._state.adding:
+            return True
+        # Исходный интервал запоминает post_init в main.signals
+        doctor_id, start_date, _ = getattr(self, "_initial_interval", (None, None, None))
+        return (doctor_id, start_date) != (self.doctor_id, self.start_date)
+
+    def save(self, *args, check_overlap=True, **kwargs):
+        self._check_overlap = check_overlap
+        try:
+            self.full_clean()
+        finally:
+            del self._check_overlap
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.clinic}, {self.doctor}, {self.patient}, {self.start_date}, {self.end_date}"
+
+
+class ConsultArchive(models.Model):
+    """
+    История приёмов: закончившиеся до Consult.archive_horizon() и давно
+    удалённые приёмы, перенесённые из Consult заданием archive_consults
+    (main.services.archive.ConsultArchiveService).
+
+    id совпадает с id исходного приёма. Таблица только пополняется,
+    поэтому индексов меньше, чем у Consult, и нет проверок пересечений.
+    """
+
+    id = models.BigIntegerField(primary_key=True, verbose_name="id исходного приёма")
+    create_date = models.DateTimeField(verbose_name="Дата создания консультации")
+    update_date = models.DateTimeField(verbose_name="Дата обновления консультации")
+    start_date = models.DateTimeField(verbose_name="Дата начала консультации")
+    end_date = models.DateTimeField(
+        blank=True, null=True, verbose_name="Дата конца консультации"
+    )
+    is_deleted = models.BooleanField(
+        default=False, verbose_name="флаг удалённости консультации"
+    )
+    archived_date = models.DateTimeField(verbose_name="Дата переноса в архив")
+
+    # Индекс врача - первая колонка consult_arch_doctor_start_idx
+    doctor = models.ForeignKey(
+        Doctor, on_delete=CASCADE, db_index=False, verbose_name="ForeignKey на врача"
+    )
+    patient = models.ForeignKey(
+        Patient, on_delete=CASCADE, verbose_name="ForeignKey на пациента"
+    )
+    clinic = models.ForeignKey(
+        Clinic, on_delete=CASCADE, verbose_name="ForeignKey на клинику"
+    )
+
+    class Meta:
+        indexes = [
+            # История врача и пересчёт ConsultDailyStats по (клиника, врач, день)
+            models.Index(
+                fields=["doctor", "start_date"], name="consult_arch_doctor_start_idx"
+            ),
+            # Сортировка и пагинация по ключу в админке
+            models.Index(fields=["start_date", "id"], name="consult_arch_start_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.clinic}, {self.doctor}, {self.patient}, {self.start_date}, {self.end_date}"
+
+
+class ConsultDailyStats(models.Model):
+    """
+    Сводка приёмов за день по паре (клиника, врач).
+
+    День - локальная дата начала приёма. Строки пересчитываются из Consult
+    точечно по сигналам сохранения/удаления приёма и заданием
+    refresh_consult_stats (main.services.stats.ConsultStatsService).
+    """
+
+    clinic = models.ForeignKey(
+        Clinic, on_delete=CASCADE, verbose_name="ForeignKey на клинику"
+    )
+    doctor = models.ForeignKey(
+        Doctor, on_delete=CASCADE, verbose_name="ForeignKey на врача"
+    )
+    day = models.DateField(verbose_name="День")
+    consults = models.IntegerField(default=0, verbose_name="Число живых приёмов")
+    cancelled = models.IntegerField(default=0, verbose_name="Число отменённых приёмов")
+    busy = models.DurationField(
+        default=timedelta, verbose_name="Суммарная длительность живых приёмов"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["clinic", "doctor", "day"], name="consult_stats_key"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["doctor", "day"], name="consult_stats_doctor_day_idx"),
+            models.Index(fields=["day"], name="consult_stats_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.clinic_id}/{self.doctor_id} - {self.consults}"
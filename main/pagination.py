@@ -0,0 +1,181 @@
+import base64
+import binascii
+import json
+from functools import cached_property
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(ordering, values) -> Q:
+    """
+    Условие "строка после values" для сортировки ordering:
+    (a > x) OR (a = x AND b > y) OR ... с учётом направления каждого поля.
+    Дополнительное a >= x задаёт начало диапазона индекса по первому полю.
+    """
+    fields = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+    condition = Q()
+    for index, (name, descending) in enumerate(fields):
+        step = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[index]})
+        for previous, (previous_name, _) in enumerate(fields[:index]):
+            step &= Q(**{previous_name: values[previous]})
+        condition |= step
+    first, descending = fields[0]
+    return Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+
+def estimated_count(queryset, threshold: int = 100_000):
+    """
+    Оценка числа строк по статистике PostgreSQL для выборки без фильтров.
+    Возвращает None, если оценка неприменима или таблица меньше threshold.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < threshold:
+        return None
+    return row[0]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу для DRF.
+
+    Страница выбирается условием keyset_filter по значениям сортировки
+    последней строки, а не OFFSET, поэтому глубокие страницы читаются так
+    же быстро, как первая. COUNT(*) не выполняется. Поля ordering должны
+    быть NOT NULL, последним идёт уникальное поле (pk); под сортировку
+    нужен индекс с теми же полями.
+    """
+    ordering = ("pk",)
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [self._field(queryset.model, name) for name in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, cursor))
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = [field.value_to_string(last) for field in self.fields]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(cursor)
+        )
+
+    @staticmethod
+    def _field(model, name):
+        name = name.lstrip("-")
+        return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+    @staticmethod
+    def encode_cursor(values) -> str:
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class ConsultCursorPagination(KeysetPagination):
+    # Индекс consult_start_id_idx (start_date, id)
+    ordering = ("start_date", "pk")
+
+
+class PatientCursorPagination(KeysetPagination):
+    # Индекс main_patient_fio (family, name, second_name, id)
+    ordering = ("family", "name", "second_name", "pk")
+
+
+class KeysetAdminPaginator(Paginator):
+    """
+    Пагинатор списка в админке без COUNT(*) и выборки полных строк через OFFSET.
+
+    Число строк большой таблицы без фильтров берётся из статистики
+    PostgreSQL. Для страницы N сначала читается граничный ключ
+    (только поля сортировки - это проход по индексу), затем сама страница
+    выбирается условием keyset_filter. Сортировки по выражениям и связанным
+    полям обрабатываются обычным Paginator.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        return super().count if estimate is None else estimate
+
+    def _keyset_ordering(self):
+        ordering = self.object_list.query.order_by
+        if not ordering or not all(
+            isinstance(name, str) and "__" not in name and "?" not in name for name in ordering
+        ):
+            return None
+        return ordering
+
+    def page(self, number):
+        number = self.validate_number(number)
+        offset = (number - 1) * self.per_page
+        ordering = self._keyset_ordering()
+        if ordering is None or offset == 0:
+            return super().page(number)
+
+        names = [name.lstrip("-") for name in ordering]
+        boundary = self.object_list.values_list(*names)[offset - 1 : offset]
+        boundary = next(iter(boundary), None)
+        if boundary is None:
+            return self._get_page([], number, self)
+        rows = self.object_list.filter(keyset_filter(ordering, boundary))[: self.per_page]
+        return self._get_page(rows, number, self)
@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+class QueryBudgetExceeded(Exception):
+    """Код выполнил больше SQL-запросов, чем разрешено бюджетом."""
+
+
+@contextmanager
+def query_budget(limit: int, using=connection):
+    """
+    Ограничивает число SQL-запросов внутри блока.
+
+    Запрос сверх limit не выполняется: выбрасывается QueryBudgetExceeded.
+    Так N+1 в представлении ломает запрос сразу, а не замедляет его
+    пропорционально объёму данных.
+    """
+    executed = 0
+
+    def wrapper(execute, sql, params, many, context):
+        nonlocal executed
+        executed += 1
+        if executed > limit:
+            raise QueryBudgetExceeded(
+                f"Превышен бюджет запросов: {limit}. Запрос: {sql}"
+            )
+        return execute(sql, params, many, context)
+
+    with using.execute_wrapper(wrapper):
+        yield
@@ -1,20 +1,224 @@
+import asyncio
+import weakref
+
+from django.conf import settings
 from django.core.cache import caches
 from dataclasses import dataclass
+from redis.exceptions import WatchError
 
 cache_db = caches['default']
 token_db = caches['tokens']
 
+
+def _tokens_client():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection('tokens')
+
+
+# Соединения redis.asyncio привязаны к циклу событий: клиент - на каждый цикл
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _async_tokens_client():
+    from redis.asyncio import Redis
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = Redis.from_url(settings.CACHES['tokens']['LOCATION'])
+    return client
+
+
 @dataclass
 class RefreshTokenStorage:
-    TTL: int  # 7 дней
+    """
+    Хранилище refresh-токенов по jti.
+
+    refresh:{jti} -> user_id с TTL, равным оставшемуся сроку жизни JWT;
+    user_tokens:{user_id} -> множество jti пользователя, чтобы отзывать все
+    сессии без сканирования ключей. Множество живёт не меньше самого долгого
+    токена (TTL), при сохранении из него вычищаются jti истёкших токенов,
+    при ротации старый jti удаляется в той же транзакции. Ротация и отзыв
+    выполняются атомарно через WATCH/MULTI. client - клиент redis
+    (или fakeredis в тестах).
+
+    Методы с префиксом a - те же операции через redis.asyncio для
+    асинхронных представлений; async_client задаётся так же, как client.
+    """
+    TTL: int  # 7 дней, в секундах
+    client: object = None
+    async_client: object = None
+
+    def get_client(self):
+        if self.client is None:
+            self.client = _tokens_client()
+        return self.client
 
-    def save_token(self, token: str, user_id: str):
-        token_db.set(token, user_id, timeout=self.TTL)
+    def get_async_client(self):
+        if self.async_client is not None:
+            return self.async_client
+        return _async_tokens_client()
 
     @staticmethod
-    def get_token(token: str) -> str | None:
-        return token_db.get(token)
+    def _token_key(jti: str) -> str:
+        return f'refresh:{jti}'
 
     @staticmethod
-    def revoke_token(token: str):
-        token_db.delete(token)
+    def _user_key(user_id: str) -> str:
+        return f'user_tokens:{user_id}'
+
+    def _user_ttl(self, ttl: int) -> int:
+        return max(ttl, self.TTL)
+
+    @staticmethod
+    def _jtis(members) -> list:
+        return [jti.decode() if isinstance(jti, bytes) else jti for jti in members]
+
+    def save_token(self, jti: str, user_id: str, ttl: int | None = None):
+        ttl = ttl or self.TTL
+        client, user_key = self.get_client(), self._user_key(user_id)
+        # jti, у которых ключ refresh:{jti} уже истёк или удалён
+        jtis = self._jtis(client.smembers(user_key))
+        owners = client.mget([self._token_key(jti) for jti in jtis]) if jtis else []
+        dead = [jti for jti, owner in zip(jtis, owners) if owner is None]
+        with client.pipeline() as pipe:
+            if dead:
+                pipe.srem(user_key, *dead)
+            pipe.set(self._token_key(jti), user_id, ex=ttl)
+            pipe.sadd(user_key, jti)
+            pipe.expire(user_key, self._user_ttl(ttl))
+            pipe.execute()
+
+    def get_token(self, jti: str) -> str | None:
+        user_id = self.get_client().get(self._token_key(jti))
+        return user_id.decode() if isinstance(user_id, bytes) else user_id
+
+    def rotate_token(self, old_jti: str, new_jti: str, user_id: str, ttl: int | None = None) -> bool:
+        """
+        Атомарно заменяет old_jti на new_jti. Возвращает False, если old_jti
+        уже отозван или использован (повторное использование refresh-токена).
+        """
+        ttl = ttl or self.TTL
+        old_key, user_key = self._token_key(old_jti), self._user_key(user_id)
+        with self.get_client().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(old_key)
+                    owner = pipe.get(old_key)
+                    if isinstance(owner, bytes):
+                        owner = owner.decode()
+                    if owner != str(user_id):
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.delete(old_key)
+                    pipe.srem(user_key, old_jti)
+                    pipe.set(self._token_key(new_jti), user_id, ex=ttl)
+                    pipe.sadd(user_key, new_jti)
+                    pipe.expire(user_key, self._user_ttl(ttl))
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def revoke_token(self, jti: str, user_id: str | None = None):
+        with self.get_client().pipeline() as pipe:
+            pipe.delete(self._token_key(jti))
+            if user_id is not None:
+                pipe.srem(self._user_key(user_id), jti)
+            pipe.execute()
+
+    def revoke_all(self, user_id: str) -> int:
+        """Отзывает все refresh-токены пользователя. Возвращает число токенов."""
+        user_key = self._user_key(user_id)
+        with self.get_client().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(user_key)
+                    jtis = [
+                        jti.decode() if isinstance(jti, bytes) else jti
+                        for jti in pipe.smembers(user_key)
+                    ]
+                    pipe.multi()
+                    for jti in jtis:
+                        pipe.delete(self._token_key(jti))
+                    pipe.delete(user_key)
+                    pipe.execute()
+                    return len(jtis)
+                except WatchError:
+                    continue
+
+# Блок асинхронных операций
+    async def asave_token(self, jti: str, user_id: str, ttl: int | None = None):
+        ttl = ttl or self.TTL
+        client, user_key = self.get_async_client(), self._user_key(user_id)
+        # jti, у которых ключ refresh:{jti} уже истёк или удалён
+        jtis = self._jtis(await client.smembers(user_key))
+        owners = await client.mget([self._token_key(jti) for jti in jtis]) if jtis else []
+        dead = [jti for jti, owner in zip(jtis, owners) if owner is None]
+        async with client.pipeline() as pipe:
+            if dead:
+                pipe.srem(user_key, *dead)
+            pipe.set(self._token_key(jti), user_id, ex=ttl)
+            pipe.sadd(user_key, jti)
+            pipe.expire(user_key, self._user_ttl(ttl))
+            await pipe.execute()
+
+    async def aget_token(self, jti: str) -> str | None:
+        user_id = await self.get_async_client().get(self._token_key(jti))
+        return user_id.decode() if isinstance(user_id, bytes) else user_id
+
+    async def arotate_token(
+        self, old_jti: str, new_jti: str, user_id: str, ttl: int | None = None
+    ) -> bool:
+        """Асинхронный rotate_token."""
+        ttl = ttl or self.TTL
+        old_key, user_key = self._token_key(old_jti), self._user_key(user_id)
+        async with self.get_async_client().pipeline() as pipe:
+            while True:
+                try:
+                    await pipe.watch(old_key)
+                    owner = await pipe.get(old_key)
+                    if isinstance(owner, bytes):
+                        owner = owner.decode()
+                    if owner != str(user_id):
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.delete(old_key)
+                    pipe.srem(user_key, old_jti)
+                    pipe.set(self._token_key(new_jti), user_id, ex=ttl)
+                    pipe.sadd(user_key, new_jti)
+                    pipe.expire(user_key, self._user_ttl(ttl))
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    async def arevoke_token(self, jti: str, user_id: str | None = None):
+        async with self.get_async_client().pipeline() as pipe:
+            pipe.delete(self._token_key(jti))
+            if user_id is not None:
+                pipe.srem(self._user_key(user_id), jti)
+            await pipe.execute()
+
+    async def arevoke_all(self, user_id: str) -> int:
+        """Асинхронный revoke_all."""
+        user_key = self._user_key(user_id)
+        async with self.get_async_client().pipeline() as pipe:
+            while True:
+                try:
+                    await pipe.watch(user_key)
+                    jtis = [
+                        jti.decode() if isinstance(jti, bytes) else jti
+                        for jti in await pipe.smembers(user_key)
+                    ]
+                    pipe.multi()
+                    for jti in jtis:
+                        pipe.delete(self._token_key(jti))
+                    pipe.delete(user_key)
+                    await pipe.execute()
+                    return len(jtis)
+                except WatchError:
+                    continue
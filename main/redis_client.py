@@ -0,0 +1,67 @@
+from django_redis.client import DefaultClient
+
+from main import metrics
+
+_MISSING = object()
+
+
+class InstrumentedRedisClient(DefaultClient):
+    """
+    Клиент django_redis (CLIENT_CLASS), который пишет в счётчики запроса
+    (main.metrics) время обращений к Redis и попадания/промахи чтений.
+
+    Стоит под NearCache: попадания в локальный LRU до Redis не доходят
+    и здесь не считаются.
+    """
+
+    def get(self, key, default=None, version=None, client=None):
+        with metrics.cache_call() as outer:
+            value = super().get(key, _MISSING, version=version, client=client)
+        found = value is not _MISSING
+        if outer:
+            metrics.record_cache_lookup(hits=int(found), misses=int(not found))
+        return value if found else default
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        with metrics.cache_call() as outer:
+            values = super().get_many(keys, version=version, client=client)
+        if outer:
+            metrics.record_cache_lookup(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def has_key(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().has_key(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().set(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().add(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().set_many(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().touch(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().incr(*args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().decr(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        with metrics.cache_call():
+            return super().delete_many(*args, **kwargs)
@@ -1,49 +1,115 @@
 from dataclasses import dataclass
+from itertools import islice
+
+
+def chunked(iterable, size: int):
+    """Разбивает последовательность на списки длиной не более size."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
 
 
 @dataclass
 class RepositoryBase:
-    """Базовый класс для работы с бд."""
+    """
+    Базовый класс для работы с бд.
+
+    Модель задаётся атрибутом класса model в наследнике. Массовые операции
+    выполняются пачками по batch_size, большие выборки читаются потоково
+    через iterator(chunk_size=...).
+    """
+    model = None
+    batch_size: int = 1000
+
+    def get_queryset(self):
+        """
+        Базовая выборка, от которой строятся все запросы репозитория.
+        Для моделей с мягким удалением - только живые записи.
+        """
+        return self.model.objects.all()
+
+    def _project(self, queryset, fields=None):
+        return queryset.only(*fields) if fields else queryset
+
 # Блок записи в бд
-    def record_one(self, model, **kwargs):
-        """Запись одного экземпляры модели."""
-        return model.objects.create(**kwargs)
-
-    def record_many(self, model, data):
-        """Запись многих экземпляров модели."""
-        return model.objects.bulk_create([model(**kwargs) for kwargs in data])
-        
+    def record_one(self, **kwargs):
+        """Запись одного экземпляра модели."""
+        return self.model._default_manager.create(**kwargs)
+
+    def record_many(self, data, batch_size: int | None = None):
+        """Запись многих экземпляров модели пачками."""
+        return self.model._default_manager.bulk_create(
+            [self.model(**kwargs) for kwargs in data],
+            batch_size=batch_size or self.batch_size,
+        )
+
 # Блок обновления в бд
-    def update_one(self, model, **kwargs):
-        """Обновление одного экземпляра модели."""
-        return model.objects.update(**kwargs)
-
-    def update_many(self, model, data):
-        """Обновление многих экземпляров модели."""
-        return model.objects.bulk_update([model(**kwargs) for kwargs in data])
-    
+    def update_one(self, id, **kwargs):
+        """Обновление одного экземпляра модели. Возвращает число обновлённых строк."""
+        return self.get_queryset().filter(pk=id).update(**kwargs)
+
+    def update_many(self, data, fields, batch_size: int | None = None):
+        """
+        Обновление многих экземпляров модели через bulk_update.
+
+        data - словари с ключом pk (или id) и значениями полей из fields.
+        """
+        objs = []
+        for kwargs in data:
+            kwargs = dict(kwargs)
+            pk = kwargs.pop("pk", None) or kwargs.pop("id")
+            obj = self.model(pk=pk)
+            for field in fields:
+                setattr(obj, field, kwargs[field])
+            objs.append(obj)
+        return self.model._default_manager.bulk_update(
+            objs, fields, batch_size=batch_size or self.batch_size
+        )
+
 # Блок чтения из бд
-    def get_one(self, model, id):
+    def get_one(self, id, fields=None):
         """Получение одного экземпляра модели."""
-        return model.objects.get(pk = id)
+        return self._project(self.get_queryset(), fields).get(pk=id)
 
-    def get_many(self, model, **kwargs):
-        """Получение многих экземпляров модели."""
-        return model.objects.filter(pk = id)
+    def get_many(self, ids, fields=None, batch_size: int | None = None):
+        """Получение многих экземпляров модели по pk пачками запросов pk__in."""
+        queryset = self._project(self.get_queryset(), fields)
+        result = []
+        for chunk in chunked(ids, batch_size or self.batch_size):
+            result.extend(queryset.filter(pk__in=chunk))
+        return result
 
-    def get_all(self, model):
+    def get_all(self, fields=None):
         """Получение всех экземпляров модели."""
-        return model.objects.all()
-    
+        return self._project(self.get_queryset(), fields)
+
+    def get_values(self, *fields, **filters):
+        """Проекция в словари без создания экземпляров модели."""
+        return self.get_queryset().filter(**filters).values(*fields)
+
+    def stream(self, fields=None, chunk_size: int | None = None, **filters):
+        """Потоковое чтение большой выборки без загрузки её в память целиком."""
+        queryset = self._project(self.get_queryset().filter(**filters), fields)
+        return queryset.order_by("pk").iterator(chunk_size=chunk_size or self.batch_size)
+
+    def stream_values(self, *fields, chunk_size: int | None = None, **filters):
+        """Потоковое чтение кортежей values_list."""
+        queryset = self.get_queryset().filter(**filters).values_list(*fields)
+        return queryset.order_by("pk").iterator(chunk_size=chunk_size or self.batch_size)
+
 # Блок удаления из бд
-    def delete_one(self, model, id):
+    def delete_one(self, id):
         """Удаление одного экземпляра модели."""
-        return model.objects.filter(pk = id).delete()
-    
-    def delete_many(self, model, id):
-        """Удаление многих экземпляров модели."""
-        return model.objects.filter(pk = id).delete().delete()
-    
-    def delete_all(self, model):
+        return self.get_queryset().filter(pk=id).delete()
+
+    def delete_many(self, ids, batch_size: int | None = None):
+        """Удаление многих экземпляров модели пачками. Возвращает число удалённых строк."""
+        deleted = 0
+        for chunk in chunked(ids, batch_size or self.batch_size):
+            count, _ = self.get_queryset().filter(pk__in=chunk).delete()
+            deleted += count
+        return deleted
+
+    def delete_all(self):
         """Удаление всех экземпляров модели."""
-        return model.objects.all().delete()
\ No newline at end of file
+        return self.get_queryset().delete()
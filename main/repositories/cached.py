@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from main.redis import cache_db
+from main.repositories.base import RepositoryBase
+
+# Счётчики попаданий/промахов кеша по моделям: {"main.doctor:hit": 10, ...}
+cache_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(label: str, event: str) -> None:
+    with _stats_lock:
+        cache_stats[f"{label}:{event}"] += 1
+
+
+def _label(model) -> str:
+    return model._meta.label_lower
+
+
+def _version_key(model) -> str:
+    return f"repo:{_label(model)}:version"
+
+
+def get_version(model) -> int:
+    version = cache_db.get(_version_key(model))
+    if version is None:
+        # Начальная версия от времени: после вытеснения ключа версии
+        # старые списки не станут снова актуальными
+        cache_db.add(_version_key(model), time.time_ns(), timeout=None)
+        version = cache_db.get(_version_key(model))
+    return version
+
+
+def invalidate(model) -> None:
+    """
+    Увеличивает версию модели: все её закешированные объекты и списки
+    становятся недоступны. Значение, посчитанное по старым данным
+    параллельно с изменением, попадёт под старую версию и не будет прочитано.
+    """
+    try:
+        cache_db.incr(_version_key(model))
+    except ValueError:
+        cache_db.add(_version_key(model), time.time_ns(), timeout=None)
+
+
+@dataclass
+class CachedRepository(RepositoryBase):
+    """
+    Репозиторий с кешированием get_one и get_all_cached в cache_db.
+
+    Ключи содержат версию модели; сигналы post_save/post_delete/m2m_changed
+    (main/signals.py) увеличивают версию после коммита. bulk_create,
+    bulk_update и queryset.update сигналов не шлют - record_many,
+    update_one и update_many увеличивают версию сами. Пересчёт горячего
+    ключа выполняет один процесс под блокировкой cache.add, остальные ждут
+    результат.
+    """
+    cache_timeout: int = 300
+    lock_timeout: float = 5.0
+    lock_poll: float = 0.05
+
+    def get_one(self, id, fields=None):
+        """Получение одного экземпляра модели (без fields - через кеш)."""
+        if fields:
+            return super().get_one(id, fields=fields)
+        return self._read_through(
+            self._key(f"one:{id}"), lambda: RepositoryBase.get_one(self, id)
+        )
+
+    def get_all_cached(self, fields=None, **filters):
+        """
+        Живые экземпляры модели, подходящие под filters, списком по pk
+        через кеш. Ключ - версия модели, поля и фильтры.
+        """
+        conditions = "&".join(f"{name}={value}" for name, value in sorted(filters.items()))
+        return self._read_through(
+            self._key(f"all:{','.join(fields or ())}:{conditions}"),
+            lambda: list(self.get_all(fields).filter(**filters).order_by("pk")),
+        )
+
+    def record_many(self, data, batch_size: int | None = None):
+        result = super().record_many(data, batch_size=batch_size)
+        self._invalidate_on_commit()
+        return result
+
+    def update_one(self, id, **kwargs):
+        result = super().update_one(id, **kwargs)
+        self._invalidate_on_commit()
+        return result
+
+    def update_many(self, data, fields, batch_size: int | None = None):
+        result = super().update_many(data, fields, batch_size=batch_size)
+        self._invalidate_on_commit()
+        return result
+
+    def _invalidate_on_commit(self) -> None:
+        model = self.model
+        transaction.on_commit(lambda: invalidate(model))
+
+    def _key(self, suffix: str) -> str:
+        return f"repo:{_label(self.model)}:v{get_version(self.model)}:{suffix}"
+
+    def _read_through(self, key, load):
+        label = _label(self.model)
+        value = cache_db.get(key)
+        if value is not None:
+            _count(label, "hit")
+            return value
+
+        _count(label, "miss")
+        lock_key = f"{key}:lock"
+        if cache_db.add(lock_key, 1, timeout=self.lock_timeout):
+            try:
+                value = load()
+                cache_db.set(key, value, timeout=self.cache_timeout)
+                return value
+            finally:
+                cache_db.delete(lock_key)
+
+        # Ключ пересчитывает другой процесс: ждём его результат
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll)
+            value = cache_db.get(key)
+            if value is not None:
+                _count(label, "hit_after_wait")
+                return value
+        return load()
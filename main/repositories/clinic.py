@@ -0,0 +1,89 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from main.models import Clinic, Consult, Doctor, Education
+from main.repositories.cached import CachedRepository
+
+
+@dataclass
+class ClinicRepository(CachedRepository):
+    model = Clinic
+
+    DOCTOR_FIELDS = ("id", "family", "name", "second_name", "gender")
+
+    def for_doctor(self, doctor_id: int) -> list:
+        """
+        Клиники врача (id и название) через кеш. Ключ под версией Clinic:
+        её увеличивают и изменения клиник, и изменения Clinic.doctors.
+        """
+        return self.get_all_cached(fields=("id", "name"), doctors__id=doctor_id)
+
+    def with_roster(self, now=None):
+        """
+        Клиники с врачами, их образованием и числом предстоящих консультаций.
+
+        Число запросов не зависит от числа клиник и врачей: клиники с
+        аннотацией upcoming_consults, врачи и образование через Prefetch.
+        Счётчики консультаций по врачам считает attach_doctor_consults.
+        """
+        now = now or timezone.now()
+        doctors = Doctor.objects.only(*self.DOCTOR_FIELDS).order_by(
+            "family", "name", "second_name", "pk"
+        ).prefetch_related(
+            Prefetch(
+                "education_set",
+                queryset=Education.objects.only("id", "doctor_id", "history_education"),
+                to_attr="educations",
+            )
+        )
+        return (
+            self.get_queryset()
+            .annotate(
+                upcoming_consults=Count(
+                    "consult",
+                    filter=Q(consult__is_deleted=False, consult__start_date__gte=now),
+                )
+            )
+            .prefetch_related(Prefetch("doctors", queryset=doctors, to_attr="roster"))
+        )
+
+    def roster_page(self, after: int | None = None, limit: int = 20, now=None):
+        """
+        Страница реестра клиник по ключу pk > after (без OFFSET).
+        Возвращает (клиники, pk последней клиники или None, если страница последняя).
+        """
+        now = now or timezone.now()
+        queryset = self.with_roster(now).order_by("pk")
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        clinics = list(queryset[: limit + 1])
+        has_next = len(clinics) > limit
+        clinics = clinics[:limit]
+        self.attach_doctor_consults(clinics, now)
+        return clinics, (clinics[-1].pk if has_next else None)
+
+    @staticmethod
+    def attach_doctor_consults(clinics, now) -> None:
+        """
+        Одним запросом с GROUP BY проставляет врачам из roster атрибут
+        upcoming_consults - число их предстоящих консультаций в этой клинике.
+        """
+        if not clinics:
+            return
+        counts = defaultdict(int)
+        rows = (
+            Consult.objects.filter(
+                clinic__in=[clinic.pk for clinic in clinics], start_date__gte=now
+            )
+            .values_list("clinic_id", "doctor_id")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        for clinic_id, doctor_id, total in rows:
+            counts[clinic_id, doctor_id] = total
+        for clinic in clinics:
+            for doctor in clinic.roster:
+                doctor.upcoming_consults = counts[clinic.pk, doctor.pk]
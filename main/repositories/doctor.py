@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from datetime import date
+
+from main.models import Doctor, EducationEntry
+from main.repositories.cached import CachedRepository
+
+
+@dataclass
+class DoctorRepository(CachedRepository):
+    model = Doctor
+
+    def _with_education(self, **lookups):
+        """
+        Врачи, у которых есть запись об обучении с заданными условиями.
+        Подзапрос читает только покрывающий индекс EducationEntry.
+        """
+        entries = EducationEntry.objects.filter(**lookups).values("doctor_id")
+        return self.get_queryset().filter(pk__in=entries)
+
+    def trained_at(self, university: str, since_year: int | None = None):
+        """Врачи, учившиеся в вузе university, начиная с года since_year."""
+        lookups = {"section": "universities", "name": university}
+        if since_year is not None:
+            lookups["start_date__gte"] = date(since_year, 1, 1)
+        return self._with_education(**lookups)
+
+    def with_ordinator_specialty(self, specialty: str):
+        """Врачи с ординатурой по специальности specialty."""
+        return self._with_education(section="ordinator", specialty=specialty)
+
+    def with_advanced_training(self, course: str, since_year: int | None = None):
+        """Врачи, прошедшие курс повышения квалификации course."""
+        lookups = {"section": "advanced_training", "name": course}
+        if since_year is not None:
+            lookups["start_date__gte"] = date(since_year, 1, 1)
+        return self._with_education(**lookups)
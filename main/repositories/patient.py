@@ -1,7 +1,21 @@
 from dataclasses import dataclass
 from main.models import Patient
-from main.repositories.base import RepositoryBase
+from main.repositories.cached import CachedRepository
 
 @dataclass
-class PatientRepository(RepositoryBase):
+class PatientRepository(CachedRepository):
     model = Patient
+    LIST_FIELDS = ("id", "family", "name", "second_name", "gender", "phone", "email")
+
+    def get_list(self):
+        """Список пациентов: только отображаемые колонки, порядок как в админке."""
+        return self.get_all(fields=self.LIST_FIELDS).order_by(
+            "family", "name", "second_name"
+        )
+
+    def stream_contacts(self, chunk_size: int | None = None, **filters):
+        """Потоковая выгрузка контактов пациентов кортежами."""
+        return self.stream_values(
+            "id", "family", "name", "second_name", "phone", "email",
+            chunk_size=chunk_size, **filters
+        )
@@ -1,60 +1,154 @@
 from rest_framework import serializers
-from main.models import Doctor, Education
-from django.contrib.auth.hashers import make_password
+from main.models import Doctor, Education, EducationEntry
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from main.services.passwords import PasswordHashingService
+from main.validation_model import education_validator
 import json
 
-class EducationInputSerializer(serializers.Serializer):
+
+class UniqueFieldsResolver:
     """
-    Валидация JSON-поля history_education
+    Проверка уникальных полей для одного или многих наборов данных
+    одним запросом. Мягко удалённые записи тоже учитываются, так как
+    уникальные ограничения в бд действуют и на них.
     """
-    universities = serializers.ListField(
-        child=serializers.DictField(), required=False, default=list
-    )
-    ordinator = serializers.ListField(
-        child=serializers.DictField(), required=False, default=list
-    )
-    advanced_training = serializers.ListField(
-        child=serializers.DictField(), required=False, default=list
-    )
-
-    def validate_universities(self, value):
-        return self.validate_items(value, 'universities')
 
-    def validate_ordinator(self, value):
-        return self.validate_items(value, 'ordinator')
+    def __init__(self, model, messages: dict):
+        self.model = model
+        self.messages = messages
+
+    def _key(self, field, value):
+        if value in (None, ''):
+            return None
+        return str(self.model._meta.get_field(field).to_python(value))
+
+    def check(self, payloads, exclude_pks=None) -> list[dict]:
+        """
+        Возвращает список ошибок (по словарю на каждый набор данных).
+        exclude_pks - pk обновляемых записей в том же порядке, что и payloads.
+        """
+        payloads = list(payloads)
+        exclude_pks = exclude_pks or [None] * len(payloads)
+        keys = [
+            {field: self._key(field, payload.get(field)) for field in self.messages}
+            for payload in payloads
+        ]
+
+        lookup = Q()
+        for field in self.messages:
+            values = {item[field] for item in keys if item[field] is not None}
+            if values:
+                lookup |= Q(**{f'{field}__in': values})
+
+        taken = {field: {} for field in self.messages}
+        if lookup:
+            rows = self.model._default_manager.filter(lookup).values('pk', *self.messages)
+            for row in rows:
+                for field in self.messages:
+                    if row[field] not in (None, ''):
+                        taken[field][str(row[field])] = row['pk']
+
+        errors = []
+        seen = {field: set() for field in self.messages}
+        for item, pk in zip(keys, exclude_pks):
+            item_errors = {}
+            for field, value in item.items():
+                if value is None:
+                    continue
+                owner = taken[field].get(value)
+                if (owner is not None and owner != pk) or value in seen[field]:
+                    item_errors[field] = [self.messages[field]]
+                seen[field].add(value)
+            errors.append(item_errors)
+        return errors
 
-    def validate_advanced_training(self, value):
-        return self.validate_items(value, 'advanced_training')
-
-    def validate_items(self, items, parent_key):
-        for i, item in enumerate(items):
-            self.validate_item(item, parent_key, i)
-        return items
+class EducationInputSerializer(serializers.Serializer):
+    """
+    Валидация JSON-поля history_education по общей схеме education_validator
+    """
 
-    def validate_item(self, item, parent_key, index):
-        errors = {}
+    def to_internal_value(self, data):
+        errors = education_validator.errors(data)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return education_validator.clean(data)
 
-        name = item.get("name")
-        if not name or not isinstance(name, str) or not name.strip():
-            errors["name"] = "Обязательное непустое строковое поле."
+    def to_representation(self, instance):
+        return instance
 
-        specialty = item.get("specialty")
-        if not specialty or not isinstance(specialty, str):
-            errors["specialty"] = "Обязательное строковое поле."
 
-        start_date = item.get("start_date")
-        if not start_date or not isinstance(start_date, str):
-            errors["start_date"] = "Обязательная строка в формате даты."
+def doctor_unique_resolver():
+    return UniqueFieldsResolver(Doctor, {
+        'email': "Врач с таким email уже существует.",
+        'phone': "Врач с таким телефоном уже существует.",
+    })
 
-        end_date = item.get("end_date")
-        if not end_date or not isinstance(end_date, str):
-            errors["end_date"] = "Обязательная строка в формате даты."
 
-        if errors:
-            raise serializers.ValidationError({f"{parent_key}[{index}]": errors})
+class DoctorListSerializer(serializers.ListSerializer):
+    """
+    Пакетная валидация и создание врачей: уникальность email/phone всех
+    записей проверяется одним запросом, врачи и их образование создаются
+    через bulk_create, пароли хешируются в пуле.
+    """
+    batch_size = 500
+
+    def to_internal_value(self, data):
+        validated = super().to_internal_value(data)
+        errors = doctor_unique_resolver().check(validated)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    def validate_rows(self, rows):
+        """
+        Построчная валидация без остановки на ошибках.
+        Возвращает (список (индекс, данные), словарь индекс -> ошибки).
+        """
+        valid, errors = [], {}
+        for index, row in enumerate(rows):
+            try:
+                valid.append((index, self.child.run_validation(row)))
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+
+        unique_errors = doctor_unique_resolver().check(data for _, data in valid)
+        checked = []
+        for (index, data), row_errors in zip(valid, unique_errors):
+            if row_errors:
+                errors[index] = row_errors
+            else:
+                checked.append((index, data))
+        return checked, errors
 
-        return item
+    def create(self, validated_data):
+        return self.bulk_create(validated_data)
+
+    def bulk_create(self, validated_data):
+        items = [dict(data) for data in validated_data]
+        educations = [item.pop('education', None) for item in items]
+        passwords = PasswordHashingService().hash_many(item['password'] for item in items)
+        doctors = []
+        for item, password in zip(items, passwords):
+            item['password'] = password
+            doctors.append(Doctor(**item))
+
+        with transaction.atomic():
+            Doctor.objects.bulk_create(doctors, batch_size=self.batch_size)
+            education_objs = Education.objects.bulk_create(
+                [
+                    Education(doctor=doctor, history_education=education)
+                    for doctor, education in zip(doctors, educations)
+                    if education
+                ],
+                batch_size=self.batch_size,
+            )
+            EducationEntry.objects.bulk_create(
+                [entry for obj in education_objs for entry in EducationEntry.build(obj)],
+                batch_size=self.batch_size,
+            )
+        return doctors
 
 
 class DoctorCreateUpdateSerializer(serializers.ModelSerializer):
@@ -64,16 +158,13 @@ class DoctorCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
         exclude = ['is_deleted']
-
-    def validate_email(self, value):
-        if Doctor.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Врач с таким email уже существует.")
-        return value
-
-    def validate_phone(self, value):
-        if Doctor.objects.filter(phone=value).exists():
-            raise serializers.ValidationError("Врач с таким телефоном уже существует.")
-        return value
+        list_serializer_class = DoctorListSerializer
+        # Уникальность проверяется одним запросом в validate(), а не
+        # отдельным UniqueValidator на каждое поле
+        extra_kwargs = {
+            'email': {'validators': []},
+            'phone': {'validators': []},
+        }
 
     def validate(self, data):
         date_birth = data.get('date_birth')
@@ -90,16 +181,38 @@ class DoctorCreateUpdateSerializer(serializers.ModelSerializer):
                 'date_end_work': 'Дата окончания работы не может быть раньше даты начала.'
             })
 
+        # В режиме many=True уникальность проверяет DoctorListSerializer
+        if not isinstance(self.parent, serializers.ListSerializer):
+            errors = doctor_unique_resolver().check(
+                [data], exclude_pks=[getattr(self.instance, 'pk', None)]
+            )[0]
+            if errors:
+                raise serializers.ValidationError(errors)
+
         return data
 
+    @staticmethod
+    def _save_doctor(doctor):
+        # Уникальность уже проверена в validate(), повторно full_clean её не проверяет
+        try:
+            with transaction.atomic():
+                doctor.save(validate_unique=False)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'email': "Врач с таким email или телефоном уже существует."}
+            )
+
     def create(self, validated_data):
         education_data = validated_data.pop('education', None)
 
         # Хешируем пароль
         if 'password' in validated_data:
-            validated_data['password'] = make_password(validated_data['password'])
+            validated_data['password'] = PasswordHashingService().hash_one(
+                validated_data['password']
+            )
 
-        doctor = Doctor.objects.create(**validated_data)
+        doctor = Doctor(**validated_data)
+        self._save_doctor(doctor)
 
         # Создаём образование
         if education_data:
@@ -112,11 +225,13 @@ class DoctorCreateUpdateSerializer(serializers.ModelSerializer):
 
         # Обновляем пароль?
         if 'password' in validated_data:
-            validated_data['password'] = make_password(validated_data['password'])
+            validated_data['password'] = PasswordHashingService().hash_one(
+                validated_data['password']
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        self._save_doctor(instance)
 
         # Обновляем образование
         if education_data is not None:  # Явное обновление (null = удалить)
@@ -0,0 +1,35 @@
+from rest_framework import serializers
+
+from main.models import Clinic, Doctor
+
+
+class RosterQuerySerializer(serializers.Serializer):
+    """
+    Параметры страницы реестра клиник
+    """
+    MAX_LIMIT = 100
+
+    after = serializers.IntegerField(required=False, min_value=0)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=MAX_LIMIT)
+
+
+class RosterDoctorSerializer(serializers.ModelSerializer):
+    education = serializers.SerializerMethodField()
+    upcoming_consults = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Doctor
+        fields = ["id", "family", "name", "second_name", "gender", "education", "upcoming_consults"]
+
+    def get_education(self, doctor):
+        # educations заполняет Prefetch в ClinicRepository.with_roster
+        return [education.history_education for education in doctor.educations]
+
+
+class ClinicRosterSerializer(serializers.ModelSerializer):
+    doctors = RosterDoctorSerializer(source="roster", many=True, read_only=True)
+    upcoming_consults = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Clinic
+        fields = ["id", "name", "physical_address", "upcoming_consults", "doctors"]
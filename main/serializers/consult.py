@@ -0,0 +1,59 @@
+from rest_framework import serializers
+
+from main.models import Consult
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """
+    Параметры запроса свободных окон врача
+    """
+    MAX_DAYS = 62
+
+    clinic = serializers.IntegerField()
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+
+    def validate(self, data):
+        if data['date_to'] < data['date_from']:
+            raise serializers.ValidationError({
+                'date_to': 'Дата окончания не может быть раньше даты начала.'
+            })
+        if (data['date_to'] - data['date_from']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError({
+                'date_to': f'Диапазон не может превышать {self.MAX_DAYS} дней.'
+            })
+        return data
+
+
+class ConsultBookingSerializer(serializers.Serializer):
+    """
+    Параметры бронирования приёма
+    """
+    doctor = serializers.IntegerField()
+    clinic = serializers.IntegerField()
+    patient = serializers.IntegerField()
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({
+                'end_date': 'Дата окончания не может быть раньше даты начала.'
+            })
+        horizon = Consult.archive_horizon()
+        if horizon and data['start_date'] < horizon:
+            raise serializers.ValidationError({
+                'start_date': 'Нельзя записать приём в архивный период.'
+            })
+        return data
+
+
+class FreeWindowSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class ConsultListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Consult
+        fields = ['id', 'start_date', 'end_date', 'doctor', 'patient', 'clinic']
@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from main.models import Doctor
+
+
+class DoctorLookupSerializer(serializers.ModelSerializer):
+    # clinics - список {"id", "name"}, собранный представлением
+    clinics = serializers.ListField(child=serializers.DictField(), read_only=True)
+
+    class Meta:
+        model = Doctor
+        fields = ["id", "family", "name", "second_name", "gender", "specialty", "experience", "clinics"]
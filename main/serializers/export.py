@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from main.services.export import ExportService
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """
+    Параметры выгрузки консультаций и пациентов
+    """
+    # не format: этот параметр DRF использует для выбора рендерера
+    output = serializers.ChoiceField(choices=ExportService.FORMATS, default='csv')
+    clinic = serializers.IntegerField(required=False)
+    doctor = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_to'] < data['date_from']:
+            raise serializers.ValidationError({
+                'date_to': 'Дата окончания не может быть раньше даты начала.'
+            })
+        return data
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+from main.models import Patient
+from main.repositories.patient import PatientRepository
+
+
+class PatientListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Patient
+        fields = list(PatientRepository.LIST_FIELDS)
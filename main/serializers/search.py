@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from main.services.search import PersonSearchService
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """
+    Параметры поиска пациентов и врачей
+    """
+    q = serializers.CharField(min_length=2, max_length=100)
+    type = serializers.ChoiceField(
+        choices=['all', *PersonSearchService.MODELS], default='all'
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class SearchResultSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    family = serializers.CharField()
+    name = serializers.CharField()
+    second_name = serializers.CharField()
+    phone = serializers.CharField(allow_null=True)
+    rank = serializers.FloatField()
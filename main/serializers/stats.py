@@ -0,0 +1,33 @@
+from rest_framework import serializers
+
+from main.services.stats import ConsultStatsService
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """
+    Параметры сводки приёмов
+    """
+    group_by = serializers.ChoiceField(choices=list(ConsultStatsService.GROUPS), default='day')
+    clinic = serializers.IntegerField(required=False)
+    doctor = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_to'] < data['date_from']:
+            raise serializers.ValidationError({
+                'date_to': 'Дата окончания не может быть раньше даты начала.'
+            })
+        return data
+
+
+class ConsultStatsSerializer(serializers.Serializer):
+    # Заполнено только поле группировки (group_by)
+    day = serializers.DateField(required=False)
+    doctor = serializers.IntegerField(required=False)
+    clinic = serializers.IntegerField(required=False)
+    consults = serializers.IntegerField()
+    cancelled = serializers.IntegerField()
+    busy = serializers.DurationField()
+    utilization = serializers.FloatField()
+    cancel_rate = serializers.FloatField()
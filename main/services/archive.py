@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from main.models import Consult, ConsultArchive
+
+
+@dataclass
+class ConsultArchiveService:
+    """
+    Перенос старых приёмов из Consult в ConsultArchive пачками.
+
+    Consult остаётся небольшим: проверка пересечений, списки, админка
+    и выгрузки работают только с актуальными приёмами. Записать или
+    перенести приём раньше Consult.archive_horizon() нельзя (Consult.clean),
+    поэтому перенесённые приёмы не пересекаются с новыми, а
+    unique_doctor_start_date и consult_doctor_no_overlap по-прежнему
+    действуют на живой таблице. ConsultDailyStats считается по обеим таблицам.
+    """
+    batch_size: int = 5000
+    # Архивировать приёмы только одной клиники
+    clinic_id: int | None = None
+
+    FIELDS = (
+        "id",
+        "create_date",
+        "update_date",
+        "start_date",
+        "end_date",
+        "is_deleted",
+        "doctor_id",
+        "patient_id",
+        "clinic_id",
+    )
+
+    def conditions(self, now: datetime | None = None) -> list[tuple[Q, tuple]]:
+        """
+        Условия переноса и порядок обхода: приёмы, закончившиеся до горизонта
+        архивации, и мягко удалённые давнее CONSULT_ARCHIVE_DELETED_AFTER_DAYS
+        дней. Порядок совпадает с индексом, поэтому пачка с LIMIT читает
+        начало индекса, а не сортирует все подходящие строки.
+        """
+        now = now or timezone.now()
+        scope = Q() if self.clinic_id is None else Q(clinic_id=self.clinic_id)
+        conditions = []
+        horizon = Consult.archive_horizon(now)
+        if horizon:
+            conditions.append((
+                scope
+                & Q(start_date__lt=horizon)
+                & (
+                    Q(end_date__lt=horizon)
+                    | Q(end_date__isnull=True, start_date__lt=horizon - Consult.DEFAULT_DURATION)
+                ),
+                ("start_date", "pk"),
+            ))
+        if settings.CONSULT_ARCHIVE_DELETED_AFTER_DAYS:
+            deleted_before = now - timedelta(days=settings.CONSULT_ARCHIVE_DELETED_AFTER_DAYS)
+            conditions.append((
+                scope & Q(is_deleted=True, update_date__lt=deleted_before),
+                ("update_date", ),
+            ))
+        return conditions
+
+    def count(self, now: datetime | None = None) -> int:
+        """Число приёмов к переносу."""
+        conditions = [condition for condition, _ in self.conditions(now)]
+        if not conditions:
+            return 0
+        return Consult.all_objects.filter(reduce(or_, conditions)).count()
+
+    def archive(self, limit: int | None = None) -> int:
+        """
+        Переносит приёмы пачками по batch_size, каждая в своей транзакции,
+        чтобы не держать блокировки долго. Возвращает число перенесённых.
+        """
+        now = timezone.now()
+        moved = 0
+        for condition, ordering in self.conditions(now):
+            queryset = Consult.all_objects.filter(condition).order_by(*ordering)
+            while limit is None or moved < limit:
+                size = self.batch_size if limit is None else min(self.batch_size, limit - moved)
+                with transaction.atomic():
+                    count = self._move(queryset, size, now)
+                moved += count
+                if count < size:
+                    break
+        return moved
+
+    def _move(self, queryset, size, now) -> int:
+        # Занятые другими транзакциями строки пропускаются до следующего запуска
+        batch = queryset.select_for_update(skip_locked=True)[:size]
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql":
+            return self._move_postgresql(connection, batch, now)
+
+        rows = list(batch.values_list(*self.FIELDS))
+        ConsultArchive.objects.bulk_create(
+            ConsultArchive(**dict(zip(self.FIELDS, row)), archived_date=now) for row in rows
+        )
+        # Без сигналов post_delete: перенос не меняет ни сводку, ни свободные окна
+        Consult.all_objects.filter(pk__in=[row[0] for row in rows])._raw_delete(queryset.db)
+        return len(rows)
+
+    def _move_postgresql(self, connection, batch, now) -> int:
+        """Перенос одним запросом: DELETE ... RETURNING внутри INSERT."""
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(Consult._meta.get_field(name).column) for name in self.FIELDS
+        )
+        ids, params = batch.values("pk").query.get_compiler(connection=connection).as_sql()
+        sql = f"""
+            WITH moved AS (
+                DELETE FROM {quote(Consult._meta.db_table)}
+                WHERE {quote(Consult._meta.pk.column)} IN ({ids})
+                RETURNING {columns}
+            )
+            INSERT INTO {quote(ConsultArchive._meta.db_table)} ({columns}, {quote("archived_date")})
+            SELECT {columns}, %s FROM moved
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, now])
+            return cursor.rowcount
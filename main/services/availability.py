@@ -0,0 +1,171 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from main.models import Consult
+from main.redis import cache_db
+
+
+@dataclass
+class AvailabilityService:
+    """
+    Свободные окна врача.
+
+    Для каждого врача и дня в cache_db хранится отсортированный список
+    объединённых занятых интервалов. Недостающие дни досчитываются одним
+    запросом, свободные окна получаются проходом sweep-line по интервалам.
+    Кеш пересчитывается точечно по сигналам сохранения/удаления приёма.
+
+    Досчитанные при промахе дни записываются через add, а не set: пока
+    читались приёмы, refresh после коммита мог записать более новый
+    список, и его нельзя затирать.
+    """
+    TTL: int = 60 * 60 * 24 * 7
+    KEY_PREFIX = "availability"
+
+    def free_windows(
+        self,
+        doctor_id: int,
+        date_from: date,
+        date_to: date,
+        min_duration: timedelta = Consult.DEFAULT_DURATION,
+    ) -> list[tuple[datetime, datetime]]:
+        """Свободные окна врача с начала date_from до конца date_to."""
+        days = self._days(date_from, date_to)
+        timelines = self.day_timelines(doctor_id, days)
+        return self._windows(timelines, date_from, date_to, min_duration)
+
+    async def afree_windows(
+        self,
+        doctor_id: int,
+        date_from: date,
+        date_to: date,
+        min_duration: timedelta = Consult.DEFAULT_DURATION,
+    ) -> list[tuple[datetime, datetime]]:
+        """Асинхронный free_windows."""
+        days = self._days(date_from, date_to)
+        timelines = await self.aday_timelines(doctor_id, days)
+        return self._windows(timelines, date_from, date_to, min_duration)
+
+    def day_timelines(self, doctor_id: int, days: list[date]) -> dict:
+        """Занятые интервалы по дням: из кеша, недостающие - одним запросом."""
+        keys = {self.key(doctor_id, day): day for day in days}
+        cached = cache_db.get_many(list(keys))
+        timelines = {keys[key]: value for key, value in cached.items()}
+        missing = [day for day in days if day not in timelines]
+        if missing:
+            built = self._build(doctor_id, missing)
+            for day in missing:
+                cache_db.add(self.key(doctor_id, day), built[day], timeout=self.TTL)
+            timelines.update(built)
+        return timelines
+
+    async def aday_timelines(self, doctor_id: int, days: list[date]) -> dict:
+        """Асинхронный day_timelines: строки приёмов читаются async for."""
+        keys = {self.key(doctor_id, day): day for day in days}
+        cached = await cache_db.aget_many(list(keys))
+        timelines = {keys[key]: value for key, value in cached.items()}
+        missing = [day for day in days if day not in timelines]
+        if missing:
+            rows, bounds = self._rows(doctor_id, missing)
+            built = self._group([row async for row in rows], bounds)
+            for day in missing:
+                await cache_db.aadd(self.key(doctor_id, day), built[day], timeout=self.TTL)
+            timelines.update(built)
+        return timelines
+
+    def refresh(self, doctor_id: int, days) -> None:
+        """Пересчитывает кеш только для затронутых дней врача."""
+        days = sorted(set(days))
+        if not days:
+            return
+        built = self._build(doctor_id, days)
+        cache_db.set_many(
+            {self.key(doctor_id, day): built[day] for day in days}, timeout=self.TTL
+        )
+
+    def refresh_intervals(self, intervals) -> None:
+        """Пересчитывает кеш по набору (doctor_id, start_date, end_date)."""
+        days_by_doctor = defaultdict(set)
+        for doctor_id, start_date, end_date in intervals:
+            days_by_doctor[doctor_id].update(self.touched_days(start_date, end_date))
+        for doctor_id, days in days_by_doctor.items():
+            self.refresh(doctor_id, days)
+
+    @classmethod
+    def key(cls, doctor_id: int, day: date) -> str:
+        return f"{cls.KEY_PREFIX}:{doctor_id}:{day.isoformat()}"
+
+    @classmethod
+    def touched_days(cls, start_date: datetime, end_date: datetime | None) -> list[date]:
+        end_date = end_date or start_date + Consult.DEFAULT_DURATION
+        first = timezone.localdate(start_date)
+        # Приём, заканчивающийся ровно в полночь, следующий день не занимает
+        last = timezone.localdate(max(start_date, end_date - timedelta(microseconds=1)))
+        return cls._days(first, last)
+
+    @staticmethod
+    def merge(intervals):
+        """Объединяет пересекающиеся и смежные интервалы (sweep-line)."""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _windows(self, timelines, date_from, date_to, min_duration):
+        busy = []
+        for day in self._days(date_from, date_to):
+            busy.extend(timelines[day])
+
+        range_start, range_end = self._day_bounds(date_from)[0], self._day_bounds(date_to)[1]
+        windows = []
+        cursor = range_start
+        for start, end in self.merge(busy):
+            if start - cursor >= min_duration:
+                windows.append((cursor, start))
+            cursor = max(cursor, end)
+        if range_end - cursor >= min_duration:
+            windows.append((cursor, range_end))
+        return windows
+
+    def _build(self, doctor_id: int, days: list[date]) -> dict:
+        rows, bounds = self._rows(doctor_id, days)
+        return self._group(rows, bounds)
+
+    def _rows(self, doctor_id: int, days: list[date]):
+        """Запрос приёмов врача, задевающих дни days, и границы этих дней."""
+        bounds = {day: self._day_bounds(day) for day in days}
+        windows = Q()
+        for day_start, day_end in bounds.values():
+            windows |= Q(start_date__lt=day_end, end_date__gt=day_start)
+        rows = (
+            Consult.objects.filter(doctor_id=doctor_id)
+            .filter(windows)
+            .values_list("start_date", "end_date")
+        )
+        return rows, bounds
+
+    def _group(self, rows, bounds) -> dict:
+        by_day = defaultdict(list)
+        for start_date, end_date in rows:
+            for day in self.touched_days(start_date, end_date):
+                if day in bounds:
+                    day_start, day_end = bounds[day]
+                    by_day[day].append((max(start_date, day_start), min(end_date, day_end)))
+        return {day: self.merge(by_day[day]) for day in bounds}
+
+    @staticmethod
+    def _day_bounds(day: date) -> tuple[datetime, datetime]:
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+    @staticmethod
+    def _days(date_from: date, date_to: date) -> list[date]:
+        return [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
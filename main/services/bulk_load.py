@@ -0,0 +1,416 @@
+import secrets
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, identify_hasher
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from main.models import Consult, Patient
+from main.repositories.base import chunked
+from main.repositories.cached import invalidate
+from main.serializers.base import UniqueFieldsResolver
+from main.services.availability import AvailabilityService
+from main.services.consult import SLOT_REFERENCES as REFERENCES
+from main.services.consult import ARCHIVED_PERIOD, UNKNOWN_REFERENCE, ConsultBookingService
+from main.services.passwords import PasswordHashingService
+from main.services.stats import ConsultStatsService
+from main.validation_model import validate_social_tag
+
+# Причины отклонения строк
+MISSING_FIELD = "Не заполнено поле {}."
+INVALID_PHONE = "Некорректный номер телефона."
+INVALID_GENDER = "Некорректное значение пола."
+INVALID_DATE = "Некорректная дата начала или окончания."
+INVALID_INTERVAL = "Дата окончания не может быть раньше даты начала."
+EMAIL_TAKEN = "Пациент с таким email уже существует."
+PHONE_TAKEN = "Пациент с таким телефоном уже существует."
+EMAIL_REPEATED = "Email повторяется в загружаемых данных."
+PHONE_REPEATED = "Телефон повторяется в загружаемых данных."
+START_TAKEN = "У врача уже есть приём с таким началом."
+OVERLAP = "Пересечение с существующим приёмом врача."
+OVERLAP_IN_BATCH = "Пересечение с другим приёмом врача в загружаемых данных."
+CONCURRENT_CONFLICT = "Конфликт с записью, добавленной во время загрузки."
+
+PATIENT_COLUMNS = ("name", "family", "second_name", "gender", "email", "phone", "password", "tag_social")
+CONSULT_COLUMNS = ("doctor_id", "clinic_id", "patient_id", "start_date", "end_date")
+
+
+@dataclass
+class RejectedRow:
+    """Отклонённая строка загрузки (line - номер строки во входных данных, с 1)."""
+    line: int
+    reason: str
+
+
+@dataclass
+class BulkLoadReport:
+    loaded: int = 0
+    rejected: list[RejectedRow] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        total = self.loaded + len(self.rejected)
+        return total / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class BulkLoadService:
+    """
+    Массовая загрузка пациентов и консультаций (онбординг клиник, история).
+
+    PostgreSQL (psycopg 3): строки идут через COPY ... FROM STDIN во
+    временную таблицу, конфликты (уникальность, пересечения, ссылки)
+    находятся SQL-запросами над ней, затем один INSERT ... SELECT ... ON
+    CONFLICT DO NOTHING переносит оставшиеся строки. Остальные СУБД (SQLite
+    в тестах): пачки по batch_size через bulk_create с теми же проверками
+    в Python. method: "auto", "copy" или "bulk_create".
+    """
+    batch_size: int = 5000
+    method: str = "auto"
+    using: str = "default"
+
+    def use_copy(self) -> bool:
+        if self.method != "auto":
+            return self.method == "copy"
+        if connections[self.using].vendor != "postgresql":
+            return False
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        return is_psycopg3
+
+    def load_patients(self, rows) -> BulkLoadReport:
+        """Загрузка пациентов из словарей с ключами PATIENT_COLUMNS."""
+        report = BulkLoadReport()
+        started = time.perf_counter()
+        cleaned = self._hash_passwords(self._clean(rows, self._clean_patient, report))
+        with transaction.atomic(using=self.using):
+            if self.use_copy():
+                self._copy_patients(cleaned, report)
+            else:
+                self._bulk_patients(cleaned, report)
+            transaction.on_commit(lambda: invalidate(Patient), using=self.using)
+        report.rejected.sort(key=lambda rejected: rejected.line)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def load_consults(self, rows) -> BulkLoadReport:
+        """Загрузка консультаций из словарей с ключами CONSULT_COLUMNS."""
+        report = BulkLoadReport()
+        started = time.perf_counter()
+        cleaned = self._clean(rows, self._clean_consult, report)
+        with transaction.atomic(using=self.using):
+            if self.use_copy():
+                self._copy_consults(cleaned, report)
+            else:
+                self._bulk_consults(cleaned, report)
+        report.rejected.sort(key=lambda rejected: rejected.line)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+# Блок подготовки строк
+    @staticmethod
+    def _clean(rows, clean_row, report):
+        """Поток (line, values) корректных строк; ошибки формата - в отчёт."""
+        for line, row in enumerate(rows, start=1):
+            try:
+                yield line, clean_row(row)
+            except ValidationError as exc:
+                report.rejected.append(RejectedRow(line, " ".join(exc.messages)))
+
+    @staticmethod
+    def _clean_patient(row) -> tuple:
+        for name in ("name", "family", "email"):
+            if not row.get(name):
+                raise ValidationError(MISSING_FIELD.format(name))
+        phone = row.get("phone") or None
+        if phone is not None:
+            phone = Patient._meta.get_field("phone").to_python(phone)
+            if not phone.is_valid():
+                raise ValidationError(INVALID_PHONE)
+            phone = str(phone)
+        tag_social = row.get("tag_social") or ""
+        validate_social_tag(tag_social)
+        gender = row.get("gender")
+        if gender in (None, ""):
+            gender = False
+        else:
+            # Как в форме и сериализаторе: строка "False" из CSV - это False
+            try:
+                gender = Patient._meta.get_field("gender").to_python(gender)
+            except ValidationError:
+                raise ValidationError(INVALID_GENDER)
+        return (
+            row["name"],
+            row["family"],
+            row.get("second_name") or "",
+            gender,
+            row["email"],
+            phone,
+            # Без пароля - непригодный пароль. make_password(None) берёт
+            # 40 символов через secrets.choice и заметен на сотнях тысяч строк
+            row.get("password") or UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30),
+            tag_social,
+        )
+
+    def _hash_passwords(self, rows):
+        """
+        Пароли открытым текстом хешируются пачками через PasswordHashingService.
+        Уже закодированные хеши (identify_hasher их узнаёт) и непригодные
+        пароли сохраняются как есть.
+        """
+        position = PATIENT_COLUMNS.index("password")
+        service = PasswordHashingService()
+        for batch in chunked(rows, self.batch_size):
+            plain = [
+                index for index, (_, values) in enumerate(batch) if not _is_encoded(values[position])
+            ]
+            hashed = service.hash_many(batch[index][1][position] for index in plain)
+            for index, encoded in zip(plain, hashed):
+                line, values = batch[index]
+                batch[index] = (line, (*values[:position], encoded, *values[position + 1:]))
+            yield from batch
+
+    @staticmethod
+    def _clean_consult(row) -> tuple:
+        for name in ("doctor_id", "clinic_id", "patient_id", "start_date"):
+            if row.get(name) in (None, ""):
+                raise ValidationError(MISSING_FIELD.format(name))
+        try:
+            references = tuple(int(row[column]) for column, _, _ in REFERENCES)
+        except (TypeError, ValueError):
+            raise ValidationError(UNKNOWN_REFERENCE.format("Объект"))
+        try:
+            start_date = _aware(row["start_date"])
+            end_date = _aware(row.get("end_date")) or start_date + Consult.DEFAULT_DURATION
+        except (TypeError, ValueError):
+            raise ValidationError(INVALID_DATE)
+        if end_date < start_date:
+            raise ValidationError(INVALID_INTERVAL)
+        return (*references, start_date, end_date)
+
+# Блок PostgreSQL: COPY во временную таблицу и INSERT ... SELECT
+    def _copy_to_staging(self, cursor, model, columns, rows) -> str:
+        quote = connections[self.using].ops.quote_name
+        staging = quote(f"staging_{model._meta.db_table}")
+        # Загрузка - одна долгая транзакция: DB_STATEMENT_TIMEOUT к ней не относится
+        cursor.execute("SET LOCAL statement_timeout = 0")
+        column_list = ", ".join(quote(model._meta.get_field(name).column) for name in columns)
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {quote(model._meta.db_table)} WITH NO DATA"
+        )
+        cursor.execute(f"ALTER TABLE {staging} ADD COLUMN line bigint")
+        with cursor.copy(f"COPY {staging} (line, {column_list}) FROM STDIN") as copy:
+            for line, values in rows:
+                copy.write_row((line, *values))
+        # Ключ строится после COPY: так быстрее, чем обновлять индекс на каждой строке
+        cursor.execute(f"ALTER TABLE {staging} ADD PRIMARY KEY (line)")
+        cursor.execute(f"ANALYZE {staging}")
+        cursor.execute(
+            "CREATE TEMP TABLE load_rejected (line bigint PRIMARY KEY, reason text) ON COMMIT DROP"
+        )
+        return staging
+
+    @staticmethod
+    def _reject(cursor, select_lines, reason, params=()):
+        """Отклоняет строки из запроса select_lines; первая причина сохраняется."""
+        cursor.execute(
+            f"INSERT INTO load_rejected (line, reason) "
+            f"SELECT line, %s FROM ({select_lines}) AS conflicts "
+            f"ON CONFLICT (line) DO NOTHING",
+            [reason, *params],
+        )
+
+    def _finish_copy(self, cursor, staging, table, columns, extra, key, report):
+        """
+        Вставляет неотклонённые строки одним INSERT ... SELECT и собирает
+        отчёт. Строки, не вставленные из-за параллельной записи (ON CONFLICT
+        DO NOTHING), тоже попадают в отчёт. extra - значения служебных колонок.
+        """
+        columns = ", ".join(columns)
+        accepted = (
+            f"SELECT * FROM {staging} s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM load_rejected r WHERE r.line = s.line)"
+        )
+        cursor.execute(
+            f"WITH inserted AS ("
+            f"INSERT INTO {table} ({columns}, {', '.join(extra)}) "
+            f"SELECT {columns}, {', '.join(extra.values())} FROM ({accepted}) a ORDER BY line "
+            f"ON CONFLICT DO NOTHING RETURNING {', '.join(key)}) "
+            f"SELECT count(i.{key[0]}), array_agg(a.line) FILTER (WHERE i.{key[0]} IS NULL) "
+            f"FROM ({accepted}) a LEFT JOIN inserted i USING ({', '.join(key)})"
+        )
+        report.loaded, lost = cursor.fetchone()
+        if lost:
+            self._reject(cursor, "SELECT unnest(%s::bigint[]) AS line", CONCURRENT_CONFLICT, [lost])
+        cursor.execute("SELECT line, reason FROM load_rejected")
+        report.rejected.extend(RejectedRow(line, reason) for line, reason in cursor.fetchall())
+
+    def _copy_patients(self, rows, report):
+        with connections[self.using].cursor() as cursor:
+            staging = self._copy_to_staging(cursor, Patient, PATIENT_COLUMNS, rows)
+            table = Patient._meta.db_table
+            self._reject(cursor, f"SELECT s.line FROM {staging} s JOIN {table} p ON p.email = s.email", EMAIL_TAKEN)
+            self._reject(cursor, f"SELECT s.line FROM {staging} s JOIN {table} p ON p.phone = s.phone", PHONE_TAKEN)
+            for column, reason in (("email", EMAIL_REPEATED), ("phone", PHONE_REPEATED)):
+                self._reject(
+                    cursor,
+                    f"SELECT line FROM (SELECT line, row_number() OVER "
+                    f"(PARTITION BY {column} ORDER BY line) AS position FROM {staging} "
+                    f"WHERE {column} IS NOT NULL) ranked WHERE position > 1",
+                    reason,
+                )
+            self._finish_copy(
+                cursor, staging, table, PATIENT_COLUMNS, {"is_deleted": "false"}, ["email"], report
+            )
+            cursor.execute(f"DROP TABLE {staging}, load_rejected")
+
+    def _reject_batch_overlaps(self, cursor, staging):
+        """
+        Пересечения внутри загрузки по правилу book_many: побеждает строка
+        выше, отклонённая строка следующие не блокирует. Строки читаются
+        серверным курсором по врачам, в памяти - строки одного врача.
+        """
+        accepted = (
+            f"SELECT line, doctor_id, start_date, end_date FROM {staging} s WHERE NOT EXISTS "
+            f"(SELECT 1 FROM load_rejected r WHERE r.line = s.line) ORDER BY doctor_id, line"
+        )
+        rejected = []
+        with connections[self.using].connection.cursor(name="staged_consults") as rows:
+            rows.itersize = self.batch_size
+            rows.execute(accepted)
+            for _, group in groupby(rows, key=itemgetter(1)):
+                group = [(line, start_date, end_date) for line, _, start_date, end_date in group]
+                reasons = ConsultBookingService.resolve_intervals(group)
+                rejected.extend(line for (line, _, _), reason in zip(group, reasons) if reason)
+        for lines in chunked(rejected, self.batch_size):
+            self._reject(cursor, "SELECT unnest(%s::bigint[]) AS line", OVERLAP_IN_BATCH, [lines])
+
+    def _copy_consults(self, rows, report):
+        with connections[self.using].cursor() as cursor:
+            staging = self._copy_to_staging(cursor, Consult, CONSULT_COLUMNS, rows)
+            table = Consult._meta.db_table
+            # То же правило, что в book_many: архивный период закрыт для записи
+            horizon = Consult.archive_horizon()
+            if horizon:
+                self._reject(
+                    cursor,
+                    f"SELECT s.line FROM {staging} s WHERE s.start_date < %s",
+                    ARCHIVED_PERIOD,
+                    [horizon],
+                )
+            for column, model, label in REFERENCES:
+                self._reject(
+                    cursor,
+                    f"SELECT s.line FROM {staging} s WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {model._meta.db_table} m WHERE m.id = s.{column})",
+                    UNKNOWN_REFERENCE.format(label),
+                )
+            # unique_doctor_start_date - только для живых приёмов
+            self._reject(
+                cursor,
+                f"SELECT s.line FROM {staging} s JOIN {table} c "
+                f"ON c.doctor_id = s.doctor_id AND c.start_date = s.start_date "
+                f"AND NOT c.is_deleted",
+                START_TAKEN,
+            )
+            # Поиск по индексу consult_doctor_interval_idx
+            self._reject(
+                cursor,
+                f"SELECT s.line FROM {staging} s WHERE EXISTS (SELECT 1 FROM {table} c "
+                f"WHERE c.doctor_id = s.doctor_id AND NOT c.is_deleted "
+                f"AND c.start_date < s.end_date AND c.end_date > s.start_date)",
+                OVERLAP,
+            )
+            self._reject_batch_overlaps(cursor, staging)
+            self._finish_copy(
+                cursor,
+                staging,
+                table,
+                CONSULT_COLUMNS,
+                {"is_deleted": "false", "create_date": "now()", "update_date": "now()"},
+                ["doctor_id", "start_date"],
+                report,
+            )
+            # INSERT не отправляет post_save: кеш свободных окон - только для будущих дней
+            cursor.execute(
+                f"SELECT s.doctor_id, s.start_date, s.end_date FROM {staging} s "
+                f"WHERE s.end_date >= now() AND NOT EXISTS "
+                f"(SELECT 1 FROM load_rejected r WHERE r.line = s.line)"
+            )
+            intervals = cursor.fetchall()
+            # Ключи сводки ConsultDailyStats: день - локальная дата начала
+            cursor.execute(
+                f"SELECT DISTINCT s.clinic_id, s.doctor_id, (s.start_date AT TIME ZONE %s)::date "
+                f"FROM {staging} s WHERE NOT EXISTS "
+                f"(SELECT 1 FROM load_rejected r WHERE r.line = s.line)",
+                [timezone.get_current_timezone_name()],
+            )
+            stats_keys = cursor.fetchall()
+            cursor.execute(f"DROP TABLE {staging}, load_rejected")
+        if intervals:
+            transaction.on_commit(
+                lambda: AvailabilityService().refresh_intervals(intervals), using=self.using
+            )
+        if stats_keys:
+            transaction.on_commit(
+                lambda: ConsultStatsService().refresh_keys(stats_keys), using=self.using
+            )
+
+# Блок остальных СУБД: bulk_create пачками
+    def _bulk_patients(self, rows, report):
+        resolver = UniqueFieldsResolver(Patient, {"email": EMAIL_TAKEN, "phone": PHONE_TAKEN})
+        for batch in chunked(rows, self.batch_size):
+            payloads = [dict(zip(PATIENT_COLUMNS, values)) for _, values in batch]
+            to_create = []
+            for (line, _), payload, errors in zip(batch, payloads, resolver.check(payloads)):
+                if errors:
+                    report.rejected.append(
+                        RejectedRow(line, " ".join(message for field in errors.values() for message in field))
+                    )
+                else:
+                    to_create.append(Patient(**payload))
+            Patient.objects.bulk_create(to_create)
+            report.loaded += len(to_create)
+
+    def _bulk_consults(self, rows, report):
+        # Несуществующие врачи, клиники и пациенты отклоняет book_many
+        service = ConsultBookingService()
+        for batch in chunked(rows, self.batch_size):
+            lines = [line for line, _ in batch]
+            result = service.book_many(
+                [dict(zip(CONSULT_COLUMNS, values)) for _, values in batch],
+                insert_batch_size=self.batch_size,
+            )
+            report.loaded += len(result.accepted)
+            report.rejected.extend(
+                RejectedRow(lines[rejected.index], rejected.reason) for rejected in result.rejected
+            )
+
+
+def _is_encoded(password: str) -> bool:
+    if password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return True
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def _aware(value):
+    if value in (None, ""):
+        return None
+    if not isinstance(value, datetime):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        value = parsed
+    return value if timezone.is_aware(value) else timezone.make_aware(value)
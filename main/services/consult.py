@@ -0,0 +1,346 @@
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from main.models import Clinic, Consult, Doctor, Patient
+from main.repositories.base import chunked
+from main.services.availability import AvailabilityService
+from main.services.stats import ConsultStatsService
+
+UNKNOWN_REFERENCE = "{} с указанным id не существует."
+ARCHIVED_PERIOD = "Нельзя записать приём в архивный период."
+# Ссылки слота пакетного бронирования: поле, модель, название в отчёте
+SLOT_REFERENCES = (
+    ("doctor_id", Doctor, "Врач"),
+    ("clinic_id", Clinic, "Клиника"),
+    ("patient_id", Patient, "Пациент"),
+)
+
+
+@dataclass
+class BookingResult:
+    """Результат бронирования: созданный приём или список пересечений."""
+    consult: Consult | None = None
+    conflicts: list[Consult] = field(default_factory=list)
+
+    @property
+    def is_booked(self) -> bool:
+        return self.consult is not None
+
+
+@dataclass
+class RejectedSlot:
+    """Отклонённый слот пакетного бронирования."""
+    index: int
+    slot: dict
+    reason: str
+
+
+@dataclass
+class BulkBookingReport:
+    """Отчёт пакетного бронирования: принятые приёмы и отклонённые слоты."""
+    accepted: list[Consult] = field(default_factory=list)
+    rejected: list[RejectedSlot] = field(default_factory=list)
+
+
+@dataclass
+class ConsultBookingService:
+    """
+    Бронирование приёмов без двойной записи.
+
+    Строка врача блокируется (SELECT ... FOR UPDATE), поэтому параллельные
+    бронирования к одному врачу выполняются по очереди. Пересечения
+    возвращаются одним запросом по индексу consult_doctor_interval_idx.
+    В PostgreSQL дополнительной страховкой служит исключающее ограничение
+    consult_doctor_no_overlap.
+    """
+
+    def book(
+        self,
+        doctor_id: int,
+        clinic_id: int,
+        patient_id: int,
+        start_date: datetime,
+        end_date: datetime | None = None,
+    ) -> BookingResult:
+        if end_date is None:
+            end_date = start_date + Consult.DEFAULT_DURATION
+
+        with transaction.atomic():
+            # Блокировка врача сериализует бронирования к нему
+            Doctor.objects.select_for_update().filter(pk=doctor_id).values_list(
+                "pk", flat=True
+            ).first()
+
+            conflicts = self.find_conflicts(doctor_id, start_date, end_date)
+            if conflicts:
+                return BookingResult(conflicts=conflicts)
+
+            consult = Consult(
+                doctor_id=doctor_id,
+                clinic_id=clinic_id,
+                patient_id=patient_id,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            try:
+                with transaction.atomic():
+                    consult.save(check_overlap=False)
+            except IntegrityError as exc:
+                if not self.is_conflict_error(exc):
+                    raise
+                return BookingResult(
+                    conflicts=self.find_conflicts(doctor_id, start_date, end_date)
+                )
+
+        return BookingResult(consult=consult)
+
+    async def abook(
+        self,
+        doctor_id: int,
+        clinic_id: int,
+        patient_id: int,
+        start_date: datetime,
+        end_date: datetime | None = None,
+    ) -> BookingResult:
+        """
+        Асинхронный book. Транзакций и SELECT ... FOR UPDATE в асинхронном
+        ORM нет, поэтому само бронирование выполняется в потоке.
+        """
+        return await sync_to_async(self.book)(
+            doctor_id, clinic_id, patient_id, start_date, end_date
+        )
+
+    @staticmethod
+    async def amissing_references(doctor_id: int, clinic_id: int, patient_id: int) -> dict:
+        """
+        Проверки врача, пациента и клиники перед бронированием. Возвращает
+        ошибки по полям. Запросы асинхронного ORM одного запроса идут через
+        одно соединение по очереди, поэтому ожидаются последовательно.
+        """
+        doctor = await Doctor.objects.filter(pk=doctor_id).aexists()
+        patient = await Patient.objects.filter(pk=patient_id).aexists()
+        works_at_clinic = doctor and await Clinic.objects.filter(
+            pk=clinic_id, doctors__id=doctor_id
+        ).aexists()
+        errors = {}
+        if not doctor:
+            errors["doctor"] = "Врач не найден."
+        if not patient:
+            errors["patient"] = "Пациент не найден."
+        if doctor and not works_at_clinic:
+            errors["clinic"] = "Врач не работает в этой клинике."
+        return errors
+
+    def book_many(
+        self, slots, doctor_batch_size: int = 100, insert_batch_size: int = 1000
+    ) -> BulkBookingReport:
+        """
+        Пакетное бронирование слотов (doctor_id, clinic_id, patient_id,
+        start_date, end_date).
+
+        Слоты проверяются друг с другом в памяти (побеждает более ранний
+        слот во входных данных) и с существующими приёмами одним запросом
+        на пачку врачей. Слоты с несуществующим врачом, клиникой или
+        пациентом отклоняются: id проверяются одним запросом на модель
+        для пачки. Принятые слоты вставляются через bulk_create.
+        """
+        report = BulkBookingReport()
+        by_doctor = defaultdict(list)
+        horizon = Consult.archive_horizon()
+        for index, slot in enumerate(slots):
+            start_date = slot["start_date"]
+            end_date = slot.get("end_date") or start_date + Consult.DEFAULT_DURATION
+            if end_date < start_date:
+                report.rejected.append(
+                    RejectedSlot(
+                        index, slot, "Дата окончания не может быть раньше даты начала."
+                    )
+                )
+                continue
+            if horizon and start_date < horizon:
+                report.rejected.append(
+                    RejectedSlot(index, slot, ARCHIVED_PERIOD)
+                )
+                continue
+            by_doctor[slot["doctor_id"]].append((index, slot, start_date, end_date))
+
+        # Врачи блокируются в порядке возрастания pk, чтобы избежать взаимных блокировок
+        for doctor_ids in chunked(sorted(by_doctor), doctor_batch_size):
+            with transaction.atomic():
+                # Удалённые врачи тоже блокируются: история по ним загружается
+                locked = set(
+                    Doctor.all_objects.select_for_update()
+                    .filter(pk__in=doctor_ids)
+                    .values_list("pk", flat=True)
+                )
+                doctor_ids = self._reject_unknown_references(
+                    doctor_ids, locked, by_doctor, report
+                )
+                existing = self._existing_intervals(doctor_ids, by_doctor)
+                to_create = []
+                for doctor_id in doctor_ids:
+                    to_create.extend(
+                        self._resolve_doctor_slots(
+                            by_doctor[doctor_id], existing[doctor_id], report
+                        )
+                    )
+                Consult.objects.bulk_create(to_create, batch_size=insert_batch_size)
+                report.accepted.extend(to_create)
+                # bulk_create не отправляет post_save, кеш свободных окон обновляем сами
+                intervals = [
+                    (consult.doctor_id, consult.start_date, consult.end_date)
+                    for consult in to_create
+                ]
+                transaction.on_commit(
+                    lambda intervals=intervals: AvailabilityService().refresh_intervals(
+                        intervals
+                    )
+                )
+                rows = [
+                    (consult.clinic_id, consult.doctor_id, consult.start_date)
+                    for consult in to_create
+                ]
+                transaction.on_commit(
+                    lambda rows=rows: ConsultStatsService().refresh_consults(rows)
+                )
+
+        report.rejected.sort(key=lambda rejected: rejected.index)
+        return report
+
+    @staticmethod
+    def _reject_unknown_references(doctor_ids, locked, by_doctor, report):
+        """
+        Отклоняет слоты пачки с несуществующими ссылками; без этого
+        IntegrityError при коммите отменил бы всю пачку. Возвращает врачей,
+        у которых остались слоты.
+        """
+        slots = [slot for doctor_id in doctor_ids for _, slot, _, _ in by_doctor[doctor_id]]
+        known = {"doctor_id": locked}
+        for column, model, _ in SLOT_REFERENCES[1:]:
+            known[column] = set(
+                model._default_manager.filter(
+                    pk__in={slot[column] for slot in slots}
+                ).values_list("pk", flat=True)
+            )
+        remaining = []
+        for doctor_id in doctor_ids:
+            proposed = []
+            for item in by_doctor[doctor_id]:
+                index, slot, _, _ = item
+                missing = next(
+                    (label for column, _, label in SLOT_REFERENCES if slot[column] not in known[column]),
+                    None,
+                )
+                if missing:
+                    report.rejected.append(
+                        RejectedSlot(index, slot, UNKNOWN_REFERENCE.format(missing))
+                    )
+                else:
+                    proposed.append(item)
+            by_doctor[doctor_id] = proposed
+            if proposed:
+                remaining.append(doctor_id)
+        return remaining
+
+    @staticmethod
+    def _existing_intervals(doctor_ids, by_doctor):
+        """
+        Живые приёмы пачки врачей, попадающие в окно предложенных слотов,
+        одним запросом. Удалённые не занимают время и не участвуют
+        в unique_doctor_start_date.
+        """
+        windows = []
+        for doctor_id in doctor_ids:
+            proposed = by_doctor[doctor_id]
+            window_start = min(start for _, _, start, _ in proposed)
+            window_end = max(end for _, _, _, end in proposed)
+            windows.append(
+                Q(doctor_id=doctor_id, start_date__lt=window_end)
+                & (Q(end_date__gt=window_start) | Q(start_date__gte=window_start))
+            )
+        existing = defaultdict(list)
+        if not windows:
+            return existing
+        rows = Consult.objects.filter(reduce(or_, windows)).values_list(
+            "pk", "doctor_id", "start_date", "end_date"
+        )
+        for pk, doctor_id, start_date, end_date in rows:
+            end_date = end_date or start_date + Consult.DEFAULT_DURATION
+            existing[doctor_id].append((pk, start_date, end_date))
+        return existing
+
+    @staticmethod
+    def resolve_intervals(proposed, existing=()):
+        """
+        Жадный выбор интервалов врача: proposed - (ключ, начало, конец)
+        в порядке приоритета, existing - живые приёмы (pk, начало, конец).
+        Для каждого предложенного интервала по порядку возвращает причину
+        отказа или None. Отклонённый интервал время не занимает: следующие
+        сравниваются только с принятыми и существующими.
+        """
+        # Занятые интервалы не пересекаются, поэтому отсортированы и по началу, и по концу
+        occupied = sorted(
+            (start, end, f"пересечение с приёмом #{pk}") for pk, start, end in existing
+        )
+        starts = [start for start, _, _ in occupied]
+        # Приём нулевой длины не пересекается с другими, но занимает время начала
+        taken_starts = {start for _, start, _ in existing}
+        for key, start_date, end_date in proposed:
+            position = bisect_left(starts, end_date)
+            # Единственный кандидат на пересечение - ближайший интервал, начавшийся раньше конца
+            if position and occupied[position - 1][1] > start_date:
+                yield occupied[position - 1][2]
+            elif start_date in taken_starts:
+                yield "у врача уже есть приём с таким временем начала"
+            else:
+                occupied.insert(position, (start_date, end_date, f"пересечение со слотом #{key}"))
+                starts.insert(position, start_date)
+                taken_starts.add(start_date)
+                yield None
+
+    @classmethod
+    def _resolve_doctor_slots(cls, proposed, existing, report):
+        accepted = []
+        reasons = cls.resolve_intervals(
+            ((index, start_date, end_date) for index, _, start_date, end_date in proposed),
+            existing,
+        )
+        for (index, slot, start_date, end_date), reason in zip(proposed, reasons):
+            if reason:
+                report.rejected.append(RejectedSlot(index, slot, reason))
+                continue
+            accepted.append(
+                Consult(
+                    doctor_id=slot["doctor_id"],
+                    clinic_id=slot["clinic_id"],
+                    patient_id=slot["patient_id"],
+                    start_date=start_date,
+                    end_date=end_date,
+                )
+            )
+        return accepted
+
+    @staticmethod
+    def find_conflicts(doctor_id: int, start_date: datetime, end_date: datetime):
+        """Пересекающиеся живые приёмы врача за один запрос."""
+        return list(
+            Consult.objects.overlapping(
+                doctor=doctor_id, start_date=start_date, end_date=end_date
+            ).order_by("start_date")
+        )
+
+    @staticmethod
+    def is_conflict_error(exc: IntegrityError) -> bool:
+        message = str(exc)
+        return (
+            Consult.OVERLAP_CONSTRAINT in message
+            or "unique_doctor_start_date" in message
+        )
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для строк.
+
+    Отрицательный ответ точный, положительный - с вероятностью ошибки
+    error_rate при заполнении до capacity элементов.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def _default_client():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("tokens")
+
+
+@dataclass
+class RevocationDenylist:
+    """
+    Список отозванных токенов (по jti).
+
+    В Redis хранится sorted set jti -> exp. Каждый процесс держит фильтр
+    Блума, который пересобирается из Redis не чаще раза в sync_interval
+    секунд. Проверка токена, которого нет в фильтре, не обращается к Redis;
+    в Redis уходят только положительные ответы фильтра. Отзыв на другом
+    воркере становится виден здесь не позже чем через sync_interval.
+
+    Недоступность Redis не роняет аутентификацию: при ошибке пересборки
+    остаётся последний собранный фильтр (до первой удачной сборки - пустой),
+    а положительный ответ фильтра, который не удалось проверить в Redis,
+    считается отзывом. Истёкшие записи удаляются не на пути запроса,
+    а командой purge_revoked_tokens.
+    """
+    KEY = "jwt:revoked"
+
+    sync_interval: float = 30.0
+    capacity: int = 100_000
+    error_rate: float = 0.001
+    client: object = None
+
+    _bloom: BloomFilter | None = field(default=None, init=False, repr=False)
+    _synced_at: float = field(default=0.0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def get_client(self):
+        if self.client is None:
+            self.client = _default_client()
+        return self.client
+
+    def revoke(self, jti: str, expires_at: int) -> None:
+        """Отзывает токен до момента expires_at (unix time)."""
+        self.get_client().zadd(self.KEY, {jti: expires_at})
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti: str, local: bool = True) -> bool:
+        if not local:
+            return self._is_revoked_remote(jti)
+        self.sync()
+        if jti not in self._bloom:
+            return False
+        try:
+            return self._is_revoked_remote(jti)
+        except RedisError:
+            logger.exception("Не удалось проверить отзыв токена %s в Redis", jti)
+            return True
+
+    def sync(self, force: bool = False) -> None:
+        """Пересобирает фильтр, если истёк sync_interval."""
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            try:
+                revoked = self.get_client().zrangebyscore(self.KEY, int(time.time()), "+inf")
+            except RedisError:
+                logger.exception("Не удалось пересобрать фильтр отозванных токенов")
+                if self._bloom is None:
+                    self._bloom = BloomFilter(self.capacity, self.error_rate)
+                self._synced_at = time.monotonic()
+                return
+            bloom = BloomFilter(max(self.capacity, len(revoked) * 2), self.error_rate)
+            for jti in revoked:
+                bloom.add(jti.decode() if isinstance(jti, bytes) else jti)
+            self._bloom = bloom
+            self._synced_at = time.monotonic()
+
+    def purge_expired(self) -> int:
+        """Удаляет из Redis записи об истёкших токенах и возвращает их число."""
+        return self.get_client().zremrangebyscore(self.KEY, "-inf", int(time.time()))
+
+    def _is_revoked_remote(self, jti: str) -> bool:
+        expires_at = self.get_client().zscore(self.KEY, jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+denylist = RevocationDenylist()
@@ -0,0 +1,122 @@
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from main.models import Consult, Patient
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: write возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)  # PhoneNumber и прочие объекты полей
+
+
+@dataclass
+class ExportService:
+    """
+    Потоковая выгрузка консультаций и пациентов в CSV или JSONL.
+
+    Строки читаются кортежами values_list через iterator(chunk_size) -
+    в PostgreSQL это серверный курсор, - и сразу превращаются в строки
+    вывода. Память не зависит от объёма выгрузки.
+    """
+    chunk_size: int = 2000
+
+    CONSULT_COLUMNS = ("id", "start_date", "end_date", "clinic_id", "doctor_id", "patient_id")
+    PATIENT_COLUMNS = ("id", "family", "name", "second_name", "gender", "phone", "email")
+    FORMATS = ("csv", "jsonl")
+
+    def consults(self, clinic=None, doctor=None, date_from=None, date_to=None):
+        """Колонки и поток кортежей консультаций, отсортированных по дате начала."""
+        rows = (
+            self._filter_consults(clinic, doctor, date_from, date_to)
+            .order_by("start_date", "pk")
+            .values_list(*self.CONSULT_COLUMNS)
+            .iterator(chunk_size=self.chunk_size)
+        )
+        return self.CONSULT_COLUMNS, rows
+
+    def patients(self, clinic=None, doctor=None, date_from=None, date_to=None):
+        """
+        Колонки и поток кортежей пациентов. С фильтрами - только пациенты,
+        у которых есть подходящие консультации.
+        """
+        queryset = Patient.objects.all()
+        if any(value is not None for value in (clinic, doctor, date_from, date_to)):
+            consults = self._filter_consults(clinic, doctor, date_from, date_to)
+            queryset = queryset.filter(pk__in=consults.values("patient_id"))
+        rows = (
+            queryset.order_by("pk")
+            .values_list(*self.PATIENT_COLUMNS)
+            .iterator(chunk_size=self.chunk_size)
+        )
+        return self.PATIENT_COLUMNS, rows
+
+    def lines(self, columns, rows, file_format: str = "csv"):
+        """Строки выгрузки в формате csv или jsonl (с переводами строк)."""
+        if file_format == "csv":
+            return self.csv_lines(columns, rows)
+        if file_format == "jsonl":
+            return self.jsonl_lines(columns, rows)
+        raise ValueError(f"Неизвестный формат выгрузки: {file_format}")
+
+    async def alines(self, lines):
+        """
+        Асинхронный поток для ASGI: синхронный генератор StreamingHttpResponse
+        там целиком собирается в список. Пачки по chunk_size строк читаются
+        в потоке запроса, где открыт курсор бд.
+        """
+        next_chunk = sync_to_async(lambda: list(islice(lines, self.chunk_size)))
+        try:
+            while chunk := await next_chunk():
+                yield "".join(chunk)
+        finally:
+            await sync_to_async(lines.close)()
+
+    @staticmethod
+    def csv_lines(columns, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([_plain(value) for value in row])
+
+    @staticmethod
+    def jsonl_lines(columns, rows):
+        dumps = json.JSONEncoder(ensure_ascii=False, default=_plain).encode
+        for row in rows:
+            yield dumps(dict(zip(columns, row))) + "\n"
+
+    @staticmethod
+    def _filter_consults(clinic=None, doctor=None, date_from=None, date_to=None):
+        """Фильтры по клинике, врачу и датам начала (включительно, по дням)."""
+        queryset = Consult.objects.all()
+        if clinic is not None:
+            queryset = queryset.filter(clinic_id=clinic)
+        if doctor is not None:
+            queryset = queryset.filter(doctor_id=doctor)
+        # Диапазон по самому полю, а не по __date: работает индекс start_date
+        if date_from is not None:
+            queryset = queryset.filter(
+                start_date__gte=timezone.make_aware(datetime.combine(date_from, time.min))
+            )
+        if date_to is not None:
+            queryset = queryset.filter(
+                start_date__lt=timezone.make_aware(
+                    datetime.combine(date_to + timedelta(days=1), time.min)
+                )
+            )
+        return queryset
@@ -1,13 +1,22 @@
 from main.redis import RefreshTokenStorage
+from main.services.denylist import denylist
 import jwt
+import uuid
 from datetime import timedelta
 from dataclasses import dataclass
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+@lru_cache
+def _verification_key(secret_key: str, algorithm: str):
+    """Ключ проверки подписи, разобранный один раз на процесс."""
+    return jwt.get_algorithm_by_name(algorithm).prepare_key(secret_key)
+
+
 @dataclass
 class JwtAuth:
     SECRET_KEY = os.getenv('SECRET_KEY')
@@ -15,39 +24,139 @@ class JwtAuth:
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES'))
     REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS'))
 
-    token_storage = RefreshTokenStorage(TTL=timedelta(minutes=REFRESH_TOKEN_EXPIRE_DAYS))
-    def create_tokens(self, user_id: str):
+    # TTL в Redis совпадает со сроком жизни refresh-токена (exp)
+    token_storage = RefreshTokenStorage(
+        TTL=int(timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+    )
+
+    def _token_pair(self, user_id: str):
         access_token = self._encode_jwt(
-            payload={"sub": user_id},
+            payload={"sub": user_id, "type": "access"},
             expires_delta=timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
         )
+        refresh_jti = uuid.uuid4().hex
         refresh_token = self._encode_jwt(
-            payload={"sub": user_id},
+            payload={"sub": user_id, "type": "refresh", "jti": refresh_jti},
             expires_delta=timedelta(days=self.REFRESH_TOKEN_EXPIRE_DAYS)
         )
-
-        # Сохраняем refresh_token в DB 1
-        self.token_storage.save_token(token=refresh_token, user_id=user_id)
-
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer"
-        }
+        }, refresh_jti
+
+    def create_tokens(self, user_id: str):
+        tokens, refresh_jti = self._token_pair(user_id)
+
+        # Сохраняем refresh_token в DB 1
+        self.token_storage.save_token(jti=refresh_jti, user_id=user_id)
+
+        return tokens
+
+    def refresh_tokens(self, refresh_token: str):
+        """
+        Ротация: выдаёт новую пару токенов и атомарно заменяет старый
+        refresh-токен новым. Повторное использование уже заменённого
+        refresh-токена считается кражей и отзывает все сессии пользователя.
+        """
+        payload = self._decode_refresh_token(refresh_token)
+        user_id = payload["sub"]
+        tokens, refresh_jti = self._token_pair(user_id)
+        if not self.token_storage.rotate_token(
+            old_jti=payload["jti"], new_jti=refresh_jti, user_id=user_id
+        ):
+            self.token_storage.revoke_all(user_id)
+            raise ValueError("Invalid or expired refresh token")
+        return tokens
 
     def _encode_jwt(self, payload: dict, expires_delta: timedelta):
         from datetime import datetime, timezone
         expire = datetime.now(timezone.utc) + expires_delta
+        payload.setdefault("jti", uuid.uuid4().hex)
         payload.update({"exp": expire})
         return jwt.encode(payload, self.SECRET_KEY, algorithm=self.ALGORITHM)
 
+    def decode_token(self, token: str, verify_exp: bool = True) -> dict:
+        """Проверяет подпись и срок действия локально, без обращения к Redis."""
+        return jwt.decode(
+            token,
+            _verification_key(self.SECRET_KEY, self.ALGORITHM),
+            algorithms=[self.ALGORITHM],
+            options={"require": ["exp", "sub", "jti"], "verify_exp": verify_exp},
+        )
+
+    def verify_access_token(self, token: str, local: bool = True) -> dict:
+        """
+        Проверяет access-токен и возвращает его payload.
+        local=True - отзыв проверяется по локальному фильтру denylist,
+        local=False - запросом в Redis на каждый вызов.
+        """
+        payload = self.decode_token(token)
+        if payload.get("type") != "access":
+            raise jwt.InvalidTokenError("Token is not an access token")
+        if denylist.is_revoked(payload["jti"], local=local):
+            raise jwt.InvalidTokenError("Token has been revoked")
+        return payload
+
+    def revoke_access_token(self, token: str):
+        """Добавляет access-токен в denylist до истечения его срока"""
+        payload = self.decode_token(token, verify_exp=False)
+        denylist.revoke(payload["jti"], expires_at=payload["exp"])
+
+    def _decode_refresh_token(self, token: str) -> dict:
+        try:
+            payload = self.decode_token(token)
+        except jwt.InvalidTokenError:
+            raise ValueError("Invalid or expired refresh token")
+        if payload.get("type") != "refresh":
+            raise ValueError("Invalid or expired refresh token")
+        return payload
+
     def verify_refresh_token(self, token: str) -> str:
-        """Проверяет существование refresh-токен в Redis"""
-        user_id = self.token_storage.get_token(token=token)
+        """Проверяет подпись refresh-токена и его существование в Redis"""
+        payload = self._decode_refresh_token(token)
+        user_id = self.token_storage.get_token(jti=payload["jti"])
         if not user_id:
             raise ValueError("Invalid or expired refresh token")
         return user_id
 
     def revoke_refresh_token(self, token: str):
         """Удаляет refresh-токен"""
-        self.token_storage.revoke_token(token=token)
\ No newline at end of file
+        payload = self._decode_refresh_token(token)
+        self.token_storage.revoke_token(jti=payload["jti"], user_id=payload["sub"])
+
+    def logout_all(self, user_id: str) -> int:
+        """Отзывает все refresh-токены пользователя одной операцией"""
+        return self.token_storage.revoke_all(user_id)
+
+# Блок асинхронных операций (redis.asyncio)
+    async def acreate_tokens(self, user_id: str):
+        tokens, refresh_jti = self._token_pair(user_id)
+        await self.token_storage.asave_token(jti=refresh_jti, user_id=user_id)
+        return tokens
+
+    async def arefresh_tokens(self, refresh_token: str):
+        """Асинхронный refresh_tokens."""
+        payload = self._decode_refresh_token(refresh_token)
+        user_id = payload["sub"]
+        tokens, refresh_jti = self._token_pair(user_id)
+        if not await self.token_storage.arotate_token(
+            old_jti=payload["jti"], new_jti=refresh_jti, user_id=user_id
+        ):
+            await self.token_storage.arevoke_all(user_id)
+            raise ValueError("Invalid or expired refresh token")
+        return tokens
+
+    async def averify_refresh_token(self, token: str) -> str:
+        payload = self._decode_refresh_token(token)
+        user_id = await self.token_storage.aget_token(jti=payload["jti"])
+        if not user_id:
+            raise ValueError("Invalid or expired refresh token")
+        return user_id
+
+    async def arevoke_refresh_token(self, token: str):
+        payload = self._decode_refresh_token(token)
+        await self.token_storage.arevoke_token(jti=payload["jti"], user_id=payload["sub"])
+
+    async def alogout_all(self, user_id: str) -> int:
+        return await self.token_storage.arevoke_all(user_id)
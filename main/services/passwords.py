@@ -0,0 +1,89 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.utils.module_loading import import_string
+
+from main import metrics
+
+_pool = None
+
+
+@lru_cache
+def _load_hasher(path: str):
+    return import_string(path)()
+
+
+def _encode(args):
+    # Выполняется в дочернем процессе: хешер создаётся по пути к классу,
+    # настройки Django в процессе не нужны
+    path, password = args
+    hasher = _load_hasher(path)
+    return hasher.encode(password, hasher.salt())
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS)
+    return _pool
+
+
+@dataclass
+class PasswordHashingService:
+    """
+    Хеширование паролей учётных записей (Doctor, Patient, Admin).
+
+    Одиночный пароль хешируется на месте, пачки - в пуле процессов.
+    Асинхронные методы не блокируют цикл событий ASGI. Используется
+    хешер по умолчанию из PASSWORD_HASHERS (см. PASSWORD_HASHING_PROFILE).
+    """
+    # Меньшие пачки дешевле хешировать на месте, чем передавать в процессы
+    min_pool_batch: int = 4
+
+    @staticmethod
+    def _hasher_path() -> str:
+        hasher = get_hasher()
+        return f"{type(hasher).__module__}.{type(hasher).__qualname__}"
+
+    def hash_one(self, password: str | None) -> str:
+        with metrics.password_hashing():
+            return make_password(password)
+
+    def hash_many(self, passwords) -> list[str]:
+        passwords = list(passwords)
+        with metrics.password_hashing(len(passwords)):
+            if len(passwords) < self.min_pool_batch or None in passwords:
+                return [make_password(password) for password in passwords]
+            path = self._hasher_path()
+            chunksize = max(1, len(passwords) // (settings.PASSWORD_HASHING_WORKERS * 4))
+            return list(
+                _get_pool().map(
+                    _encode, [(path, password) for password in passwords], chunksize=chunksize
+                )
+            )
+
+    async def _ahash(self, password: str | None) -> str:
+        if password is None:
+            return make_password(None)
+        future = _get_pool().submit(_encode, (self._hasher_path(), password))
+        return await asyncio.wrap_future(future)
+
+    async def ahash_one(self, password: str | None) -> str:
+        with metrics.password_hashing():
+            return await self._ahash(password)
+
+    async def ahash_many(self, passwords) -> list[str]:
+        passwords = list(passwords)
+        # Время всей пачки: хеши считаются параллельно в пуле процессов
+        with metrics.password_hashing(len(passwords)):
+            return await asyncio.gather(*(self._ahash(password) for password in passwords))
+
+    def set_passwords(self, accounts, raw_passwords) -> None:
+        """Устанавливает хеши паролей пачке учётных записей без сохранения."""
+        accounts = list(accounts)
+        for account, encoded in zip(accounts, self.hash_many(raw_passwords)):
+            account.password = encoded
@@ -0,0 +1,223 @@
+import re
+from dataclasses import dataclass, field
+
+import phonenumbers
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from main.models import Doctor, Patient
+
+# Те же выражения, что в индексах миграции 0013_search_indexes
+FIO_SQL = "(family || ' ' || name || ' ' || second_name)"
+FIO_TSVECTOR_SQL = f"to_tsvector('simple'::regconfig, {FIO_SQL})"
+TSQUERY_SQL = "to_tsquery('simple'::regconfig, %s)"
+
+# Установлено ли pg_trgm: {alias: bool}, проверяется один раз на процесс
+_trigram = {}
+
+
+def has_trigram(alias: str) -> bool:
+    if alias not in _trigram:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram[alias] = cursor.fetchone() is not None
+    return _trigram[alias]
+
+
+def normalize_phone(text: str, region: str | None = None) -> str | None:
+    """Номер в формате E.164, как он хранится в PhoneNumberField, или None."""
+    try:
+        number = phonenumbers.parse(text, region or settings.SEARCH_PHONE_REGION)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+
+def normalize_phone_digits(text: str, region: str | None = None) -> str:
+    """
+    Цифры части номера для поиска по подстроке в E.164: "+" отбрасывается,
+    ведущий префикс межгорода (8 в России) заменяется кодом страны.
+    """
+    digits = re.sub(r"\D", "", text)
+    if text.lstrip().startswith("+"):
+        return digits
+    metadata = phonenumbers.PhoneMetadata.metadata_for_region(region or settings.SEARCH_PHONE_REGION)
+    prefix = metadata.national_prefix if metadata else None
+    if prefix and digits.startswith(prefix):
+        return f"{metadata.country_code}{digits[len(prefix):]}"
+    return digits
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@dataclass
+class ParsedQuery:
+    """
+    Строка поиска регистратуры: @тег, телефон (полный номер в любом
+    формате или часть цифр) или части слов ФИО.
+    """
+    words: list = field(default_factory=list)
+    phone: str | None = None
+    digits: str | None = None
+    tag: str | None = None
+
+    MIN_DIGITS = 3
+
+    @classmethod
+    def parse(cls, text: str) -> "ParsedQuery":
+        text = text.strip()
+        if text.startswith("@"):
+            return cls(tag=text)
+        digits = re.sub(r"\D", "", text)
+        if len(digits) >= cls.MIN_DIGITS and re.fullmatch(r"[\d\s()+\-.]+", text):
+            return cls(phone=normalize_phone(text), digits=normalize_phone_digits(text))
+        return cls(words=re.findall(r"\w+", text.lower()))
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.words or self.digits or (self.tag and len(self.tag) > 1))
+
+
+@dataclass
+class PersonSearchService:
+    """
+    Поиск пациентов и врачей по части фамилии, имени, отчества, по телефону
+    и по тегу соцсети (только пациенты) с ранжированием.
+
+    В PostgreSQL слова ищутся по префиксу через полнотекстовый индекс ФИО
+    (to_tsvector 'simple'), а с pg_trgm - ещё и по части слова с опечатками
+    (word_similarity); ранг - сумма ts_rank и word_similarity. Полный номер
+    телефона нормализуется phonenumbers и ищется по индексу phone. Без pg_trgm
+    часть номера и тег ищутся перебором, в SQLite перебором ищется всё,
+    а ранг считается в Python.
+
+    Ранжируются не больше CANDIDATES совпадений: короткий префикс вроде
+    "Ивано" находит сотни тысяч строк, и ранг по всем занимает секунды.
+    """
+    limit: int = 20
+
+    CANDIDATES = 1000
+
+    MODELS = {"patient": Patient, "doctor": Doctor}
+    FIELDS = ("id", "family", "name", "second_name", "phone")
+
+    def search(self, text: str, kinds=("patient", "doctor")) -> list[dict]:
+        """Лучшие limit совпадений среди моделей kinds, по убыванию ранга."""
+        query = ParsedQuery.parse(text)
+        if query.is_empty:
+            return []
+        hits = []
+        for kind in kinds:
+            model = self.MODELS[kind]
+            if query.tag and model is not Patient:
+                continue
+            for row in self._search(model, query):
+                row["type"] = kind
+                hits.append(row)
+        hits.sort(key=lambda hit: hit["rank"], reverse=True)
+        return hits[: self.limit]
+
+    def _search(self, model, query: ParsedQuery) -> list[dict]:
+        queryset = model.objects.all()
+        if connections[queryset.db].vendor != "postgresql":
+            return self._search_fallback(queryset, query)
+        queryset = self._search_postgresql(queryset, query, has_trigram(queryset.db))
+        return list(queryset.values(*self.FIELDS, "rank")[: self.limit])
+
+# Блок PostgreSQL
+    @classmethod
+    def _search_postgresql(cls, queryset, query: ParsedQuery, trigram: bool):
+        if query.phone:
+            return queryset.filter(phone=query.phone).annotate(rank=Value(1.0))
+        if query.digits:
+            # LIKE по подстроке; с pg_trgm - по индексу *_phone_trgm
+            return (
+                queryset.filter(phone__contains=query.digits)
+                .annotate(rank=Value(0.5))
+                .order_by("phone")
+            )
+        if query.tag:
+            pattern = f"%{_escape_like(query.tag)}%"
+            rank = (
+                RawSQL("similarity(tag_social, %s)", [query.tag], output_field=FloatField())
+                if trigram
+                else Value(0.5)
+            )
+            return (
+                queryset.filter(RawSQL("tag_social ILIKE %s", [pattern], output_field=BooleanField()))
+                .annotate(rank=rank)
+                .order_by("-rank", "tag_social")
+            )
+
+        # Совпадение по префиксам всех слов; ts_rank для префиксов почти
+        # не различает строки, поэтому в ранг входят и слова целиком
+        tsquery = " & ".join(f"{word}:*" for word in query.words)
+        exact = " | ".join(query.words)
+        matches_sql = f"{FIO_TSVECTOR_SQL} @@ {TSQUERY_SQL}"
+        rank_sql = (
+            f"ts_rank({FIO_TSVECTOR_SQL}, {TSQUERY_SQL})"
+            f" + ts_rank({FIO_TSVECTOR_SQL}, {TSQUERY_SQL})"
+        )
+        matches_params, rank_params = [tsquery], [tsquery, exact]
+        if trigram:
+            text = " ".join(query.words)
+            # %s <% ФИО: word_similarity выше порога pg_trgm, по индексу *_fio_trgm
+            matches_sql = f"({matches_sql} OR %s <%% {FIO_SQL})"
+            rank_sql = f"{rank_sql} + word_similarity(%s, {FIO_SQL})"
+            matches_params.append(text)
+            rank_params.append(text)
+        candidates = queryset.filter(
+            RawSQL(matches_sql, matches_params, output_field=BooleanField())
+        ).values("pk")[: cls.CANDIDATES]
+        return (
+            queryset.filter(pk__in=candidates)
+            .annotate(rank=RawSQL(rank_sql, rank_params, output_field=FloatField()))
+            .order_by("-rank", "family", "name", "second_name", "pk")
+        )
+
+# Блок запасного поиска (SQLite и другие СУБД)
+    def _search_fallback(self, queryset, query: ParsedQuery) -> list[dict]:
+        """
+        Перебор таблицы. Слова сравниваются через iregex: LIKE в SQLite
+        не учитывает регистр только для латиницы. Ранжируются первые
+        limit * 5 кандидатов в порядке ФИО.
+        """
+        if query.phone:
+            queryset = queryset.filter(phone=query.phone)
+        elif query.digits:
+            queryset = queryset.filter(phone__contains=query.digits)
+        elif query.tag:
+            queryset = queryset.filter(tag_social__icontains=query.tag)
+        for word in query.words:
+            pattern = re.escape(word)
+            queryset = queryset.filter(
+                Q(family__iregex=pattern) | Q(name__iregex=pattern) | Q(second_name__iregex=pattern)
+            )
+        rows = list(
+            queryset.order_by("family", "name", "second_name", "pk")
+            .values(*self.FIELDS)[: self.limit * 5]
+        )
+        for row in rows:
+            row["rank"] = self._rank(row, query)
+        rows.sort(key=lambda row: row["rank"], reverse=True)
+        return rows[: self.limit]
+
+    @staticmethod
+    def _rank(row: dict, query: ParsedQuery) -> float:
+        """Доля слов запроса: совпадение слова ФИО - 1, начало - 0.75, часть - 0.5."""
+        if not query.words:
+            return 1.0 if query.phone else 0.5
+        values = [row[name].lower() for name in ("family", "name", "second_name")]
+        total = 0.0
+        for word in query.words:
+            total += max(
+                1.0 if value == word else 0.75 if value.startswith(word) else 0.5 if word in value else 0.0
+                for value in values
+            )
+        return round(total / len(query.words), 4)
@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DurationField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from main.models import Consult, ConsultArchive, ConsultDailyStats
+from main.redis import cache_db
+from main.repositories.base import chunked
+
+
+@dataclass
+class ConsultStatsService:
+    """
+    Статистика приёмов по клиникам, врачам и дням.
+
+    ConsultDailyStats хранит строку на (клиника, врач, день). Затронутые
+    ключи пересчитываются из Consult одним агрегатом на пачку, а не
+    сдвигаются на дельту: пересчёт идемпотентен, а пропущенное событие
+    исправляет следующий refresh_changed. Приёмы считаются по Consult и
+    архиву ConsultArchive. Запросы summary читают сводку, а не таблицы приёмов.
+    """
+    batch_size: int = 500
+    # Рабочий день врача - знаменатель загрузки (utilization)
+    WORKDAY = timedelta(hours=8)
+    WATERMARK_KEY = "consult_stats:watermark"
+    # Запас на транзакции, закоммиченные позже своего update_date
+    WATERMARK_LAG = timedelta(minutes=5)
+    GROUPS = {"day": "day", "doctor": "doctor_id", "clinic": "clinic_id"}
+
+# Блок пересчёта сводки
+    @staticmethod
+    def key(clinic_id: int, doctor_id: int, start_date: datetime) -> tuple:
+        return clinic_id, doctor_id, timezone.localdate(start_date)
+
+    def refresh_consults(self, rows) -> int:
+        """Пересчёт по набору (clinic_id, doctor_id, start_date)."""
+        return self.refresh_keys(self.key(*row) for row in rows)
+
+    def refresh_keys(self, keys) -> int:
+        """
+        Пересчитывает строки сводки для ключей (clinic_id, doctor_id, day).
+        Ключи без приёмов удаляются. Возвращает число ключей.
+        """
+        keys = sorted(set(keys))
+        for chunk in chunked(keys, self.batch_size):
+            condition = Q()
+            for clinic_id, doctor_id, day in chunk:
+                day_start, day_end = _day_bounds(day)
+                condition |= Q(
+                    clinic_id=clinic_id,
+                    doctor_id=doctor_id,
+                    start_date__gte=day_start,
+                    start_date__lt=day_end,
+                )
+            found = self._aggregate_all(condition)
+            present = {(row.clinic_id, row.doctor_id, row.day) for row in found}
+            with transaction.atomic():
+                self._upsert(found)
+                empty = [key for key in chunk if key not in present]
+                if empty:
+                    stale = Q()
+                    for clinic_id, doctor_id, day in empty:
+                        stale |= Q(clinic_id=clinic_id, doctor_id=doctor_id, day=day)
+                    ConsultDailyStats.objects.filter(stale).delete()
+        return len(keys)
+
+    def rebuild(self, date_from: date | None = None, date_to: date | None = None) -> int:
+        """Полный пересчёт сводки (или её части по дням). Возвращает число строк."""
+        stats = ConsultDailyStats.objects.all()
+        condition = Q()
+        if date_from is not None:
+            stats = stats.filter(day__gte=date_from)
+            condition &= Q(start_date__gte=_day_bounds(date_from)[0])
+        if date_to is not None:
+            stats = stats.filter(day__lte=date_to)
+            condition &= Q(start_date__lt=_day_bounds(date_to)[1])
+        created = 0
+        with transaction.atomic():
+            stats.delete()
+            for chunk in chunked(self._aggregate_all(condition), 5000):
+                ConsultDailyStats.objects.bulk_create(chunk)
+                created += len(chunk)
+        return created
+
+    def refresh_changed(self, since: datetime | None = None) -> int:
+        """
+        Задание по расписанию: пересчитывает ключи приёмов, изменённых с
+        прошлого запуска (по update_date). Первый запуск - полный пересчёт.
+        Ловит то, что не прошло через сигналы: bulk_create и update() без
+        смены клиники, врача и дня. Прежний ключ перенесённого через update()
+        приёма неизвестен - после таких правок нужен rebuild.
+        """
+        started = timezone.now()
+        since = since or cache_db.get(self.WATERMARK_KEY)
+        if since is None:
+            count = self.rebuild()
+        else:
+            keys = (
+                Consult.all_objects.filter(update_date__gte=since)
+                .annotate(day=TruncDate("start_date"))
+                .values_list("clinic_id", "doctor_id", "day")
+                .distinct()
+            )
+            count = self.refresh_keys(keys)
+        cache_db.set(self.WATERMARK_KEY, started - self.WATERMARK_LAG, timeout=None)
+        return count
+
+    @classmethod
+    def _aggregate_all(cls, condition: Q) -> list:
+        """
+        Строки сводки по Consult и ConsultArchive. День на границе архивации
+        бывает в обеих таблицах - такие строки складываются.
+        """
+        merged = {}
+        for model in (Consult, ConsultArchive):
+            for row in cls._aggregate(model._default_manager.filter(condition)):
+                key = (row.clinic_id, row.doctor_id, row.day)
+                total = merged.setdefault(key, row)
+                if total is not row:
+                    total.consults += row.consults
+                    total.cancelled += row.cancelled
+                    total.busy += row.busy
+        return list(merged.values())
+
+    @staticmethod
+    def _aggregate(consults):
+        """Строки сводки (без сохранения), посчитанные по выборке приёмов."""
+        alive = Q(is_deleted=False)
+        end_date = Coalesce("end_date", F("start_date") + Consult.DEFAULT_DURATION)
+        rows = (
+            consults.annotate(day=TruncDate("start_date"))
+            .values("clinic_id", "doctor_id", "day")
+            .annotate(
+                consults=Count("pk", filter=alive),
+                cancelled=Count("pk", filter=~alive),
+                busy=Sum(end_date - F("start_date"), filter=alive, output_field=DurationField()),
+            )
+            .order_by()
+        )
+        for row in rows.iterator(chunk_size=5000):
+            row["busy"] = row["busy"] or timedelta()
+            yield ConsultDailyStats(**row)
+
+    @staticmethod
+    def _upsert(rows):
+        ConsultDailyStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["clinic", "doctor", "day"],
+            update_fields=["consults", "cancelled", "busy"],
+        )
+
+# Блок запросов к сводке
+    def summary(
+        self,
+        group_by: str = "day",
+        clinic: int | None = None,
+        doctor: int | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+    ) -> list[dict]:
+        """
+        Итоги по дням, врачам или клиникам: число приёмов и отмен,
+        занятое время, загрузка (busy / WORKDAY на врача в день) и доля отмен.
+        """
+        column = self.GROUPS[group_by]
+        stats = ConsultDailyStats.objects.all()
+        if clinic is not None:
+            stats = stats.filter(clinic_id=clinic)
+        if doctor is not None:
+            stats = stats.filter(doctor_id=doctor)
+        if date_from is not None:
+            stats = stats.filter(day__gte=date_from)
+        if date_to is not None:
+            stats = stats.filter(day__lte=date_to)
+        rows = (
+            stats.values(column)
+            .annotate(
+                consults=Sum("consults"),
+                cancelled=Sum("cancelled"),
+                busy=Sum("busy"),
+                doctor_days=Count("pk"),
+            )
+            .order_by(column)
+        )
+        result = []
+        for row in rows:
+            booked = row["consults"] + row["cancelled"]
+            busy = row["busy"] or timedelta()
+            result.append({
+                group_by: row[column],
+                "consults": row["consults"],
+                "cancelled": row["cancelled"],
+                "busy": busy,
+                "utilization": round(busy / (self.WORKDAY * row["doctor_days"]), 4),
+                "cancel_rate": round(row["cancelled"] / booked, 4) if booked else 0.0,
+            })
+        return result
+
+
+def _day_bounds(day: date) -> tuple[datetime, datetime]:
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
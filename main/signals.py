@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from main.managers import post_soft_delete
+from main.metrics import install_query_recorder
+from main.models import Clinic, Consult, Doctor, Patient
+from main.repositories.cached import invalidate
+from main.services.availability import AvailabilityService
+from main.services.stats import ConsultStatsService
+
+
+@receiver(post_init, sender=Consult)
+def remember_consult_interval(sender, instance, **kwargs):
+    """Запоминает исходный интервал, чтобы пересчитать и старые дни."""
+    instance._initial_interval = (
+        instance.doctor_id,
+        instance.start_date,
+        instance.end_date,
+    )
+    instance._initial_stats_row = (
+        instance.clinic_id,
+        instance.doctor_id,
+        instance.start_date,
+    )
+
+
+@receiver(post_save, sender=Consult)
+def refresh_availability_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    intervals = [(instance.doctor_id, instance.start_date, instance.end_date)]
+    doctor_id, start_date, end_date = instance._initial_interval
+    if doctor_id and start_date:
+        intervals.append((doctor_id, start_date, end_date))
+    instance._initial_interval = intervals[0]
+    transaction.on_commit(lambda: AvailabilityService().refresh_intervals(intervals))
+
+
+@receiver(post_delete, sender=Consult)
+def refresh_availability_on_delete(sender, instance, **kwargs):
+    intervals = [(instance.doctor_id, instance.start_date, instance.end_date)]
+    transaction.on_commit(lambda: AvailabilityService().refresh_intervals(intervals))
+
+
+@receiver(post_soft_delete, sender=Consult)
+def refresh_availability_on_soft_delete(sender, pks, **kwargs):
+    intervals = list(
+        Consult.all_objects.filter(pk__in=pks).values_list(
+            "doctor_id", "start_date", "end_date"
+        )
+    )
+    transaction.on_commit(lambda: AvailabilityService().refresh_intervals(intervals))
+
+
+def _refresh_stats_on_commit(rows):
+    transaction.on_commit(lambda: ConsultStatsService().refresh_consults(rows))
+
+
+@receiver(post_save, sender=Consult)
+def refresh_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rows = [(instance.clinic_id, instance.doctor_id, instance.start_date)]
+    if all(instance._initial_stats_row):
+        rows.append(instance._initial_stats_row)
+    instance._initial_stats_row = rows[0]
+    _refresh_stats_on_commit(rows)
+
+
+@receiver(post_delete, sender=Consult)
+def refresh_stats_on_delete(sender, instance, **kwargs):
+    _refresh_stats_on_commit([(instance.clinic_id, instance.doctor_id, instance.start_date)])
+
+
+@receiver(post_soft_delete, sender=Consult)
+def refresh_stats_on_soft_delete(sender, pks, **kwargs):
+    _refresh_stats_on_commit(list(
+        Consult.all_objects.filter(pk__in=pks).values_list(
+            "clinic_id", "doctor_id", "start_date"
+        )
+    ))
+
+
+def _invalidate_on_commit(*models):
+    transaction.on_commit(lambda: [invalidate(model) for model in models])
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_save, sender=Clinic)
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_delete, sender=Clinic)
+@receiver(post_delete, sender=Patient)
+@receiver(post_soft_delete, sender=Doctor)
+@receiver(post_soft_delete, sender=Clinic)
+@receiver(post_soft_delete, sender=Patient)
+def invalidate_repository_cache(sender, **kwargs):
+    _invalidate_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=Clinic.doctors.through)
+def invalidate_clinic_doctors_cache(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        _invalidate_on_commit(Clinic, Doctor)
+
+
+@receiver(connection_created)
+def record_request_queries(sender, connection, **kwargs):
+    """Число и время SQL-запросов в счётчики HTTP-запроса (main.metrics)."""
+    install_query_recorder(connection)
@@ -0,0 +1,47 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from main.query_budget import query_budget
+
+
+class QueryBudgetTestMixin:
+    """
+    Проверки числа SQL-запросов для TestCase.
+
+    Включает QUERY_BUDGET_ENFORCE: запрос тестового клиента к маршруту
+    из QUERY_BUDGETS, выполнивший больше запросов, завершается
+    QueryBudgetExceeded. assertMaxQueries ограничивает блок кода,
+    assertConstantQueries ловит N+1 - рост числа запросов с размером данных:
+
+        class DoctorSerializerTests(QueryBudgetTestMixin, TestCase):
+            def test_bulk_create(self):
+                def create(size):
+                    serializer = DoctorCreateUpdateSerializer(data=payloads(size), many=True)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+
+                self.assertConstantQueries(create)
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(QUERY_BUDGET_ENFORCE=True))
+
+    def assertMaxQueries(self, limit: int, using: str = DEFAULT_DB_ALIAS):
+        """Контекстный менеджер: запрос сверх limit выбрасывает QueryBudgetExceeded."""
+        return query_budget(limit, connections[using])
+
+    def assertConstantQueries(self, func, sizes=(1, 10), using: str = DEFAULT_DB_ALIAS):
+        """
+        Вызывает func(size) для каждого размера из sizes и проверяет, что
+        число запросов не зависит от размера.
+        """
+        counts = {}
+        for size in sizes:
+            with CaptureQueriesContext(connections[using]) as queries:
+                func(size)
+            counts[size] = len(queries)
+        if len(set(counts.values())) > 1:
+            self.fail(f"Число запросов растёт с размером данных (N+1): {counts}")
+        return counts
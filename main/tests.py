@@ -1,3 +1,1425 @@
-from django.test import TestCase
+import json
+from importlib import import_module
+from datetime import date, datetime, time, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import fakeredis
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from MIS import settings as project_settings
+from main.cache_backends import NearCache
+from main.db_pool import pool_stats, warm_up
+from main.hashers import SeedingPBKDF2PasswordHasher
+from main.managers import post_soft_delete
+from main.models import Clinic, Consult, ConsultArchive, Doctor, Education, EducationEntry, Patient
+from main.redis import RefreshTokenStorage
+from main.repositories import cached
+from main.repositories.doctor import DoctorRepository
+from main.repositories.patient import PatientRepository
+from main.serializers.base import DoctorCreateUpdateSerializer
+from main.services.archive import ConsultArchiveService
+from main.services.availability import AvailabilityService
+from main.services.bulk_load import (
+    EMAIL_TAKEN,
+    INVALID_GENDER,
+    INVALID_PHONE,
+    MISSING_FIELD,
+    BulkLoadService,
+)
+from main.services.consult import ARCHIVED_PERIOD, UNKNOWN_REFERENCE, ConsultBookingService
+from main.services.denylist import RevocationDenylist, denylist
+from main.services.export import ExportService
+from main.services.iwt import JwtAuth
+from main.services.passwords import PasswordHashingService
+from main.services.search import PersonSearchService
+from main.services.stats import ConsultStatsService
+from main.testing import QueryBudgetTestMixin
+from main.validation_model import EDUCATION_TEXT_MAX_LENGTH, education_validator
+
+
+def make_clinic(i=0, doctors=()):
+    clinic = Clinic.objects.create(
+        name=f"Клиника {i}", juridical_address="-", physical_address="-"
+    )
+    clinic.doctors.add(*doctors)
+    return clinic
+
+
+def make_doctor(i=0):
+    return Doctor.objects.create(
+        name="Сергей",
+        family=f"Врачов{i}",
+        second_name="Олегович",
+        email=f"doctor-{i}@example.com",
+        phone=f"+7916{i:07d}",
+        password="-",
+        date_birth=date(1980, 1, 1),
+        date_start_work=date(2005, 1, 1),
+        salary=1,
+        specialty="терапевт",
+        experience=1,
+    )
+
+
+def make_patient(i=0, **fields):
+    values = {
+        "name": "Иван",
+        "family": "Иванов",
+        "second_name": "Петрович",
+        "email": f"patient-{i}@example.com",
+        "phone": f"+7903{i:07d}",
+        "password": "-",
+        "tag_social": f"@patient{i}",
+    }
+    values.update(fields)
+    return Patient.objects.create(**values)
+
+
+class LocMemCacheMixin:
+    """Кеш репозиториев, доступности и статистики в памяти вместо Redis."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = LocMemCache(f"tests-{id(self)}", {})
+        for module in ("main.repositories.cached", "main.services.availability", "main.services.stats"):
+            self.enterContext(mock.patch(f"{module}.cache_db", self.cache))
+
+
+class ApiAuthMixin:
+    """
+    Действительный access-токен в self.headers. Denylist и хранилище
+    refresh-токенов работают на fakeredis.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(denylist, "client", fakeredis.FakeRedis()))
+        self.enterContext(mock.patch.object(denylist, "_bloom", None))
+        self.enterContext(mock.patch.object(denylist, "_synced_at", 0.0))
+        auth = JwtAuth()
+        auth.token_storage = RefreshTokenStorage(TTL=3600, client=fakeredis.FakeRedis())
+        self.headers = {"Authorization": f"Bearer {auth.create_tokens('1')['access_token']}"}
+
+
+# Блок бронирования
+class ConsultBookingTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+        self.patient = make_patient()
+        self.start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        self.service = ConsultBookingService()
+
+    def book(self, start=None):
+        return self.service.book(
+            doctor_id=self.doctor.pk,
+            clinic_id=self.clinic.pk,
+            patient_id=self.patient.pk,
+            start_date=start or self.start,
+        )
+
+    def cancel(self, consult):
+        Consult.objects.filter(pk=consult.pk).update(is_deleted=True)
+
+    def test_overlap_is_rejected(self):
+        first = self.book()
+        second = self.book(self.start + timedelta(minutes=2))
+
+        self.assertTrue(first.is_booked)
+        self.assertFalse(second.is_booked)
+        self.assertEqual(second.conflicts, [first.consult])
+
+    def test_deleted_consult_does_not_block_overlap(self):
+        self.cancel(self.book().consult)
+
+        result = self.book(self.start + timedelta(minutes=2))
+
+        self.assertTrue(result.is_booked)
+
+    def test_start_of_deleted_consult_can_be_booked(self):
+        self.cancel(self.book().consult)
+
+        result = self.book()
+
+        self.assertTrue(result.is_booked)
+        self.assertEqual(Consult.all_objects.filter(start_date=self.start).count(), 2)
+
+    def test_book_many_resolves_overlaps(self):
+        existing = self.book().consult
+        slot = {
+            "doctor_id": self.doctor.pk,
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+        }
+        slots = [
+            # Пересекается с существующим приёмом
+            {**slot, "start_date": self.start + timedelta(minutes=2)},
+            {**slot, "start_date": self.start + timedelta(hours=2)},
+            # Пересекается с принятым слотом #1
+            {**slot, "start_date": self.start + timedelta(hours=2, minutes=2)},
+            {
+                **slot,
+                "start_date": self.start + timedelta(hours=4),
+                "end_date": self.start + timedelta(hours=3),
+            },
+        ]
+
+        report = self.service.book_many(slots)
+
+        self.assertEqual(
+            [consult.start_date for consult in report.accepted], [self.start + timedelta(hours=2)]
+        )
+        self.assertEqual(
+            [(rejected.index, rejected.reason) for rejected in report.rejected],
+            [
+                (0, f"пересечение с приёмом #{existing.pk}"),
+                (2, "пересечение со слотом #1"),
+                (3, "Дата окончания не может быть раньше даты начала."),
+            ],
+        )
+
+    def test_book_many_reuses_start_of_deleted_consult(self):
+        self.cancel(self.book().consult)
+        slot = {
+            "doctor_id": self.doctor.pk,
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+            "start_date": self.start,
+        }
+
+        report = self.service.book_many([slot, dict(slot)])
+
+        self.assertEqual(len(report.accepted), 1)
+        self.assertEqual([rejected.index for rejected in report.rejected], [1])
+
+    def test_book_many_rejects_unknown_references(self):
+        slot = {
+            "doctor_id": self.doctor.pk,
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+            "start_date": self.start,
+        }
+        slots = [
+            {**slot, "patient_id": 999},
+            {**slot, "doctor_id": 999},
+            {**slot, "clinic_id": 999},
+            slot,
+        ]
+
+        report = self.service.book_many(slots)
+
+        self.assertEqual(len(report.accepted), 1)
+        self.assertEqual(
+            sorted((rejected.index, rejected.reason) for rejected in report.rejected),
+            [
+                (0, UNKNOWN_REFERENCE.format("Пациент")),
+                (1, UNKNOWN_REFERENCE.format("Врач")),
+                (2, UNKNOWN_REFERENCE.format("Клиника")),
+            ],
+        )
+
+    def test_book_many_accepts_history_without_archiving(self):
+        report = self.service.book_many([{
+            "doctor_id": self.doctor.pk,
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+            "start_date": self.start - timedelta(days=400),
+        }])
+
+        self.assertEqual(len(report.accepted), 1)
+
+    @override_settings(CONSULT_ARCHIVE_AFTER_DAYS=365)
+    def test_archived_period_is_closed_for_both_load_paths(self):
+        row = {
+            "doctor_id": self.doctor.pk,
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+            "start_date": (self.start - timedelta(days=400)).isoformat(),
+        }
+
+        # Путь bulk_create; COPY на PostgreSQL отклоняет то же условие
+        report = BulkLoadService(method="bulk_create").load_consults([row])
+
+        self.assertEqual(report.loaded, 0)
+        self.assertEqual([(item.line, item.reason) for item in report.rejected], [(1, ARCHIVED_PERIOD)])
+
+
+# Блок свободных окон
+class AvailabilityCacheTests(LocMemCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+        self.patient = make_patient()
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.service = AvailabilityService()
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.day, time(hour)))
+
+    def book(self, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ConsultBookingService().book(
+                doctor_id=self.doctor.pk,
+                clinic_id=self.clinic.pk,
+                patient_id=self.patient.pk,
+                start_date=self.at(hour),
+            )
+
+    def test_free_windows_around_consult(self):
+        self.book(10)
+        day_start, day_end = AvailabilityService._day_bounds(self.day)
+
+        windows = self.service.free_windows(self.doctor.pk, self.day, self.day)
+
+        self.assertEqual(
+            windows,
+            [(day_start, self.at(10)), (self.at(10) + Consult.DEFAULT_DURATION, day_end)],
+        )
+
+    def test_booking_refreshes_cached_day(self):
+        self.assertEqual(self.service.day_timelines(self.doctor.pk, [self.day]), {self.day: []})
+
+        self.book(10)
+
+        with self.assertNumQueries(0):
+            timeline = self.service.day_timelines(self.doctor.pk, [self.day])[self.day]
+        self.assertEqual(timeline, [(self.at(10), self.at(10) + Consult.DEFAULT_DURATION)])
+
+    def test_miss_does_not_overwrite_newer_timeline(self):
+        build = self.service._build
+
+        def stale_build(doctor_id, days):
+            # Пока читались приёмы, другой запрос записал приём и обновил кеш
+            stale = build(doctor_id, days)
+            self.book(10)
+            return stale
+
+        with mock.patch.object(self.service, "_build", stale_build):
+            self.assertEqual(self.service.day_timelines(self.doctor.pk, [self.day]), {self.day: []})
+
+        self.assertEqual(len(self.cache.get(AvailabilityService.key(self.doctor.pk, self.day))), 1)
+        self.assertEqual(len(self.service.day_timelines(self.doctor.pk, [self.day])[self.day]), 1)
+
+
+# Блок репозиториев
+class RepositoryBaseTests(TestCase):
+    def setUp(self):
+        self.patients = [make_patient(i) for i in range(3)]
+        self.repository = PatientRepository()
+
+    def test_update_one_changes_only_given_row(self):
+        first, second, _ = self.patients
+
+        self.assertEqual(self.repository.update_one(first.pk, name="Пётр"), 1)
+
+        names = Patient.objects.filter(pk__in=[first.pk, second.pk]).order_by("pk")
+        self.assertEqual(list(names.values_list("name", flat=True)), ["Пётр", "Иван"])
+
+    def test_get_many_reads_in_batches(self):
+        ids = [patient.pk for patient in self.patients]
+
+        with self.assertNumQueries(2):
+            patients = self.repository.get_many(ids, batch_size=2)
+
+        self.assertEqual(sorted(patient.pk for patient in patients), ids)
+
+    def test_update_many_and_delete_many(self):
+        first, second, third = self.patients
+
+        self.repository.update_many(
+            [{"pk": first.pk, "name": "Пётр"}, {"pk": second.pk, "name": "Павел"}],
+            ["name"],
+            batch_size=1,
+        )
+        deleted = self.repository.delete_many([first.pk, third.pk], batch_size=1)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(list(Patient.objects.values_list("name", flat=True)), ["Павел"])
+
+
+# Блок мягкого удаления
+class SoftDeleteManagerTests(TestCase):
+    def test_objects_hide_deleted_rows(self):
+        alive = make_patient()
+        deleted = make_patient(1, is_deleted=True)
+
+        self.assertEqual(list(Patient.objects.all()), [alive])
+        self.assertEqual(list(Patient.objects.deleted()), [deleted])
+        # Проверки уникальности и админка видят и удалённые строки
+        self.assertEqual(Patient._default_manager.count(), 2)
+
+    def test_soft_delete_is_one_update(self):
+        patients = [make_patient(i) for i in range(3)]
+        receiver = mock.Mock()
+        post_soft_delete.connect(receiver, sender=Patient, weak=False)
+        self.addCleanup(post_soft_delete.disconnect, receiver, sender=Patient)
+
+        with self.assertNumQueries(2):
+            count = Patient.objects.filter(pk__in=[patients[0].pk, patients[1].pk]).soft_delete()
+
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(receiver.call_args.kwargs["pks"]), [patients[0].pk, patients[1].pk])
+        self.assertEqual(list(Patient.objects.all()), [patients[2]])
+
+
+# Блок врачей
+def doctor_payload(i):
+    return {
+        "name": "Сергей",
+        "family": f"Новый{i}",
+        "second_name": "Олегович",
+        "email": f"new-doctor-{i}@example.com",
+        "phone": f"+7917{i:07d}",
+        "password": "secret",
+        "date_birth": "1980-01-01",
+        "date_start_work": "2005-01-01",
+        "salary": 1,
+        "specialty": "терапевт",
+        "experience": 1,
+    }
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class DoctorSerializerTests(TestCase):
+    def test_email_of_deleted_doctor_is_taken(self):
+        doctor = make_doctor()
+        Doctor.objects.filter(pk=doctor.pk).update(is_deleted=True)
+
+        serializer = DoctorCreateUpdateSerializer(data={**doctor_payload(0), "email": doctor.email})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors, {"email": ["Врач с таким email уже существует."]})
+
+    def test_batch_uniqueness_is_one_query(self):
+        payloads = [doctor_payload(i) for i in range(3)]
+        payloads.append({**doctor_payload(3), "phone": payloads[0]["phone"]})
+        serializer = DoctorCreateUpdateSerializer(data=payloads, many=True)
+
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+
+        self.assertEqual(
+            serializer.errors, [{}, {}, {}, {"phone": ["Врач с таким телефоном уже существует."]}]
+        )
+
+    def test_update_keeps_own_email(self):
+        doctor = make_doctor()
+        payload = {**doctor_payload(0), "email": doctor.email, "phone": str(doctor.phone)}
+
+        serializer = DoctorCreateUpdateSerializer(doctor, data=payload)
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_bulk_create_with_education(self):
+        entry = {"name": "МГМУ", "specialty": "терапия", "start_date": "2000-09-01", "end_date": "2006-06-30"}
+        payloads = [
+            {**doctor_payload(0), "education": {"universities": [entry], "ordinator": [entry]}},
+            doctor_payload(1),
+        ]
+        serializer = DoctorCreateUpdateSerializer(data=payloads, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        doctors = serializer.save()
+
+        self.assertEqual(len(doctors), 2)
+        self.assertTrue(check_password("secret", Doctor.objects.get(pk=doctors[1].pk).password))
+        self.assertEqual(list(Education.objects.values_list("doctor_id", flat=True)), [doctors[0].pk])
+
+    def test_validate_rows_reports_each_row(self):
+        rows = [
+            doctor_payload(0),
+            {**doctor_payload(1), "salary": "много"},
+            {**doctor_payload(2), "email": doctor_payload(0)["email"]},
+        ]
+
+        checked, errors = DoctorCreateUpdateSerializer(many=True).validate_rows(rows)
+
+        self.assertEqual([index for index, _ in checked], [0])
+        self.assertEqual(list(errors[1]), ["salary"])
+        self.assertEqual(errors[2], {"email": ["Врач с таким email уже существует."]})
+
+
+# Блок паролей
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class PasswordHashingServiceTests(SimpleTestCase):
+    def test_hash_many_in_pool(self):
+        passwords = [f"secret-{i}" for i in range(4)]
+
+        encoded = PasswordHashingService().hash_many(passwords)
+
+        self.assertEqual(len(set(encoded)), 4)
+        for password, value in zip(passwords, encoded):
+            self.assertTrue(check_password(password, value))
+
+    async def test_ahash_one(self):
+        encoded = await PasswordHashingService().ahash_one("secret")
+
+        self.assertTrue(check_password("secret", encoded))
+
+    def test_seeding_hash_is_checked_by_pbkdf2(self):
+        encoded = SeedingPBKDF2PasswordHasher().encode("secret", "salt")
+
+        with self.settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"]):
+            self.assertTrue(check_password("secret", encoded))
+
+
+# Блок валидации образования
+class EducationValidatorTests(SimpleTestCase):
+    def document(self, **fields):
+        entry = {"name": "МГМУ", "specialty": "терапия", "start_date": "2000-09-01", "end_date": "2006-06-30"}
+        return {"universities": [{**entry, **fields}], "ordinator": []}
+
+    def test_valid_document(self):
+        self.assertEqual(education_validator.errors(self.document()), {})
+        self.assertEqual(education_validator.clean(self.document())["advanced_training"], [])
+
+    def test_invalid_entries(self):
+        document = self.document(start_date="2007-09-01")
+        del document["ordinator"]
+        document["universities"].append(
+            {"name": " ", "specialty": "терапия", "start_date": "2000-13-01", "end_date": "2006-06-30"}
+        )
+
+        errors = education_validator.errors(document)
+
+        self.assertEqual(
+            errors,
+            {
+                "ordinator": "Отсутствует обязательное поле: 'ordinator'.",
+                "universities[0].end_date": "В записи 'universities[0]' дата окончания раньше даты начала.",
+                "universities[1].name": (
+                    "Запись в 'universities[1]' должна содержать непустое поле 'name' (строка)."
+                ),
+                "universities[1].start_date": (
+                    "Поле 'universities[1].start_date' должно быть датой в формате ГГГГ-ММ-ДД."
+                ),
+            },
+        )
+
+    def test_model_uses_the_same_schema(self):
+        with self.assertRaises(DjangoValidationError):
+            Education(history_education={"universities": []}).clean()
+
+    def test_text_fits_education_entry(self):
+        limit = EDUCATION_TEXT_MAX_LENGTH
+        self.assertEqual(education_validator.errors(self.document(name="в" * limit)), {})
+
+        errors = education_validator.errors(self.document(name="в" * (limit + 1), specialty="с" * (limit + 1)))
+
+        self.assertEqual(
+            errors,
+            {
+                "universities[0].name": f"Поле 'universities[0].name' должно быть не длиннее {limit} символов.",
+                "universities[0].specialty": (
+                    f"Поле 'universities[0].specialty' должно быть не длиннее {limit} символов."
+                ),
+            },
+        )
+
+
+class EducationEntryTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor()
+        university = {"name": "МГМУ", "specialty": "терапия", "start_date": "2000-09-01", "end_date": "2006-06-30"}
+        ordinator = {"name": "НИИ", "specialty": "кардиология", "start_date": "2006-09-01", "end_date": "2008-06-30"}
+        self.education = Education.objects.create(
+            doctor=self.doctor, history_education={"universities": [university], "ordinator": [ordinator]}
+        )
+
+    def test_save_rebuilds_entries(self):
+        self.assertEqual(
+            sorted(EducationEntry.objects.values_list("section", "name")),
+            [("ordinator", "НИИ"), ("universities", "МГМУ")],
+        )
+
+        self.education.history_education = {"universities": [], "ordinator": []}
+        self.education.save()
+
+        self.assertFalse(EducationEntry.objects.exists())
+
+    def test_repository_lookups(self):
+        repository = DoctorRepository()
+
+        self.assertEqual(list(repository.trained_at("МГМУ", since_year=2000)), [self.doctor])
+        self.assertEqual(list(repository.trained_at("МГМУ", since_year=2001)), [])
+        self.assertEqual(list(repository.with_ordinator_specialty("кардиология")), [self.doctor])
+        self.assertEqual(list(repository.with_ordinator_specialty("терапия")), [])
+
+
+class EducationBackfillTests(TestCase):
+    def test_backfill_skips_values_longer_than_columns(self):
+        backfill_entries = import_module("main.migrations.0008_educationentry").backfill_entries
+        entry = {"name": "МГМУ", "specialty": "терапия", "start_date": "2000-09-01", "end_date": "2006-06-30"}
+        education = Education.objects.create(
+            doctor=make_doctor(), history_education={"universities": [entry], "ordinator": []}
+        )
+        # Старые данные, записанные до проверки длины
+        Education.objects.filter(pk=education.pk).update(history_education={
+            "universities": [entry, {**entry, "name": "в" * (EDUCATION_TEXT_MAX_LENGTH + 1)}],
+            "ordinator": [{**entry, "specialty": "с" * (EDUCATION_TEXT_MAX_LENGTH + 1)}],
+        })
+        EducationEntry.objects.all().delete()
+
+        backfill_entries(django_apps, None)
+
+        self.assertEqual(list(EducationEntry.objects.values_list("section", "name")), [("universities", "МГМУ")])
+
+
+# Блок аутентификации
+class RevocationDenylistTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.denylist = RevocationDenylist(client=self.redis)
+        self.expires_at = int(datetime.now().timestamp()) + 3600
+
+    def test_revocation_is_seen_after_sync(self):
+        other_worker = RevocationDenylist(client=self.redis)
+        self.assertFalse(other_worker.is_revoked("revoked"))
+
+        self.denylist.revoke("revoked", self.expires_at)
+
+        self.assertTrue(self.denylist.is_revoked("revoked"))
+        # До следующей синхронизации другой процесс отзыв не видит
+        self.assertFalse(other_worker.is_revoked("revoked"))
+        other_worker.sync(force=True)
+        self.assertTrue(other_worker.is_revoked("revoked"))
+        self.assertFalse(other_worker.is_revoked("active"))
+
+    def test_redis_outage_keeps_last_filter(self):
+        self.denylist.revoke("revoked", self.expires_at)
+        self.denylist.sync(force=True)
+
+        failure = RedisConnectionError("connection refused")
+        with mock.patch.object(self.redis, "zrangebyscore", side_effect=failure), \
+                mock.patch.object(self.redis, "zscore", side_effect=failure), \
+                self.assertLogs("main.services.denylist", "ERROR"):
+            self.denylist.sync(force=True)
+            self.assertTrue(self.denylist.is_revoked("revoked"))
+            self.assertFalse(self.denylist.is_revoked("active"))
+
+    def test_redis_outage_before_first_sync(self):
+        failure = RedisConnectionError("connection refused")
+        with mock.patch.object(self.redis, "zrangebyscore", side_effect=failure), \
+                self.assertLogs("main.services.denylist", "ERROR"):
+            self.assertFalse(self.denylist.is_revoked("active"))
+
+    def test_sync_leaves_cleanup_to_purge(self):
+        self.redis.zadd(RevocationDenylist.KEY, {"expired": self.expires_at - 7200})
+        self.denylist.revoke("revoked", self.expires_at)
+
+        with mock.patch.object(self.redis, "zremrangebyscore") as cleanup:
+            self.denylist.sync(force=True)
+        cleanup.assert_not_called()
+        self.assertEqual(self.denylist.purge_expired(), 1)
+        self.assertEqual(self.redis.zrange(RevocationDenylist.KEY, 0, -1), [b"revoked"])
+
+
+class JwtAuthenticationTests(ApiAuthMixin, LocMemCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        doctor = make_doctor()
+        clinic = make_clinic(doctors=[doctor])
+        day = timezone.localdate().isoformat()
+        self.url = f"/api/doctors/{doctor.pk}/availability/?clinic={clinic.pk}&date_from={day}&date_to={day}"
+
+    def test_valid_token(self):
+        response = self.client.get(self.url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_revoked_token_is_rejected(self):
+        JwtAuth().revoke_access_token(self.headers["Authorization"].split()[1])
+
+        response = self.client.get(self.url, headers=self.headers)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+
+    def test_anonymous_requests_are_rejected(self):
+        for url in (self.url, "/api/patients/", "/api/patients/export/", "/api/search/?q=Иван"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+
+
+# Блок refresh-токенов
+class RefreshTokenRotationTests(SimpleTestCase):
+    """Ротация refresh-токенов на fakeredis вместо Redis."""
+
+    def setUp(self):
+        self.storage = RefreshTokenStorage(TTL=3600, client=fakeredis.FakeRedis())
+        self.auth = JwtAuth()
+        self.auth.token_storage = self.storage
+
+    def test_rotation_replaces_token(self):
+        tokens = self.auth.create_tokens("1")
+        rotated = self.auth.refresh_tokens(tokens["refresh_token"])
+
+        self.assertEqual(self.auth.verify_refresh_token(rotated["refresh_token"]), "1")
+        with self.assertRaises(ValueError):
+            self.auth.verify_refresh_token(tokens["refresh_token"])
+
+    def test_reuse_revokes_all_sessions(self):
+        stolen = self.auth.create_tokens("1")
+        other_session = self.auth.create_tokens("1")
+        rotated = self.auth.refresh_tokens(stolen["refresh_token"])
+
+        with self.assertRaises(ValueError):
+            self.auth.refresh_tokens(stolen["refresh_token"])
+        for tokens in (rotated, other_session):
+            with self.assertRaises(ValueError):
+                self.auth.verify_refresh_token(tokens["refresh_token"])
+
+    def test_revoke_all(self):
+        first = self.auth.create_tokens("1")
+        second = self.auth.create_tokens("1")
+        foreign = self.auth.create_tokens("2")
+
+        self.assertEqual(self.auth.logout_all("1"), 2)
+        for tokens in (first, second):
+            with self.assertRaises(ValueError):
+                self.auth.verify_refresh_token(tokens["refresh_token"])
+        self.assertEqual(self.auth.verify_refresh_token(foreign["refresh_token"]), "2")
+
+    def test_rotate_token_rejects_foreign_owner(self):
+        self.storage.save_token("old", "1")
+        self.assertFalse(self.storage.rotate_token("old", "new", "2"))
+        self.assertEqual(self.storage.get_token("old"), "1")
+
+    def test_rotate_token_replaces_jti_in_user_set(self):
+        self.storage.save_token("old", "1")
+        self.assertTrue(self.storage.rotate_token("old", "new", "1"))
+        self.assertEqual(self.storage.client.smembers("user_tokens:1"), {b"new"})
+
+    def test_save_token_prunes_expired_jti(self):
+        self.storage.save_token("expired", "1")
+        self.storage.client.delete("refresh:expired")
+        self.storage.save_token("live", "1")
+        self.assertEqual(self.storage.client.smembers("user_tokens:1"), {b"live"})
+
+    def test_user_set_outlives_longest_token(self):
+        self.storage.save_token("long", "1")
+        self.storage.save_token("short", "1", ttl=60)
+        self.assertGreaterEqual(self.storage.client.ttl("user_tokens:1"), self.storage.TTL - 1)
+
+    def test_async_save_token_prunes_expired_jti(self):
+        client = self.storage.async_client = fakeredis.FakeAsyncRedis()
+
+        async def save_after_expiry():
+            await self.storage.asave_token("expired", "1")
+            await client.delete("refresh:expired")
+            await self.storage.asave_token("live", "1", ttl=60)
+            return await client.smembers("user_tokens:1"), await client.ttl("user_tokens:1")
+
+        members, ttl = async_to_sync(save_after_expiry)()
+        self.assertEqual(members, {b"live"})
+        self.assertGreaterEqual(ttl, self.storage.TTL - 1)
+
+
+# Блок кеша репозиториев
+class CachedRepositoryTests(LocMemCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_patient()
+        self.repository = PatientRepository()
+
+    def test_miss_then_hit(self):
+        with self.assertNumQueries(1):
+            self.repository.get_one(self.patient.pk)
+        with self.assertNumQueries(0):
+            cached_patient = self.repository.get_one(self.patient.pk)
+
+        self.assertEqual(cached_patient.email, self.patient.email)
+        self.assertGreaterEqual(cached.cache_stats["main.patient:hit"], 1)
+
+    def test_save_invalidates(self):
+        self.repository.get_one(self.patient.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.name = "Пётр"
+            self.patient.save()
+
+        self.assertEqual(self.repository.get_one(self.patient.pk).name, "Пётр")
+
+    def test_update_one_invalidates(self):
+        self.repository.get_one(self.patient.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.repository.update_one(self.patient.pk, name="Пётр")
+
+        self.assertEqual(self.repository.get_one(self.patient.pk).name, "Пётр")
+
+    def test_update_many_invalidates(self):
+        self.repository.get_one(self.patient.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.repository.update_many([{"pk": self.patient.pk, "name": "Пётр"}], ["name"])
+
+        self.assertEqual(self.repository.get_one(self.patient.pk).name, "Пётр")
+
+    def test_record_many_invalidates(self):
+        version = cached.get_version(Patient)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.repository.record_many([{"name": "Пётр", "email": "new@example.com"}])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(cached.get_version(Patient), version)
+
+    def test_invalidation_waits_for_commit(self):
+        self.repository.get_one(self.patient.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.repository.update_one(self.patient.pk, name="Пётр")
+            with self.assertNumQueries(0):
+                self.repository.get_one(self.patient.pk)
+
+        self.assertEqual(len(callbacks), 1)
+
+    def test_cached_list(self):
+        other = make_patient(1, name="Пётр")
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [patient.pk for patient in self.repository.get_all_cached(name="Пётр")], [other.pk]
+            )
+        with self.assertNumQueries(0):
+            self.repository.get_all_cached(name="Пётр")
+        # Другие фильтры - другой ключ
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.repository.get_all_cached()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.repository.update_one(self.patient.pk, name="Пётр")
+
+        self.assertEqual(len(self.repository.get_all_cached(name="Пётр")), 2)
+
+
+class LookupViewsCacheTests(ApiAuthMixin, LocMemCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+
+    def get_doctor(self):
+        return self.client.get(f"/api/async/doctors/{self.doctor.pk}/", headers=self.headers).json()
+
+    def test_doctor_card_is_cached(self):
+        with self.assertNumQueries(2):
+            self.get_doctor()
+        with self.assertNumQueries(0):
+            card = self.get_doctor()
+        self.assertEqual(card["clinics"], [{"id": self.clinic.pk, "name": self.clinic.name}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = make_clinic(1, doctors=[self.doctor])
+
+        self.assertEqual([clinic["id"] for clinic in self.get_doctor()["clinics"]], [self.clinic.pk, other.pk])
+
+    def test_availability_checks_clinic_through_cache(self):
+        url = f"/api/doctors/{self.doctor.pk}/availability/"
+        day = (timezone.localdate() + timedelta(days=1)).isoformat()
+        params = {"clinic": self.clinic.pk, "date_from": day, "date_to": day}
+
+        self.assertEqual(self.client.get(url, params, headers=self.headers).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, params, headers=self.headers).status_code, 200)
+
+        other = make_clinic(1)
+        response = self.client.get(url, {**params, "clinic": other.pk}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+# Блок двухуровневого кеша
+class NearCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = NearCache(
+            "near-cache-tests",
+            {"OPTIONS": {"REMOTE_BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCAL_TIMEOUT": 60}},
+        )
+        self.cache.clear()
+
+    def test_local_hit_skips_remote(self):
+        self.cache.set("key", {"value": 1})
+
+        with mock.patch.object(self.cache.remote, "get") as remote_get:
+            value = self.cache.get("key")
+
+        remote_get.assert_not_called()
+        self.assertEqual(value, {"value": 1})
+        # Каждый get возвращает свою копию
+        value["value"] = 2
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+
+    def test_invalidation_from_other_process(self):
+        self.cache.set("key", 1)
+        key = self.cache.make_key("key")
+        self.cache.remote.set(key, 2)
+        self.assertEqual(self.cache.get("key"), 1)
+
+        self.cache._on_message(json.dumps(["other-process", [key]]))
+
+        self.assertEqual(self.cache.get("key"), 2)
+
+
+# Блок реестра клиник
+class ClinicRosterQueriesTests(ApiAuthMixin, TestCase):
+    def add_clinics(self, count):
+        start = Clinic.objects.count()
+        for i in range(start, start + count):
+            make_clinic(i, doctors=[make_doctor(i)])
+
+    def test_queries_do_not_grow_with_clinics(self):
+        # Бюджет маршрута - одно число и для представления, и для теста
+        budget = settings.QUERY_BUDGETS["clinic-roster"]
+        for total in (10, 100):
+            self.add_clinics(total - Clinic.objects.count())
+            with self.assertNumQueries(budget):
+                response = self.client.get("/api/clinics/roster/?limit=100", headers=self.headers)
+            self.assertEqual(len(response.json()["results"]), total)
+
+
+# Блок пагинации
+class KeysetPaginationTests(ApiAuthMixin, TestCase):
+    def test_pages_follow_cursor(self):
+        for i, family in enumerate(("Сидоров", "Иванов", "Петров", "Иванов", "Алексеев")):
+            make_patient(i, family=family)
+        expected = list(
+            Patient.objects.order_by("family", "name", "second_name", "pk").values_list("pk", flat=True)
+        )
+
+        seen = []
+        url = "/api/patients/?page_size=2"
+        while url:
+            page = self.client.get(url, headers=self.headers).json()
+            seen.extend(patient["id"] for patient in page["results"])
+            url = page["next"]
+
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get("/api/patients/?cursor=broken", headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+# Блок админки
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "-"))
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+        self.patient = make_patient()
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_consult_changelist_queries_do_not_grow(self):
+        start = timezone.now() + timedelta(days=1)
+
+        def add_consults(first, last):
+            for i in range(first, last):
+                Consult.objects.create(
+                    doctor=self.doctor,
+                    clinic=self.clinic,
+                    patient=self.patient,
+                    start_date=start + timedelta(hours=i),
+                )
+
+        add_consults(0, 1)
+        single = self.changelist_queries("/admin/main/consult/")
+        add_consults(1, 10)
+        self.assertEqual(self.changelist_queries("/admin/main/consult/"), single)
+
+    def test_education_changelist_queries_do_not_grow(self):
+        entry = {"name": "МГМУ", "specialty": "терапия", "start_date": "2000-09-01", "end_date": "2006-06-30"}
+
+        def add_educations(doctors):
+            for doctor in doctors:
+                Education.objects.create(doctor=doctor, history_education={"universities": [entry], "ordinator": []})
+
+        add_educations([self.doctor])
+        single = self.changelist_queries("/admin/main/education/")
+        add_educations(make_doctor(i) for i in range(1, 5))
+        self.assertEqual(self.changelist_queries("/admin/main/education/"), single)
+
+
+# Блок выгрузки
+class ExportStreamingTests(ApiAuthMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[doctor])
+        self.patient = make_patient()
+        make_patient(1)
+        start = timezone.now() + timedelta(days=1)
+        for i in range(3):
+            Consult.objects.create(
+                doctor=doctor, clinic=self.clinic, patient=self.patient, start_date=start + timedelta(hours=i)
+            )
+
+    def export(self, url):
+        response = self.client.get(url, headers=self.headers)
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_consults_csv(self):
+        lines = self.export("/api/consults/export/?output=csv")
+
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0], "id,start_date,end_date,clinic_id,doctor_id,patient_id")
+
+    def test_patients_filtered_by_clinic(self):
+        other = make_clinic(1)
+
+        lines = self.export(f"/api/patients/export/?output=jsonl&clinic={self.clinic.pk}")
+
+        self.assertEqual([json.loads(line)["email"] for line in lines], [self.patient.email])
+        self.assertEqual(self.export(f"/api/patients/export/?output=jsonl&clinic={other.pk}"), [])
+
+    async def test_asgi_export_streams_asynchronously(self):
+        response = await self.async_client.get(
+            "/api/consults/export/?output=jsonl", headers=self.headers
+        )
+
+        self.assertTrue(response.is_async)
+        lines = b"".join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_wsgi_export_streams_synchronously(self):
+        response = self.client.get("/api/consults/export/?output=csv", headers=self.headers)
+
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 4)
+
+    async def test_lines_are_read_in_chunks(self):
+        service = ExportService(chunk_size=2)
+        lines = service.lines(("id",), iter([(1,), (2,), (3,)]), "jsonl")
+
+        chunks = [chunk async for chunk in service.alines(lines)]
+
+        self.assertEqual(chunks, ['{"id": 1}\n{"id": 2}\n', '{"id": 3}\n'])
+
+
+# Блок массовой загрузки
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BulkLoadPatientsTests(TestCase):
+    def load(self, *rows, method="bulk_create"):
+        return BulkLoadService(method=method).load_patients(
+            {"name": "Иван", "family": "Иванов", "email": f"load-{i}@example.com", **row}
+            for i, row in enumerate(rows)
+        )
+
+    def rejected(self, method):
+        """Загружает пачку с ошибками и откатывает её; возвращает число принятых и причины отказа."""
+        with transaction.atomic():
+            make_patient(email="load-0@example.com")
+            report = self.load({}, {"name": ""}, {"phone": "12"}, {}, method=method)
+            transaction.set_rollback(True)
+        return report.loaded, [(row.line, row.reason) for row in report.rejected]
+
+    def test_invalid_rows_are_rejected(self):
+        self.assertEqual(
+            self.rejected("bulk_create"),
+            (1, [(1, EMAIL_TAKEN), (2, MISSING_FIELD.format("name")), (3, INVALID_PHONE)]),
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "COPY есть только в PostgreSQL")
+    def test_copy_rejects_the_same_rows(self):
+        self.assertEqual(self.rejected("copy"), self.rejected("bulk_create"))
+
+    def test_plain_passwords_are_hashed(self):
+        encoded = make_password("secret")
+        report = self.load({"password": "hunter2"}, {"password": encoded}, {})
+
+        self.assertEqual(report.loaded, 3)
+        plain, kept, empty = Patient.objects.order_by("email")
+        self.assertNotEqual(plain.password, "hunter2")
+        self.assertTrue(check_password("hunter2", plain.password))
+        self.assertEqual(kept.password, encoded)
+        self.assertFalse(check_password("", empty.password))
+
+    def test_gender_strings_are_parsed(self):
+        report = self.load({"gender": "False"}, {"gender": "True"}, {"gender": ""}, {"gender": "maybe"})
+
+        self.assertEqual(report.loaded, 3)
+        self.assertEqual(
+            list(Patient.objects.order_by("email").values_list("gender", flat=True)),
+            [False, True, False],
+        )
+        self.assertEqual([(row.line, row.reason) for row in report.rejected], [(4, INVALID_GENDER)])
+
+
+class BulkLoadConsultsTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+        self.patient = make_patient()
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def at(self, hour, minute):
+        return timezone.make_aware(datetime.combine(self.day, time(hour, minute)))
+
+    def row(self, hour, **fields):
+        return {
+            "doctor_id": self.doctor.pk,
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+            "start_date": self.at(hour, 0).isoformat(),
+            **fields,
+        }
+
+    def test_unknown_references_are_rejected(self):
+        for method in ("bulk_create", "copy") if connection.vendor == "postgresql" else ("bulk_create",):
+            with self.subTest(method=method), transaction.atomic():
+                report = BulkLoadService(method=method).load_consults(
+                    [self.row(9, patient_id=999), self.row(10, doctor_id=999), self.row(11)]
+                )
+                transaction.set_rollback(True)
+
+            self.assertEqual(report.loaded, 1)
+            self.assertEqual([rejected.line for rejected in report.rejected], [1, 2])
+
+    def load(self, method):
+        """Загружает одну пачку и откатывает её; возвращает принятые и отклонённые строки."""
+        intervals = [
+            ((9, 0), (9, 10)),
+            # Пересекается с первой строкой и отклоняется
+            ((9, 5), (10, 0)),
+            # Пересекается только с отклонённой строкой
+            ((9, 30), (9, 40)),
+            # Пересекается с существующим приёмом
+            ((12, 15), (12, 45)),
+            # Не пересекается, но отклонённая строка выше её не блокирует
+            ((12, 40), (13, 0)),
+            ((9, 0), (9, 0)),
+        ]
+        rows = [
+            {
+                "doctor_id": self.doctor.pk,
+                "clinic_id": self.clinic.pk,
+                "patient_id": self.patient.pk,
+                "start_date": self.at(*start).isoformat(),
+                "end_date": self.at(*end).isoformat(),
+            }
+            for start, end in intervals
+        ]
+        with transaction.atomic():
+            existing = Consult.objects.create(
+                doctor=self.doctor, clinic=self.clinic, patient=self.patient,
+                start_date=self.at(12, 0), end_date=self.at(12, 30),
+            )
+            report = BulkLoadService(method=method).load_consults(rows)
+            loaded = set(
+                Consult.objects.exclude(pk=existing.pk).values_list("start_date", "end_date")
+            )
+            transaction.set_rollback(True)
+        return loaded, [rejected.line for rejected in report.rejected]
+
+    def test_rejected_rows_do_not_block_later_rows(self):
+        loaded, rejected = self.load("bulk_create")
+
+        self.assertEqual(
+            loaded,
+            {
+                (self.at(9, 0), self.at(9, 10)),
+                (self.at(9, 30), self.at(9, 40)),
+                (self.at(12, 40), self.at(13, 0)),
+            },
+        )
+        self.assertEqual(rejected, [2, 4, 6])
+
+    @skipUnless(connection.vendor == "postgresql", "COPY есть только в PostgreSQL")
+    def test_copy_matches_bulk_create(self):
+        self.assertEqual(self.load("copy"), self.load("bulk_create"))
+
+
+# Блок пула соединений
+class DatabasePoolTests(TestCase):
+    def test_database_options(self):
+        timeout = f"-c statement_timeout={project_settings.DB_STATEMENT_TIMEOUT}"
+        with mock.patch.object(project_settings, "DB_POOL", False):
+            self.assertEqual(project_settings.database_options(), {"options": timeout})
+        with mock.patch.object(project_settings, "DB_POOL", True):
+            pool = project_settings.database_options()["pool"]
+
+        self.assertEqual(pool["min_size"], project_settings.DB_POOL_MIN_SIZE)
+        self.assertEqual(pool["max_size"], project_settings.DB_POOL_MAX_SIZE)
+
+    @skipUnless(
+        connection.vendor == "postgresql" and "pool" in settings.DATABASES["default"]["OPTIONS"],
+        "пул есть только у PostgreSQL с DB_POOL=1",
+    )
+    def test_warm_up_opens_pool(self):
+        warm_up()
+
+        stats = pool_stats()["default"]
+        self.assertEqual(stats["pool_min"], settings.DATABASES["default"]["OPTIONS"]["pool"]["min_size"])
+        self.assertGreaterEqual(stats["pool_size"], stats["pool_min"])
+
+
+# Блок асинхронных представлений
+class AsyncViewTests(ApiAuthMixin, LocMemCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+        self.patient = make_patient()
+
+    def book(self, payload=None, **headers):
+        return self.client.post(
+            "/api/async/consults/book/",
+            data=json.dumps({
+                "doctor": self.doctor.pk,
+                "clinic": self.clinic.pk,
+                "patient": self.patient.pk,
+                "start_date": (timezone.now() + timedelta(days=1)).isoformat(),
+                **(payload or {}),
+            }),
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_anonymous_requests_are_rejected(self):
+        response = self.client.get(f"/api/async/patients/{self.patient.pk}/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+
+        self.assertEqual(self.book().status_code, 401)
+        self.assertFalse(Consult.objects.exists())
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get(
+            f"/api/async/patients/{self.patient.pk}/", headers={"Authorization": "Bearer x"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_authenticated_requests(self):
+        response = self.client.get(f"/api/async/patients/{self.patient.pk}/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["email"], self.patient.email)
+
+        self.assertEqual(self.book(**self.headers).status_code, 201)
+        self.assertEqual(Consult.objects.count(), 1)
+
+    def test_overlapping_booking_is_conflict(self):
+        self.assertEqual(self.book(**self.headers).status_code, 201)
+
+        response = self.book(**self.headers)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.json()["conflicts"]), 1)
+
+    def test_doctor_card_and_availability(self):
+        response = self.client.get(f"/api/async/doctors/{self.doctor.pk}/", headers=self.headers)
+        self.assertEqual([clinic["id"] for clinic in response.json()["clinics"]], [self.clinic.pk])
+
+        day = (timezone.localdate() + timedelta(days=1)).isoformat()
+        response = self.client.get(
+            f"/api/async/doctors/{self.doctor.pk}/availability/",
+            {"clinic": self.clinic.pk, "date_from": day, "date_to": day},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_unknown_references_are_bad_request(self):
+        other_clinic = make_clinic(1)
+
+        response = self.book({"patient": 999}, **self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"patient": "Пациент не найден."})
+
+        response = self.book({"clinic": other_clinic.pk}, **self.headers)
+        self.assertEqual(response.json(), {"clinic": "Врач не работает в этой клинике."})
+
+        response = self.book({"doctor": 999}, **self.headers)
+        self.assertEqual(response.json(), {"doctor": "Врач не найден."})
+        self.assertFalse(Consult.objects.exists())
+
+    def test_model_validation_error_is_bad_request(self):
+        error = DjangoValidationError({"start_date": "Нельзя записать приём в архивный период."})
+        with mock.patch.object(ConsultBookingService, "book", side_effect=error):
+            response = self.book(**self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"start_date": ["Нельзя записать приём в архивный период."]})
+
+
+# Блок статистики
+class ConsultStatsTests(LocMemCacheMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor()
+        self.clinic = make_clinic(doctors=[self.doctor])
+        self.patient = make_patient()
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.service = ConsultStatsService()
+
+    def book(self, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ConsultBookingService().book(
+                doctor_id=self.doctor.pk,
+                clinic_id=self.clinic.pk,
+                patient_id=self.patient.pk,
+                start_date=timezone.make_aware(datetime.combine(self.day, time(hour))),
+            ).consult
+
+    def test_booking_and_cancellation_refresh_summary(self):
+        self.book(9)
+        consult = self.book(10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Consult.objects.filter(pk=consult.pk).soft_delete()
+
+        [row] = self.service.summary(group_by="doctor")
+
+        self.assertEqual(
+            (row["doctor"], row["consults"], row["cancelled"], row["busy"], row["cancel_rate"]),
+            (self.doctor.pk, 1, 1, Consult.DEFAULT_DURATION, 0.5),
+        )
+
+    def test_rebuild_matches_incremental_refresh(self):
+        self.book(9)
+        self.book(11)
+        summary = self.service.summary(group_by="day")
+
+        self.assertEqual(self.service.rebuild(), 1)
+        self.assertEqual(self.service.summary(group_by="day"), summary)
+
+
+# Блок архива
+@override_settings(CONSULT_ARCHIVE_AFTER_DAYS=365, CONSULT_ARCHIVE_DELETED_AFTER_DAYS=30)
+class ConsultArchiveTests(TestCase):
+    def setUp(self):
+        doctor = make_doctor()
+        clinic = make_clinic(doctors=[doctor])
+        patient = make_patient()
+        now = timezone.now()
+        # bulk_create обходит Consult.clean и save, поэтому end_date задаётся явно
+        self.old, self.recent, self.deleted = Consult.all_objects.bulk_create([
+            Consult(
+                doctor=doctor, clinic=clinic, patient=patient, start_date=start, end_date=start + Consult.DEFAULT_DURATION
+            )
+            for start in (now - timedelta(days=400), now + timedelta(days=1), now + timedelta(days=2))
+        ])
+        Consult.all_objects.filter(pk=self.deleted.pk).update(is_deleted=True, update_date=now - timedelta(days=40))
+
+    def test_old_and_long_deleted_consults_are_moved(self):
+        service = ConsultArchiveService(batch_size=1)
+        self.assertEqual(service.count(), 2)
+
+        self.assertEqual(service.archive(), 2)
+
+        self.assertEqual(list(Consult.all_objects.values_list("pk", flat=True)), [self.recent.pk])
+        self.assertEqual(
+            sorted(ConsultArchive.objects.values_list("pk", flat=True)), [self.old.pk, self.deleted.pk]
+        )
+
+    @override_settings(CONSULT_ARCHIVE_AFTER_DAYS=0, CONSULT_ARCHIVE_DELETED_AFTER_DAYS=0)
+    def test_nothing_is_moved_when_disabled(self):
+        self.assertEqual(ConsultArchiveService().archive(), 0)
+
+    def test_admin_does_not_delete_archive(self):
+        ConsultArchiveService().archive()
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "-"))
+
+        response = self.client.post(f"/admin/main/consultarchive/{self.old.pk}/delete/", {"post": "yes"})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(ConsultArchive.objects.filter(pk=self.old.pk).exists())
+
+
+# Блок поиска
+class PersonSearchTests(TestCase):
+    def test_name_phone_and_tag(self):
+        patient = make_patient(family="Смирнов", tag_social="@smirnov")
+        make_patient(1)
+        doctor = make_doctor()
+
+        cases = {
+            "смирн": [("patient", patient.pk)],
+            "Сергей Врачов": [("doctor", doctor.pk)],
+            "8 (903) 000-00-00": [("patient", patient.pk)],
+            "@smirnov": [("patient", patient.pk)],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                hits = PersonSearchService().search(text)
+                self.assertEqual([(hit["type"], hit["id"]) for hit in hits], expected)
+
+    def test_partial_phone_with_trunk_prefix(self):
+        patient = make_patient(phone="+79001234567")
+        make_patient(1, phone="+79161234567")
+
+        for text in ("8 900 12", "+7 900 12", "7900 12", "900-123"):
+            with self.subTest(text=text):
+                hits = PersonSearchService().search(text, ("patient",))
+                self.assertEqual([hit["id"] for hit in hits], [patient.pk])
+
+
+# Блок метрик и бюджетов запросов
+class RequestMetricsTests(ApiAuthMixin, TestCase):
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_and_view_totals(self):
+        make_patient()
+
+        response = self.client.get("/api/patients/", headers=self.headers)
+
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries"')
+        metrics = self.client.get("/api/metrics/").content.decode()
+        self.assertIn('view="patient-list"', metrics)
+
+    def test_metrics_are_hidden_from_other_addresses(self):
+        response = self.client.get("/api/metrics/", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryBudgetRoutesTests(ApiAuthMixin, QueryBudgetTestMixin, TestCase):
+    """
+    Маршруты из QUERY_BUDGETS: запрос сверх бюджета завершает тест
+    QueryBudgetExceeded, число запросов не зависит от размера страницы.
+    """
+
+    def test_clinic_roster(self):
+        for i in range(30):
+            make_clinic(i, doctors=[make_doctor(i)])
+
+        def roster(size):
+            response = self.client.get(f"/api/clinics/roster/?limit={size}", headers=self.headers)
+            self.assertEqual(len(response.json()["results"]), size)
+
+        self.assertConstantQueries(roster, sizes=(1, 30))
+
+    def test_person_search(self):
+        for i in range(30):
+            make_patient(i)
+
+        def search(size):
+            response = self.client.get(
+                f"/api/search/?q=Иван&type=patient&limit={size}", headers=self.headers
+            )
+            self.assertEqual(len(response.json()), size)
+
+        # Первый запрос процесса ещё проверяет pg_trgm
+        search(1)
+        self.assertConstantQueries(search, sizes=(1, 30))
+
+    def test_doctor_bulk_serializer(self):
+        created = 0
+
+        def create(size):
+            nonlocal created
+            serializer = DoctorCreateUpdateSerializer(
+                data=[doctor_payload(i) for i in range(created, created + size)], many=True
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            created += size
+
+        self.assertConstantQueries(create, sizes=(1, 10))
+        self.assertEqual(Doctor.objects.count(), 11)
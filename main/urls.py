@@ -0,0 +1,43 @@
+from django.urls import path
+
+from main import views
+
+urlpatterns = [
+    path(
+        "doctors/<int:doctor_id>/availability/",
+        views.DoctorAvailabilityView.as_view(),
+        name="doctor-availability",
+    ),
+    path(
+        "clinics/roster/",
+        views.ClinicRosterView.as_view(),
+        name="clinic-roster",
+    ),
+    path("consults/", views.ConsultListView.as_view(), name="consult-list"),
+    path("patients/", views.PatientListView.as_view(), name="patient-list"),
+    path(
+        "consults/export/",
+        views.ExportView.as_view(kind="consults"),
+        name="consult-export",
+    ),
+    path(
+        "patients/export/",
+        views.ExportView.as_view(kind="patients"),
+        name="patient-export",
+    ),
+    path("stats/consults/", views.ConsultStatsView.as_view(), name="consult-stats"),
+    path("search/", views.PersonSearchView.as_view(), name="person-search"),
+    path("metrics/", views.MetricsView.as_view(), name="metrics"),
+    path(
+        "async/doctors/<int:doctor_id>/availability/",
+        views.AsyncDoctorAvailabilityView.as_view(),
+        name="async-doctor-availability",
+    ),
+    path(
+        "async/consults/book/",
+        views.AsyncConsultBookingView.as_view(),
+        name="async-consult-book",
+    ),
+    path("async/doctors/<int:pk>/", views.AsyncDoctorView.as_view(), name="async-doctor"),
+    path("async/patients/<int:pk>/", views.AsyncPatientView.as_view(), name="async-patient"),
+]
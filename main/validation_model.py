@@ -1,3 +1,6 @@
+from datetime import date
+from operator import itemgetter
+
 from django.core.exceptions import ValidationError
 
 def validate_social_tag(value):
@@ -5,55 +8,141 @@ def validate_social_tag(value):
         raise ValidationError('Тег должен начинаться с символа @.')
 
 
-def validate_optional_field(key: str, data):
-    if key not in data:
-        raise ValidationError(f"Отсутствует обязательное поле: '{key}'.")
-
-    value = data[key]
-    if not isinstance(value, list):
-        raise ValidationError(f"Поле '{key}' должно быть списком.")
-
-    for i, item in enumerate(value):
-        if not isinstance(item, dict):
-            raise ValidationError(f"Элемент в списке '{key}[{i}]' должен быть объектом.")
-
-        if "name" not in item or not isinstance(item["name"], str) or not item["name"].strip():
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать непустое поле 'name'.")
-
-        if "specialty" not in item or not isinstance(item["specialty"], str):
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле 'specialty' (строка).")
-
-        if "start_date" not in item or not isinstance(item["start_date"], str):
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле 'start_date' (строка в формате даты).")
-
-        if "end_date" not in item or not isinstance(item["end_date"], str):
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле 'end_date' (строка в формате даты).")
-
-
-def validate_required_fields(key: str, data):
-    if key not in data:
-        raise ValidationError(f"Отсутствует обязательное поле: '{key}'.")
-
-    value = data[key]
-    if not isinstance(value, list):
-        raise ValidationError(f"Поле '{key}' должно быть списком.")
-
-    for i, item in enumerate(value):
+class SchemaValidator:
+    """
+    Валидатор JSON-документа со списками записей по разделам.
+
+    Схема разбирается один раз при создании: поля записей собираются в
+    itemgetter, индексы полей-дат и ограничения длины (max_lengths,
+    по умолчанию без ограничения) вычисляются заранее. Валидная запись
+    проверяется одним быстрым проходом, подробные сообщения строятся
+    только для ошибочных записей.
+    """
+
+    def __init__(self, name: str, sections: dict, item_fields, date_fields=(), max_lengths=None):
+        self.name = name
+        self.sections = tuple(sections.items())
+        self.item_fields = tuple(item_fields)
+        self.date_fields = tuple(date_fields)
+        self.max_lengths = dict(max_lengths or {})
+        self._length_limits = tuple(
+            (self.item_fields.index(field), max_length) for field, max_length in self.max_lengths.items()
+        )
+        self._get_fields = itemgetter(*self.item_fields)
+        if len(self.item_fields) == 1:
+            self._get_fields = lambda item, get=self._get_fields: (get(item),)
+        self._date_indexes = tuple(self.item_fields.index(field) for field in self.date_fields)
+        # Пара дат (начало, конец) дополнительно проверяется на порядок
+        self._date_range = self._date_indexes if len(self._date_indexes) == 2 else (None, None)
+
+    def errors(self, data) -> dict:
+        """Ошибки документа в виде {путь: сообщение}; пустой словарь - документ валиден."""
+        if data.__class__ is not dict:
+            return {self.name: f"Поле '{self.name}' должно быть объектом (словарём)."}
+
+        errors = {}
+        get_fields = self._get_fields
+        length_limits = self._length_limits
+        date_indexes = self._date_indexes
+        start_index, end_index = self._date_range
+        parse_date = date.fromisoformat
+        for key, required in self.sections:
+            value = data.get(key)
+            if value is None:
+                if required:
+                    errors[key] = f"Отсутствует обязательное поле: '{key}'."
+                continue
+            if value.__class__ is not list:
+                errors[key] = f"Поле '{key}' должно быть списком."
+                continue
+
+            for i, item in enumerate(value):
+                # Быстрый путь: все поля - непустые строки не длиннее ограничения,
+                # даты разбираются и упорядочены
+                try:
+                    values = get_fields(item)
+                    for field_value in values:
+                        if field_value.__class__ is not str or not field_value.strip():
+                            break
+                    else:
+                        for index, max_length in length_limits:
+                            if len(values[index]) > max_length:
+                                break
+                        else:
+                            if start_index is None:
+                                for index in date_indexes:
+                                    parse_date(values[index])
+                                continue
+                            if parse_date(values[start_index]) <= parse_date(values[end_index]):
+                                continue
+                except (KeyError, TypeError, ValueError):
+                    pass
+                errors.update(self._item_errors(f"{key}[{i}]", item))
+        return errors
+
+    def _item_errors(self, path: str, item) -> dict:
         if not isinstance(item, dict):
-            raise ValidationError(f"Элемент в списке '{key}[{i}]' должен быть объектом.")
-
-        if "name" not in item or not isinstance(item["name"], str) or not item["name"].strip():
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать непустое поле 'name'.")
-
-        if "specialty" not in item or not isinstance(item["specialty"], str) or not item["specialty"].strip():
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле 'specialty' (строка).")
-
-        if "start_date" not in item or not isinstance(item["start_date"], str) or not item["start_date"].strip():
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле 'start_date' (строка в формате даты).")
-
-        if "end_date" not in item or not isinstance(item["end_date"], str) or not item["end_date"].strip():
-            raise ValidationError(f"Запись в '{key}[{i}]' должна содержать поле 'end_date' (строка в формате даты).")
-
-
-
-
+            return {path: f"Элемент в списке '{path}' должен быть объектом."}
+        errors = {}
+        for field in self.item_fields:
+            value = item.get(field)
+            if not isinstance(value, str) or not value.strip():
+                errors[f"{path}.{field}"] = (
+                    f"Запись в '{path}' должна содержать непустое поле '{field}' (строка)."
+                )
+            elif field in self.max_lengths and len(value) > self.max_lengths[field]:
+                errors[f"{path}.{field}"] = (
+                    f"Поле '{path}.{field}' должно быть не длиннее "
+                    f"{self.max_lengths[field]} символов."
+                )
+        parsed = {}
+        for field in self.date_fields:
+            if f"{path}.{field}" in errors:
+                continue
+            try:
+                parsed[field] = date.fromisoformat(item[field])
+            except ValueError:
+                errors[f"{path}.{field}"] = (
+                    f"Поле '{path}.{field}' должно быть датой в формате ГГГГ-ММ-ДД."
+                )
+        if len(self.date_fields) == 2 and len(parsed) == 2:
+            start, end = self.date_fields
+            if parsed[end] < parsed[start]:
+                errors[f"{path}.{end}"] = f"В записи '{path}' дата окончания раньше даты начала."
+        return errors
+
+    def errors_many(self, documents) -> list[dict]:
+        """Ошибки пачки документов, по словарю на документ."""
+        errors = self.errors
+        return [errors(document) for document in documents]
+
+    def clean(self, data) -> dict:
+        """Документ только с разделами схемы; необязательные разделы по умолчанию пустые."""
+        return {key: data.get(key) or [] for key, _ in self.sections}
+
+    def validate(self, data):
+        """Проверка для Model.clean: ошибки относятся к полю self.name."""
+        errors = self.errors(data)
+        if errors:
+            raise ValidationError({self.name: list(errors.values())})
+
+
+# Длина name и specialty в EducationEntry: записи history_education
+# копируются туда при сохранении
+EDUCATION_TEXT_MAX_LENGTH = 500
+
+# Единая схема history_education для модели Education и сериализаторов
+education_validator = SchemaValidator(
+    name="history_education",
+    sections={
+        "universities": True,
+        "ordinator": True,
+        "advanced_training": False,
+    },
+    item_fields=("name", "specialty", "start_date", "end_date"),
+    date_fields=("start_date", "end_date"),
+    max_lengths={
+        "name": EDUCATION_TEXT_MAX_LENGTH,
+        "specialty": EDUCATION_TEXT_MAX_LENGTH,
+    },
+)
@@ -1,3 +1,319 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from main import metrics
+from main.authentication import JwtAuthentication
+from main.db_pool import db_slot, release_connections
+from main.models import Clinic, Consult
+from main.pagination import ConsultCursorPagination, PatientCursorPagination
+from main.query_budget import query_budget
+from main.repositories.clinic import ClinicRepository
+from main.repositories.doctor import DoctorRepository
+from main.repositories.patient import PatientRepository
+from main.serializers.clinic import ClinicRosterSerializer, RosterQuerySerializer
+from main.serializers.consult import (
+    AvailabilityQuerySerializer,
+    ConsultBookingSerializer,
+    ConsultListSerializer,
+    FreeWindowSerializer,
+)
+from main.serializers.doctor import DoctorLookupSerializer
+from main.serializers.export import ExportQuerySerializer
+from main.serializers.patient import PatientListSerializer
+from main.serializers.search import SearchQuerySerializer, SearchResultSerializer
+from main.serializers.stats import ConsultStatsSerializer, StatsQuerySerializer
+from main.services.availability import AvailabilityService
+from main.services.consult import ConsultBookingService
+from main.services.export import ExportService
+from main.services.search import PersonSearchService
+from main.services.stats import ConsultStatsService
+
+
+class DoctorAvailabilityView(APIView):
+    """Свободные окна врача в клинике за диапазон дат."""
+
+    def get(self, request, doctor_id):
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        if not self.works_at(doctor_id, params['clinic']):
+            raise Http404
+        windows = AvailabilityService().free_windows(
+            doctor_id=doctor_id,
+            date_from=params['date_from'],
+            date_to=params['date_to'],
+        )
+        return Response(
+            FreeWindowSerializer(
+                [{'start': start, 'end': end} for start, end in windows], many=True
+            ).data
+        )
+
+    @staticmethod
+    def works_at(doctor_id, clinic_id) -> bool:
+        return any(clinic.pk == clinic_id for clinic in ClinicRepository().for_doctor(doctor_id))
+
+
+class ClinicRosterView(APIView):
+    """
+    Реестр клиник с врачами, их образованием и числом предстоящих
+    консультаций. Пагинация по ключу: ?after=<next из прошлой страницы>.
+    """
+
+    def get(self, request):
+        query = RosterQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        with query_budget(settings.QUERY_BUDGETS['clinic-roster']):
+            clinics, next_after = ClinicRepository().roster_page(
+                after=params.get('after'), limit=params['limit']
+            )
+            data = ClinicRosterSerializer(clinics, many=True).data
+        return Response({'results': data, 'next': next_after})
+
+
+class ConsultListView(ListAPIView):
+    """Консультации по дате начала; ?doctor=, ?clinic=, ?patient= фильтруют список."""
+    serializer_class = ConsultListSerializer
+    pagination_class = ConsultCursorPagination
+    FILTERS = ('doctor', 'clinic', 'patient')
+
+    def get_queryset(self):
+        queryset = Consult.objects.only(
+            'id', 'start_date', 'end_date', 'doctor_id', 'patient_id', 'clinic_id'
+        )
+        filters = {
+            f'{name}_id': value
+            for name, value in self.request.query_params.items()
+            if name in self.FILTERS and value.isdigit()
+        }
+        return queryset.filter(**filters)
+
+
+class PatientListView(ListAPIView):
+    """Пациенты по фамилии, имени и отчеству."""
+    serializer_class = PatientListSerializer
+    pagination_class = PatientCursorPagination
+
+    def get_queryset(self):
+        return PatientRepository().get_all(fields=PatientRepository.LIST_FIELDS)
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка в CSV/JSONL: ?output=csv|jsonl, ?clinic=, ?doctor=,
+    ?date_from=, ?date_to=. Строки отдаются по мере чтения из бд; под ASGI -
+    асинхронным потоком пачек (ExportService.alines).
+    """
+    kind = None  # 'consults' или 'patients'
+    CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request):
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = dict(query.validated_data)
+        file_format = params.pop('output')
+
+        service = ExportService()
+        columns, rows = getattr(service, self.kind)(**params)
+        lines = service.lines(columns, rows, file_format)
+        if isinstance(request._request, ASGIRequest):
+            lines = service.alines(lines)
+        response = StreamingHttpResponse(lines, content_type=self.CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{self.kind}.{file_format}"'
+        return response
+
+
+class ConsultStatsView(APIView):
+    """
+    Сводка приёмов по дням, врачам или клиникам (?group_by=day|doctor|clinic)
+    с фильтрами ?clinic=, ?doctor=, ?date_from=, ?date_to=. Читает
+    ConsultDailyStats, а не таблицу приёмов.
+    """
+
+    def get(self, request):
+        query = StatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows = ConsultStatsService().summary(**query.validated_data)
+        return Response(ConsultStatsSerializer(rows, many=True).data)
+
+
+class PersonSearchView(APIView):
+    """
+    Поиск пациентов и врачей для регистратуры: ?q= часть ФИО, телефон
+    или @тег, ?type=all|patient|doctor, ?limit=. Результаты по убыванию ранга.
+    """
+
+    def get(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        kinds = PersonSearchService.MODELS if params['type'] == 'all' else (params['type'],)
+        with query_budget(settings.QUERY_BUDGETS['person-search']):
+            hits = PersonSearchService(limit=params['limit']).search(params['q'], kinds)
+        return Response(SearchResultSerializer(hits, many=True).data)
+
+
+class MetricsView(View):
+    """
+    Метрики процесса в текстовом формате Prometheus (main.metrics). Только
+    для адресов из METRICS_ALLOWED_IPS, остальным - 404.
+    """
+
+    def get(self, request):
+        if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+            raise Http404
+        return HttpResponse(
+            metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+# Блок асинхронных представлений (ASGI)
+class AsyncAPIView(View):
+    """
+    База асинхронных JSON-представлений: все обработчики async def.
+
+    Под ASGI запрос не занимает поток воркера, пока ждёт бд и кеш. Число
+    одновременно обрабатываемых запросов ограничено db_slot, соединение
+    возвращается в пул до освобождения слота. Запрос без действительного
+    access-токена получает 401, как в DRF с IsAuthenticated. Ошибки
+    валидации DRF и моделей отдаются как 400, отсутствующий объект - как 404.
+    """
+    not_found_message = "Не найдено."
+    authentication_class = JwtAuthentication
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как у DRF APIView: API работает с токенами, а не с сессионными cookie
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticator = self.authentication_class()
+        try:
+            # В потоке: фильтр denylist периодически синхронизируется с Redis
+            user_auth = await sync_to_async(authenticator.authenticate)(request)
+        except AuthenticationFailed as exc:
+            return self.unauthorized(authenticator, exc.detail)
+        if user_auth is None:
+            return self.unauthorized(authenticator, 'Учётные данные не были предоставлены.')
+        request.user, request.auth = user_auth
+
+        async with db_slot():
+            try:
+                return await super().dispatch(request, *args, **kwargs)
+            except ValidationError as exc:
+                return JsonResponse(exc.detail, status=400, safe=False)
+            except DjangoValidationError as exc:
+                detail = exc.message_dict if hasattr(exc, 'error_dict') else {'detail': exc.messages}
+                return JsonResponse(detail, status=400)
+            except ObjectDoesNotExist:
+                return JsonResponse({'detail': self.not_found_message}, status=404)
+            finally:
+                # Выполняется в потоке этого запроса - там же, где были запросы к бд
+                await sync_to_async(release_connections)()
+
+    @staticmethod
+    def unauthorized(authenticator, detail):
+        response = JsonResponse({'detail': detail}, status=401)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+        return response
+
+    @staticmethod
+    def json_body(request):
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            raise ValidationError({'detail': 'Некорректный JSON.'})
+
+
+class AsyncDoctorAvailabilityView(AsyncAPIView):
+    """Асинхронный DoctorAvailabilityView."""
+
+    async def get(self, request, doctor_id):
+        query = AvailabilityQuerySerializer(data=request.GET)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        if not await sync_to_async(DoctorAvailabilityView.works_at)(doctor_id, params['clinic']):
+            raise Clinic.DoesNotExist
+        windows = await AvailabilityService().afree_windows(
+            doctor_id=doctor_id,
+            date_from=params['date_from'],
+            date_to=params['date_to'],
+        )
+        return JsonResponse(
+            FreeWindowSerializer(
+                [{'start': start, 'end': end} for start, end in windows], many=True
+            ).data,
+            safe=False,
+        )
+
+
+class AsyncConsultBookingView(AsyncAPIView):
+    """
+    Бронирование приёма: 201 и приём, 409 и пересечения или 400.
+    Врач, пациент и клиника проверяются до бронирования.
+    """
+
+    async def post(self, request):
+        booking = ConsultBookingSerializer(data=self.json_body(request))
+        booking.is_valid(raise_exception=True)
+        params = booking.validated_data
+
+        service = ConsultBookingService()
+        errors = await service.amissing_references(
+            params['doctor'], params['clinic'], params['patient']
+        )
+        if errors:
+            return JsonResponse(errors, status=400)
+        result = await service.abook(
+            doctor_id=params['doctor'],
+            clinic_id=params['clinic'],
+            patient_id=params['patient'],
+            start_date=params['start_date'],
+            end_date=params.get('end_date'),
+        )
+        if not result.is_booked:
+            return JsonResponse(
+                {'conflicts': ConsultListSerializer(result.conflicts, many=True).data},
+                status=409,
+            )
+        return JsonResponse(ConsultListSerializer(result.consult).data, status=201)
+
+
+class AsyncPatientView(AsyncAPIView):
+    """Карточка пациента через кеш репозитория."""
+
+    async def get(self, request, pk):
+        patient = await sync_to_async(PatientRepository().get_one)(pk)
+        return JsonResponse(PatientListSerializer(patient).data)
+
+
+class AsyncDoctorView(AsyncAPIView):
+    """Карточка врача со списком его клиник через кеш репозиториев."""
+
+    async def get(self, request, pk):
+        return JsonResponse(DoctorLookupSerializer(await sync_to_async(self.lookup)(pk)).data)
+
+    @staticmethod
+    def lookup(pk):
+        doctor = DoctorRepository().get_one(pk)
+        doctor.clinics = [
+            {'id': clinic.pk, 'name': clinic.name} for clinic in ClinicRepository().for_doctor(pk)
+        ]
+        return doctor